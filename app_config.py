@@ -0,0 +1,40 @@
+import json
+import os
+import threading
+
+# Flet sets this on mobile/desktop builds; fall back to a local folder when run from source.
+DATA_DIR = os.environ.get("FLET_APP_STORAGE_DATA") or os.path.abspath("data")
+
+_settings = None
+_settings_lock = threading.Lock()
+
+def data_path(*parts):
+    """
+    Returns a path inside the app's private data folder, creating the folder if needed.
+    """
+    if not os.path.exists(DATA_DIR): os.makedirs(DATA_DIR, exist_ok=True)
+    return os.path.join(DATA_DIR, *parts)
+
+def _settings_file():
+    return data_path("settings.json")
+
+def get_setting(key, default=None):
+    global _settings
+    with _settings_lock:
+        if _settings is None:
+            try:
+                with open(_settings_file(), "r", encoding="utf-8") as f:
+                    _settings = json.load(f)
+            except (OSError, ValueError):
+                _settings = {}
+        return _settings.get(key, default)
+
+def set_setting(key, value):
+    get_setting(key) # make sure the file has been loaded
+    with _settings_lock:
+        _settings[key] = value
+        try:
+            with open(_settings_file(), "w", encoding="utf-8") as f:
+                json.dump(_settings, f, indent=2)
+        except OSError as e:
+            print(f"Could not save settings: {e}")
@@ -0,0 +1,96 @@
+import threading
+import time
+
+from app_config import get_setting, set_setting
+
+# preset id -> (label, target codec for FFmpegExtractAudio, bitrate for a transcode)
+AUDIO_PRESETS = {
+    'audio_mp3_320': ("High Quality MP3 (320kbps)", 'mp3', '320'),
+    'audio_mp3_best': ("Standard MP3 (192kbps)", 'mp3', '192'),
+    'audio_m4a': ("M4A (AAC, no re-encode)", 'm4a', None),
+    'audio_opus': ("Opus (no re-encode)", 'opus', None),
+}
+
+# Codec the source stream must have for the target to be a plain copy
+_COPY_SOURCE = {'mp3': 'mp3', 'm4a': 'aac', 'opus': 'opus'}
+
+# Realtime factor assumed for MP3 encoding until a real transcode has been timed
+DEFAULT_ENCODE_SPEED = 30.0
+
+def codec_family(acodec):
+    """
+    'mp4a.40.2' -> 'aac', 'opus' -> 'opus', etc. None for unknown/no audio.
+    """
+    if not acodec or acodec == 'none': return None
+    acodec = acodec.lower()
+    if acodec.startswith('mp4a') or acodec == 'aac': return 'aac'
+    if acodec in ('mp3', 'mp4a.40.34'): return 'mp3'
+    return acodec.split('.')[0]
+
+def plan_audio(index, preset):
+    """
+    Decides how to produce `preset` from the video's FormatIndex (None if unknown).
+    Returns {'format', 'postprocessor', 'copy', 'source'}: the yt-dlp format
+    selector, the FFmpegExtractAudio definition, whether the audio will be
+    copied rather than re-encoded, and the chosen source FormatRecord (or None).
+    """
+    _, codec, quality = AUDIO_PRESETS[preset]
+    pp = {'key': 'FFmpegExtractAudio', 'preferredcodec': codec}
+    if quality: pp['preferredquality'] = quality
+
+    src = index.best_by_codec.get(_COPY_SOURCE[codec]) if index else None
+    if src:
+        return {'format': src.selector("bestaudio/best"), 'postprocessor': pp, 'copy': True, 'source': src}
+    return {'format': 'bestaudio/best', 'postprocessor': pp, 'copy': False, 'source': index.best_audio if index else None}
+
+_speed_lock = threading.Lock()
+
+def encode_speed():
+    return get_setting("audio_encode_speed", DEFAULT_ENCODE_SPEED)
+
+def record_encode(audio_seconds, wall_seconds, smoothing=0.3):
+    """
+    Learns how fast this device re-encodes audio (seconds of audio per second).
+    """
+    if not audio_seconds or wall_seconds <= 0: return
+    with _speed_lock:
+        old = encode_speed()
+        set_setting("audio_encode_speed", old + smoothing * (audio_seconds / wall_seconds - old))
+
+class AudioTiming:
+    """
+    Times the audio postprocessing step of one download via yt-dlp's
+    postprocessor hooks and reports what the chosen path saved.
+    """
+    def __init__(self, plan):
+        self.plan = plan
+        self.duration = None # seconds of audio
+        self.elapsed = 0.0
+        self._started = None
+
+    def hook(self, d):
+        if d.get('postprocessor') != 'ExtractAudio': return
+        if d['status'] == 'started':
+            self._started = time.monotonic()
+            self.duration = (d.get('info_dict') or {}).get('duration') or self.duration
+        elif d['status'] == 'finished' and self._started is not None:
+            self.elapsed += time.monotonic() - self._started
+            self._started = None
+
+    def saved_seconds(self):
+        """
+        Estimated seconds saved against re-encoding, 0 when it did re-encode.
+        """
+        if not self.plan['copy'] or not self.duration: return 0.0
+        return max(0.0, self.duration / encode_speed() - self.elapsed)
+
+    def finish(self):
+        """
+        Records the measurement and returns a short note for the job message.
+        """
+        if not self.plan['copy']:
+            record_encode(self.duration, self.elapsed)
+            return f"re-encoded in {self.elapsed:.1f}s"
+        saved = self.saved_seconds()
+        if saved >= 0.1: return f"audio kept as-is, ~{saved:.0f}s faster than re-encoding"
+        return "audio kept as-is"
@@ -0,0 +1,83 @@
+import threading
+
+from app_config import get_setting, set_setting
+
+AUTO_PRESET = 'auto'
+
+# Bytes/s assumed until a download has been timed (~8 Mbit/s)
+DEFAULT_THROUGHPUT = 1024 * 1024
+# Downloads shorter or smaller than this say more about latency than bandwidth
+MIN_SAMPLE_SECONDS = 1.0
+MIN_SAMPLE_BYTES = 512 * 1024
+# Used when no format has a known size: a budget was asked for, so don't go for the top
+UNKNOWN_SIZE_HEIGHT = 720
+
+_throughput_lock = threading.Lock()
+
+def estimated_throughput():
+    """
+    Recent download speed in bytes/s.
+    """
+    return get_setting("throughput_bps", DEFAULT_THROUGHPUT)
+
+def record_throughput(nbytes, seconds, smoothing=0.3):
+    """
+    Learns the download speed from a finished transfer.
+    """
+    if nbytes < MIN_SAMPLE_BYTES or seconds < MIN_SAMPLE_SECONDS: return
+    with _throughput_lock:
+        old = estimated_throughput()
+        set_setting("throughput_bps", old + smoothing * (nbytes / seconds - old))
+
+def pick_format(index, budget_seconds=None, budget_bytes=None, throughput=None):
+    """
+    Picks the highest video format of a FormatIndex (None if unknown) whose
+    size fits `budget_bytes` and whose download time at `throughput` (bytes/s,
+    default: the learned speed) fits `budget_seconds`. Video-only formats
+    count the best audio stream too. If nothing fits, the smallest format is
+    picked. Returns {'format', 'height', 'size', 'seconds', 'fits', 'estimated'}:
+    the yt-dlp format selector, the pick's height, bytes and seconds (0/None
+    when unknown), whether it meets the budget and whether its size is an estimate.
+    """
+    throughput = throughput or estimated_throughput()
+    audio = index.best_audio if index else None
+    candidates = []
+    for rec in (index.video_options() if index else []):
+        if not rec.filesize: continue
+        size, estimated = rec.filesize, rec.estimated
+        if rec.needs_audio and audio:
+            size += audio.filesize
+            estimated = estimated or audio.estimated
+        candidates.append((rec, size, estimated))
+
+    if not candidates:
+        if budget_seconds or budget_bytes:
+            h = UNKNOWN_SIZE_HEIGHT
+            selector = f"bestvideo[height<={h}]+bestaudio/best[height<={h}]/best"
+        else:
+            selector = "bestvideo+bestaudio/best"
+        return {'format': selector, 'height': None, 'size': 0, 'seconds': None, 'fits': False, 'estimated': False}
+
+    def choice(rec, size, estimated, fits):
+        return {
+            'format': rec.selector(), 'height': rec.height, 'size': size,
+            'seconds': size / throughput, 'fits': fits, 'estimated': estimated,
+        }
+
+    for rec, size, estimated in candidates: # highest first
+        if budget_bytes and size > budget_bytes: continue
+        if budget_seconds and size / throughput > budget_seconds: continue
+        return choice(rec, size, estimated, True)
+    rec, size, estimated = min(candidates, key=lambda c: c[1])
+    return choice(rec, size, estimated, False)
+
+def budget_from_settings():
+    """
+    The budget set in the app's settings, as pick_format keyword arguments.
+    """
+    minutes = get_setting("auto_max_minutes", 0)
+    mb = get_setting("auto_max_mb", 0)
+    return {
+        'budget_seconds': minutes * 60 if minutes else None,
+        'budget_bytes': mb * 1024 * 1024 if mb else None,
+    }
@@ -0,0 +1,177 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from yt_dlp.utils import DownloadCancelled
+
+from telemetry import metrics
+
+# A lease that hasn't consumed for this long stops counting towards the split
+IDLE_AFTER = 1.0
+# Tokens a lease may bank, in seconds of its share; keeps bursts short
+BURST_SECONDS = 0.25
+# Longest single sleep, so rate changes and interrupts are noticed quickly
+MAX_WAIT = 0.25
+
+class BandwidthInterrupted(DownloadCancelled):
+    """
+    Raised in a throttled download thread when its job is paused or cancelled.
+    """
+
+class Lease:
+    def __init__(self, scheduler, key, weight):
+        self.scheduler = scheduler
+        self.key = key
+        self.weight = weight
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.last_active = self.updated
+        self.bytes = 0
+        self.interrupted = False
+
+    def consume(self, n):
+        self.scheduler.consume(self, n)
+
+    def close(self):
+        self.scheduler.close(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+class BandwidthScheduler:
+    """
+    Shared token bucket with weighted fair shares. `rate` is bytes/s; None or 0 means unlimited.
+    """
+    def __init__(self, rate=None):
+        self._rate = rate or None
+        self._cond = threading.Condition()
+        self._leases = {}
+
+    @property
+    def rate(self):
+        return self._rate
+
+    def set_rate(self, rate):
+        with self._cond:
+            self._rate = rate or None
+            self._cond.notify_all()
+
+    def open(self, key=None, weight=1.0):
+        lease = Lease(self, key if key is not None else object(), max(0.01, weight))
+        with self._cond:
+            self._leases[lease.key] = lease
+            self._cond.notify_all()
+        return lease
+
+    def close(self, lease):
+        with self._cond:
+            if self._leases.get(lease.key) is lease: del self._leases[lease.key]
+            self._cond.notify_all()
+
+    def set_weight(self, key, weight):
+        with self._cond:
+            lease = self._leases.get(key)
+            if lease:
+                lease.weight = max(0.01, weight)
+                self._cond.notify_all()
+
+    def interrupt(self, key):
+        """
+        Wakes a throttled lease and makes it raise BandwidthInterrupted.
+        """
+        with self._cond:
+            lease = self._leases.get(key)
+            if lease:
+                lease.interrupted = True
+                self._cond.notify_all()
+
+    def consume(self, lease, n):
+        """
+        Charges `n` bytes to `lease`, sleeping while it is over its share.
+        """
+        if n <= 0: return
+        with self._cond:
+            lease.bytes += n
+            now = time.monotonic()
+            lease.last_active = now
+            if not self._rate:
+                lease.updated = now
+                return
+            self._refill(lease, now)
+            lease.tokens -= n
+            while lease.tokens < 0:
+                if lease.interrupted: raise BandwidthInterrupted("Download interrupted while throttled")
+                if not self._rate:
+                    lease.tokens = 0.0
+                    break
+                self._cond.wait(min(MAX_WAIT, -lease.tokens / self._share(lease, now)))
+                now = time.monotonic()
+                lease.last_active = now
+                self._refill(lease, now)
+
+    def stats(self):
+        with self._cond:
+            now = time.monotonic()
+            return {
+                'rate': self._rate,
+                'leases': len(self._leases),
+                'active': sum(1 for l in self._leases.values() if now - l.last_active < IDLE_AFTER),
+                'shares': {str(k): round(self._share(l, now)) for k, l in self._leases.items()} if self._rate else {},
+            }
+
+    # --- Internals (call with self._cond held) ---
+
+    def _share(self, lease, now):
+        total = sum(l.weight for l in self._leases.values() if l is lease or now - l.last_active < IDLE_AFTER)
+        return self._rate * lease.weight / (total or lease.weight)
+
+    def _refill(self, lease, now):
+        share = self._share(lease, now)
+        lease.tokens = min(share * BURST_SECONDS, lease.tokens + (now - lease.updated) * share)
+        lease.updated = now
+
+scheduler = BandwidthScheduler()
+
+def _scheduler_metrics():
+    stats = scheduler.stats()
+    return [
+        ("ytdl_bandwidth_limit_bytes", stats['rate'] or 0, {}),
+        ("ytdl_bandwidth_leases", stats['leases'], {}),
+        ("ytdl_bandwidth_active_leases", stats['active'], {}),
+    ]
+
+metrics.describe("ytdl_bandwidth_limit_bytes", "gauge", "Global download cap in bytes/s (0 = unlimited)")
+metrics.add_collector(_scheduler_metrics)
+
+_current = threading.local()
+
+def current_lease():
+    return getattr(_current, 'lease', None)
+
+@contextmanager
+def bind(lease):
+    """
+    Makes `lease` the current one for this thread, for code that reads data
+    outside yt-dlp's hooks (the segment workers).
+    """
+    previous = current_lease()
+    _current.lease = lease
+    try:
+        yield lease
+    finally:
+        _current.lease = previous
+
+def priority_weight(priority):
+    """
+    Bandwidth weight for a queue priority: prioritised jobs get a bigger share, up to 4x.
+    """
+    return float(min(4, 1 + max(0, priority)))
+
+def mb_per_s(value):
+    """
+    Bytes/s for a limit given in MB/s; None for 0/None (unlimited).
+    """
+    return int(value * 1024 * 1024) if value else None
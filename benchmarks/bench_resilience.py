@@ -0,0 +1,92 @@
+"""
+Downloads under injected faults.
+
+Serves one file from the local media server, injects stalls, connection
+resets, 429/503 answers and slow responses, downloads it through
+download_stream, checks every byte, and prints one JSON line per scenario
+with the time taken and the retries and hedged requests the job's trace
+recorded. Scripted scenarios inject a fixed number of faults into the
+first requests; 'random' mixes all kinds at --fault-rate.
+
+Usage: python benchmarks/bench_resilience.py [--size-mb 32] [--stall-timeout 2]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core_downloader
+from core_downloader import download_stream
+from local_media_server import MediaServer
+from telemetry import Trace
+
+# name -> (faults injected into the first requests, connections, hedging)
+SCENARIOS = {
+    'clean': ([], 4, True),
+    'stall': ([('stall', 2)], 4, True),
+    'reset': ([('reset', 3)], 4, True),
+    'rate_limited': ([('429', 2)], 4, True),
+    'server_error': ([('503', 2)], 4, True),
+    'slow_no_hedge': ([('slow', 2)], 4, False),
+    'slow_hedged': ([('slow', 2)], 4, True),
+    'reset_single_stream': ([('reset', 2)], 1, True),
+    'random': ([], 4, True),
+}
+
+def verify(path, size):
+    with open(path, 'rb') as f:
+        offset = 0
+        while True:
+            block = f.read(1024 * 1024)
+            if not block: break
+            if block != MediaServer.content(offset, len(block)): return False
+            offset += len(block)
+    return offset == size
+
+def main():
+    parser = argparse.ArgumentParser(description="Fault-injection download benchmark")
+    parser.add_argument("--size-mb", type=float, default=32)
+    parser.add_argument("--rate-mb", type=float, default=8, help="per-connection cap in MB/s")
+    parser.add_argument("--slow-kb", type=float, default=256, help="rate of 'slow' responses in KB/s")
+    parser.add_argument("--stall-timeout", type=float, default=2, help="seconds of silence before a read counts as stalled")
+    parser.add_argument("--fault-rate", type=float, default=0.05, help="chance of each fault kind per request in 'random'")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", help="comma-separated scenarios to run")
+    args = parser.parse_args()
+
+    # Sessions are built from the profile on first use, so this has to happen before any download
+    core_downloader.DOWNLOAD_PROFILE['socket_timeout'] = args.stall_timeout
+    size = int(args.size_mb * 1024 * 1024)
+    names = args.only.split(",") if args.only else list(SCENARIOS)
+    for name in names:
+        scripted, conns, hedge = SCENARIOS[name]
+        faults = {k: args.fault_rate for k in ('stall', 'reset', 'slow', '429', '503')} if name == 'random' else None
+        server = MediaServer(rate=args.rate_mb * 1024 * 1024, slow_rate=args.slow_kb * 1024, faults=faults, seed=args.seed,
+                             stall_seconds=args.stall_timeout * 3)
+        with server, tempfile.TemporaryDirectory() as tmp:
+            url = server.add_file(f"/{name}.mp4", size)
+            for kind, count in scripted: server.inject(kind, count)
+            trace = Trace(name)
+            t = time.perf_counter()
+            ok, msg = download_stream(url, None, tmp, connections=conns, trace=trace, hedge=hedge)
+            elapsed = time.perf_counter() - t
+            files = [os.path.join(tmp, f) for f in os.listdir(tmp) if not f.endswith(('.part', '.segments'))]
+            print(json.dumps({
+                'scenario': name,
+                'ok': ok and len(files) == 1 and verify(files[0], size),
+                'seconds': round(elapsed, 2),
+                'connections': conns,
+                'hedge': hedge,
+                'retries': trace.retries,
+                'counters': trace.counters,
+                'faults': {k: v for k, v in server.stats.items() if k.startswith('fault_') and v},
+                'requests': server.stats['requests'],
+                'message': msg,
+            }), flush=True)
+
+if __name__ == "__main__":
+    main()
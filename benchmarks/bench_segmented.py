@@ -0,0 +1,66 @@
+"""
+Single vs. multi-connection downloads through download_stream.
+
+Serves one large file from the local media server with per-request latency
+and a per-connection bandwidth cap (what a long-RTT link looks like to one
+TCP stream), downloads it with different connection counts, checks every
+byte, and prints one JSON line per run.
+
+Usage: python benchmarks/bench_segmented.py [--size-mb 32] [--latency 0.1] [--rate-mb 4]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core_downloader import download_stream
+from local_media_server import MediaServer
+from segmented_download import tuner
+
+def verify(path, size):
+    with open(path, 'rb') as f:
+        offset = 0
+        while True:
+            block = f.read(1024 * 1024)
+            if not block: break
+            if block != MediaServer.content(offset, len(block)): return False
+            offset += len(block)
+    return offset == size
+
+def main():
+    parser = argparse.ArgumentParser(description="Segmented download benchmark")
+    parser.add_argument("--size-mb", type=float, default=32)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds added to every response")
+    parser.add_argument("--rate-mb", type=float, default=4, help="per-connection cap in MB/s")
+    parser.add_argument("--connections", default="1,2,4,8,auto,auto,auto")
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    with MediaServer(latency=args.latency, rate=args.rate_mb * 1024 * 1024) as server:
+        url = server.add_file("/large.mp4", size)
+        for spec in args.connections.split(","):
+            conns = None if spec == "auto" else int(spec)
+            chosen = conns or tuner.suggest(url)
+            with tempfile.TemporaryDirectory() as tmp:
+                server.reset_stats()
+                t = time.perf_counter()
+                ok, msg = download_stream(url, None, tmp, connections=conns)
+                elapsed = time.perf_counter() - t
+                files = [os.path.join(tmp, f) for f in os.listdir(tmp)]
+                print(json.dumps({
+                    'connections': spec,
+                    'used': chosen,
+                    'ok': ok and len(files) == 1 and verify(files[0], size),
+                    'seconds': round(elapsed, 2),
+                    'mb_per_s': round(size / elapsed / 1024 / 1024, 2),
+                    'requests': server.stats['requests'],
+                    'range_requests': server.stats['range_requests'],
+                    'message': msg,
+                }))
+
+if __name__ == "__main__":
+    main()
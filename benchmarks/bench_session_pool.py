@@ -0,0 +1,96 @@
+"""
+Per-call overhead of a fresh YoutubeDL vs. a pooled one.
+
+Runs the same metadata lookup and small download against a local media
+server, once constructing YoutubeDL per call (the old code path) and once
+through session_pool. Prints one JSON line per scenario.
+
+Usage: python benchmarks/bench_session_pool.py [--calls 30] [--size-kb 256]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yt_dlp
+
+from local_media_server import MediaServer
+from session_pool import SessionPool
+
+EXTRACT_OPTS = {'quiet': True, 'no_warnings': True, 'noprogress': True}
+
+def timed(fn, calls):
+    samples = []
+    for _ in range(calls):
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1000)
+    return samples
+
+def summary(name, samples, server):
+    samples = sorted(samples)
+    return {
+        'scenario': name,
+        'calls': len(samples),
+        'mean_ms': round(statistics.mean(samples), 2),
+        'p50_ms': round(samples[len(samples) // 2], 2),
+        'p95_ms': round(samples[int(len(samples) * 0.95) - 1], 2),
+        'connections': server.stats['connections'],
+        'requests': server.stats['requests'],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="YoutubeDL session pool micro-benchmark")
+    parser.add_argument("--calls", type=int, default=30)
+    parser.add_argument("--size-kb", type=int, default=256)
+    args = parser.parse_args()
+
+    with MediaServer() as server, tempfile.TemporaryDirectory() as tmp:
+        url = server.add_file("/clip.mp4", args.size_kb * 1024)
+        outtmpl = os.path.join(tmp, '%(id)s.%(ext)s')
+        results = []
+
+        # --- Metadata lookup ---
+        def fresh_extract():
+            with yt_dlp.YoutubeDL(dict(EXTRACT_OPTS)) as ydl:
+                ydl.extract_info(url, download=False)
+
+        pool = SessionPool()
+        pool.register_profile('extract', EXTRACT_OPTS)
+        pool.register_profile('download', EXTRACT_OPTS)
+
+        def pooled_extract():
+            with pool.session('extract') as ydl:
+                ydl.extract_info(url, download=False)
+
+        for name, fn in (("extract_fresh", fresh_extract), ("extract_pooled", pooled_extract)):
+            fn() # warm imports and the OS socket path before measuring
+            server.reset_stats()
+            results.append(summary(name, timed(fn, args.calls), server))
+
+        # --- Small download ---
+        def fresh_download():
+            with yt_dlp.YoutubeDL(dict(EXTRACT_OPTS, outtmpl=outtmpl, overwrites=True)) as ydl:
+                ydl.download([url])
+
+        def pooled_download():
+            with pool.session('download', outtmpl=outtmpl, overwrites=True) as ydl:
+                ydl.download([url])
+
+        for name, fn in (("download_fresh", fresh_download), ("download_pooled", pooled_download)):
+            fn()
+            server.reset_stats()
+            results.append(summary(name, timed(fn, args.calls), server))
+
+        pool.close()
+
+    for r in results:
+        print(json.dumps(r))
+
+if __name__ == "__main__":
+    main()
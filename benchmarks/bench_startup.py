@@ -0,0 +1,85 @@
+"""
+Cold-start benchmark.
+
+Starts a fresh interpreter per run and times what the app does before its
+first frame and before it's ready: importing Flet (all the shell needs),
+the UI components, the yt-dlp based modules, building the first extraction
+session (extractor loading) and finding ffmpeg. The first run has no cached
+ffmpeg folder; later runs reuse it, as app starts after the first do.
+
+Prints one JSON document with the same result layout as run_suite.py
+(median milliseconds per phase). On a device build, the app logs the same
+phases as a "startup" event in telemetry.jsonl (see startup.py).
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--out startup.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter; each phase is timed on its own, in app order
+PROBE = r"""
+import json, sys, time
+t = time.perf_counter()
+sys.path.insert(0, ROOT)
+phases = {}
+def step(name):
+    global t
+    now = time.perf_counter()
+    phases[name] = now - t
+    t = now
+import startup; step('module')
+import flet; step('flet')
+import ui_components; step('ui_components')
+import core_downloader, download_queue, job_journal, playlist_engine, postprocess, thumbnails; step('app_modules')
+startup.ensure_ffmpeg(); step('ffmpeg')
+core_downloader.warm_sessions(); step('first_session')
+print(json.dumps(phases))
+""".replace("ROOT", repr(ROOT))
+
+def run_probe(data_dir):
+    env = dict(os.environ, FLET_APP_STORAGE_DATA=data_dir)
+    out = subprocess.run([sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def result(name, seconds, **details):
+    return {'name': name, 'unit': 'ms', 'value': round(seconds * 1000, 1), 'better': 'lower', **details}
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--out", help="write the JSON results here (default: stdout)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        runs = [run_probe(data_dir) for _ in range(max(2, args.runs))]
+    first, rest = runs[0], runs[1:]
+    median = lambda phase: statistics.median(r[phase] for r in rest)
+
+    results = [result(f"startup_{phase}", median(phase)) for phase in rest[0]]
+    shell = ('module', 'flet')
+    results += [
+        result("startup_time_to_shell", statistics.median(sum(r[p] for p in shell) for r in rest)),
+        result("startup_time_to_ready", statistics.median(sum(r.values()) for r in rest)),
+        result("startup_ffmpeg_first_run", first['ffmpeg']),
+    ]
+    doc = {
+        'meta': {'python': platform.python_version(), 'platform': platform.platform(), 'runs': len(runs)},
+        'results': results,
+    }
+    text = json.dumps(doc, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Writes the extractor fixtures the offline benchmarks replay.
+
+The files mirror the shape of yt-dlp's `extract_info(url, download=False)`
+output for YouTube (after `YoutubeDL.sanitize_info`): every key the app
+reads, the same format mix (storyboards, DASH audio/video in several
+codecs, HDR, muxed and HLS formats) and realistically long signed URLs.
+They are generated from a fixed seed so runs are comparable; use
+benchmarks/record_fixture.py to capture a real page instead.
+
+Usage: python benchmarks/fixtures/make_fixtures.py
+"""
+import gzip
+import json
+import os
+import random
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# (format_id, height, vcodec, ext, fps, dynamic_range)
+VIDEO_LADDER = [
+    ('160', 144, 'avc1.4d400c', 'mp4', 30, 'SDR'), ('278', 144, 'vp9', 'webm', 30, 'SDR'), ('394', 144, 'av01.0.00M.08', 'mp4', 30, 'SDR'),
+    ('133', 240, 'avc1.4d4015', 'mp4', 30, 'SDR'), ('242', 240, 'vp9', 'webm', 30, 'SDR'), ('395', 240, 'av01.0.00M.08', 'mp4', 30, 'SDR'),
+    ('134', 360, 'avc1.4d401e', 'mp4', 30, 'SDR'), ('243', 360, 'vp9', 'webm', 30, 'SDR'), ('396', 360, 'av01.0.01M.08', 'mp4', 30, 'SDR'),
+    ('135', 480, 'avc1.4d401f', 'mp4', 30, 'SDR'), ('244', 480, 'vp9', 'webm', 30, 'SDR'), ('397', 480, 'av01.0.04M.08', 'mp4', 30, 'SDR'),
+    ('136', 720, 'avc1.64001f', 'mp4', 30, 'SDR'), ('247', 720, 'vp9', 'webm', 30, 'SDR'), ('398', 720, 'av01.0.05M.08', 'mp4', 30, 'SDR'),
+    ('298', 720, 'avc1.4d4020', 'mp4', 60, 'SDR'), ('302', 720, 'vp9', 'webm', 60, 'SDR'),
+    ('137', 1080, 'avc1.640028', 'mp4', 30, 'SDR'), ('248', 1080, 'vp9', 'webm', 30, 'SDR'), ('399', 1080, 'av01.0.08M.08', 'mp4', 30, 'SDR'),
+    ('299', 1080, 'avc1.64002a', 'mp4', 60, 'SDR'), ('303', 1080, 'vp9', 'webm', 60, 'SDR'),
+    ('271', 1440, 'vp9', 'webm', 30, 'SDR'), ('400', 1440, 'av01.0.12M.08', 'mp4', 30, 'SDR'), ('308', 1440, 'vp9', 'webm', 60, 'SDR'),
+    ('313', 2160, 'vp9', 'webm', 30, 'SDR'), ('401', 2160, 'av01.0.12M.08', 'mp4', 30, 'SDR'), ('315', 2160, 'vp9', 'webm', 60, 'SDR'),
+    ('330', 144, 'vp09.02.10.10', 'webm', 60, 'HDR10'), ('331', 240, 'vp09.02.20.10', 'webm', 60, 'HDR10'),
+    ('332', 360, 'vp09.02.21.10', 'webm', 60, 'HDR10'), ('333', 480, 'vp09.02.30.10', 'webm', 60, 'HDR10'),
+    ('334', 720, 'vp09.02.31.10', 'webm', 60, 'HDR10'), ('335', 1080, 'vp09.02.40.10', 'webm', 60, 'HDR10'),
+    ('336', 1440, 'vp09.02.50.10', 'webm', 60, 'HDR10'), ('337', 2160, 'vp09.02.51.10', 'webm', 60, 'HDR10'),
+    ('694', 144, 'av01.0.00M.10.0.110.09.16.09.0', 'mp4', 60, 'HDR10'), ('699', 1080, 'av01.0.09M.10.0.110.09.16.09.0', 'mp4', 60, 'HDR10'),
+    ('701', 2160, 'av01.0.13M.10.0.110.09.16.09.0', 'mp4', 60, 'HDR10'),
+]
+# (format_id, acodec, ext, abr, note)
+AUDIO = [
+    ('599', 'mp4a.40.5', 'm4a', 31, 'ultralow'), ('600', 'opus', 'webm', 35, 'ultralow'),
+    ('139', 'mp4a.40.5', 'm4a', 49, 'low'), ('249', 'opus', 'webm', 51, 'low'), ('250', 'opus', 'webm', 67, 'low'),
+    ('140', 'mp4a.40.2', 'm4a', 129, 'medium'), ('251', 'opus', 'webm', 135, 'medium'),
+    ('140-drc', 'mp4a.40.2', 'm4a', 129, 'medium, DRC'), ('251-drc', 'opus', 'webm', 133, 'medium, DRC'),
+]
+# Muxed progressive + HLS (format_id, height, protocol)
+MUXED = [('18', 360, 'https'), ('91', 144, 'm3u8_native'), ('92', 240, 'm3u8_native'), ('93', 360, 'm3u8_native'),
+         ('94', 480, 'm3u8_native'), ('95', 720, 'm3u8_native'), ('96', 1080, 'm3u8_native')]
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-us,en;q=0.5',
+    'Sec-Fetch-Mode': 'navigate',
+}
+ID_CHARS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+
+def video_id(rng):
+    return ''.join(rng.choice(ID_CHARS) for _ in range(11))
+
+def signed_url(rng, vid, itag, mime):
+    sig = ''.join(rng.choice(ID_CHARS) for _ in range(120))
+    params = '&'.join(f'{k}={"".join(rng.choice(ID_CHARS) for _ in range(n))}' for k, n in (
+        ('ei', 24), ('ip', 12), ('id', 18), ('initcwndbps', 7), ('mh', 2), ('mm', 10), ('mn', 20), ('ms', 6),
+        ('mv', 1), ('mvi', 2), ('pl', 2), ('lsparams', 40), ('lsig', 80), ('spc', 50), ('vprv', 1), ('svpuc', 1)))
+    return (f'https://rr{rng.randint(1, 8)}---sn-{video_id(rng)[:8].lower()}.googlevideo.com/videoplayback'
+            f'?expire={1790000000 + rng.randint(0, 99999)}&itag={itag}&source=youtube&requiressl=yes&{params}'
+            f'&mime={mime}&gir=yes&clen={rng.randint(10**5, 10**9)}&dur=612.345&sig={sig}')
+
+def make_video(rng, max_height, duration=612):
+    vid = video_id(rng)
+    formats = []
+    for i in range(4):
+        formats.append({
+            'format_id': f'sb{3 - i}', 'format_note': 'storyboard', 'ext': 'mhtml', 'protocol': 'mhtml',
+            'acodec': 'none', 'vcodec': 'none', 'url': f'https://i.ytimg.com/sb/{vid}/storyboard3_L{i}/M$M.jpg',
+            'width': 48 * (i + 1), 'height': 27 * (i + 1), 'fps': 0.5, 'rows': 10, 'columns': 10,
+            'fragments': [{'url': f'https://i.ytimg.com/sb/{vid}/storyboard3_L{i}/M{n}.jpg', 'duration': 50.0}
+                          for n in range(duration // 50 + 1)],
+            'resolution': f'{48 * (i + 1)}x{27 * (i + 1)}', 'aspect_ratio': 1.78, 'filesize_approx': None,
+            'http_headers': HEADERS, 'audio_ext': 'none', 'video_ext': 'none', 'vbr': 0, 'abr': 0, 'tbr': None,
+            'format': f'sb{3 - i} - {48 * (i + 1)}x{27 * (i + 1)} (storyboard)',
+        })
+    for fid, acodec, ext, abr, note in AUDIO:
+        size = int(abr * 1000 / 8 * duration)
+        formats.append({
+            'format_id': fid, 'format_note': note, 'ext': ext, 'protocol': 'https', 'acodec': acodec, 'vcodec': 'none',
+            'url': signed_url(rng, vid, fid.split('-')[0], f'audio%2F{ext}'), 'width': None, 'height': None, 'fps': None,
+            'asr': 48000 if acodec == 'opus' else 44100, 'audio_channels': 2, 'abr': abr, 'tbr': abr, 'vbr': 0,
+            'filesize': size, 'quality': 3, 'has_drm': False, 'source_preference': -1, 'language': 'en',
+            'language_preference': -1, 'dynamic_range': None, 'container': f'{ext}_dash',
+            'downloader_options': {'http_chunk_size': 10485760}, 'http_headers': HEADERS,
+            'audio_ext': ext, 'video_ext': 'none', 'resolution': 'audio only', 'aspect_ratio': None,
+            'format': f'{fid} - audio only ({note})',
+        })
+    for fid, height, vcodec, ext, fps, dr in VIDEO_LADDER:
+        if height > max_height: continue
+        width = height * 16 // 9
+        vbr = round(height * height / 280 * (1.5 if fps == 60 else 1) * (1.3 if dr != 'SDR' else 1), 3)
+        formats.append({
+            'format_id': fid, 'format_note': f'{height}p{fps if fps == 60 else ""}{" HDR" if dr != "SDR" else ""}',
+            'ext': ext, 'protocol': 'https', 'acodec': 'none', 'vcodec': vcodec,
+            'url': signed_url(rng, vid, fid, f'video%2F{ext}'), 'width': width, 'height': height, 'fps': fps,
+            'vbr': vbr, 'tbr': vbr, 'abr': 0, 'filesize': int(vbr * 1000 / 8 * duration) if rng.random() > 0.1 else None,
+            'filesize_approx': int(vbr * 1000 / 8 * duration), 'quality': height // 100, 'has_drm': False,
+            'source_preference': -1, 'language': None, 'dynamic_range': dr, 'container': f'{ext}_dash',
+            'downloader_options': {'http_chunk_size': 10485760}, 'http_headers': HEADERS,
+            'audio_ext': 'none', 'video_ext': ext, 'resolution': f'{width}x{height}', 'aspect_ratio': 1.78,
+            'format': f'{fid} - {width}x{height} ({height}p)',
+        })
+    for fid, height, protocol in MUXED:
+        if height > max_height: continue
+        width = height * 16 // 9
+        tbr = round(height * height / 250 + 128, 3)
+        fmt = {
+            'format_id': fid, 'format_note': f'{height}p', 'ext': 'mp4', 'protocol': protocol,
+            'acodec': 'mp4a.40.2' if fid == '18' else 'mp4a.40.5', 'vcodec': 'avc1.42001E',
+            'url': signed_url(rng, vid, fid, 'video%2Fmp4'), 'width': width, 'height': height, 'fps': 30,
+            'tbr': tbr, 'quality': height // 100, 'has_drm': False, 'source_preference': -1, 'language': 'en',
+            'dynamic_range': 'SDR', 'http_headers': HEADERS, 'audio_ext': 'none', 'video_ext': 'mp4',
+            'resolution': f'{width}x{height}', 'aspect_ratio': 1.78, 'format': f'{fid} - {width}x{height}',
+        }
+        if protocol == 'https':
+            fmt.update(filesize=int(tbr * 1000 / 8 * duration), asr=44100, audio_channels=2)
+        else:
+            fmt.update(manifest_url=f'https://manifest.googlevideo.com/api/manifest/hls_variant/id/{vid}/itag/{fid}/index.m3u8',
+                       preference=None, filesize_approx=int(tbr * 1000 / 8 * duration))
+        formats.append(fmt)
+
+    thumbs = [{'url': f'https://i.ytimg.com/vi/{vid}/{name}.jpg', 'preference': -i, 'id': str(i)}
+              for i, name in enumerate(('maxresdefault', 'sddefault', 'hqdefault', 'mqdefault', 'default'))]
+    return {
+        'id': vid, 'title': f'Fixture video {vid}', 'fulltitle': f'Fixture video {vid}',
+        'formats': formats, 'thumbnails': thumbs, 'thumbnail': thumbs[0]['url'],
+        'description': 'Recorded-shape fixture. ' * 40, 'channel_id': 'UC' + video_id(rng) * 2,
+        'channel_url': 'https://www.youtube.com/channel/UCfixture', 'duration': duration,
+        'view_count': rng.randint(10**3, 10**8), 'average_rating': None, 'age_limit': 0,
+        'webpage_url': f'https://www.youtube.com/watch?v={vid}', 'categories': ['Travel & Events'],
+        'tags': [f'tag{i}' for i in range(25)], 'playable_in_embed': True, 'live_status': 'not_live',
+        'release_timestamp': None, 'comment_count': rng.randint(0, 10**5), 'chapters': None,
+        'heatmap': [{'start_time': i * 6.12, 'end_time': (i + 1) * 6.12, 'value': rng.random()} for i in range(100)],
+        'like_count': rng.randint(0, 10**6), 'channel': 'Fixture Channel', 'channel_follower_count': 123456,
+        'uploader': 'Fixture Channel', 'uploader_id': '@fixture', 'uploader_url': 'https://www.youtube.com/@fixture',
+        'upload_date': '20240101', 'timestamp': 1704067200, 'availability': 'public', 'original_url': None,
+        'webpage_url_basename': 'watch', 'webpage_url_domain': 'youtube.com', 'extractor': 'youtube',
+        'extractor_key': 'Youtube', 'playlist': None, 'playlist_index': None, 'display_id': vid,
+        'duration_string': f'{duration // 60}:{duration % 60:02d}', 'is_live': False, 'was_live': False,
+        'format_id': '401+251' if max_height >= 2160 else '136+251', 'ext': 'webm', 'protocol': 'https+https',
+        'language': 'en', 'format_note': f'{max_height}p+medium', 'requested_subtitles': None,
+        'epoch': 1760000000, '_type': 'video', '_version': {'version': '2026.08.19', 'release_git_head': None, 'repository': 'yt-dlp/yt-dlp'},
+    }
+
+def make_playlist(rng, count):
+    entries = []
+    for i in range(count):
+        vid = video_id(rng)
+        entries.append({
+            '_type': 'url', 'ie_key': 'Youtube', 'id': vid, 'url': f'https://www.youtube.com/watch?v={vid}',
+            'title': f'Playlist entry {i + 1}', 'description': None, 'duration': rng.randint(30, 3600),
+            'channel_id': 'UCfixture', 'channel': 'Fixture Channel', 'channel_url': 'https://www.youtube.com/channel/UCfixture',
+            'uploader': 'Fixture Channel', 'uploader_id': '@fixture', 'uploader_url': 'https://www.youtube.com/@fixture',
+            'thumbnails': [{'url': f'https://i.ytimg.com/vi/{vid}/hqdefault.jpg?sqp=-oaymwEbCKgBEF5IVfKriqkDDggBFQAAiEIYAXABwAEG&rs=AOn4CLA',
+                            'height': h, 'width': w} for w, h in ((168, 94), (196, 110), (246, 138), (336, 188))],
+            'timestamp': None, 'release_timestamp': None, 'availability': None, 'view_count': rng.randint(10, 10**7),
+            'live_status': None, 'channel_is_verified': None, '__x_forwarded_for_ip': None,
+        })
+    return {
+        'id': 'PLfixture' + video_id(rng), 'title': f'Fixture playlist ({count} videos)', '_type': 'playlist',
+        'entries': entries, 'availability': 'public', 'channel': 'Fixture Channel', 'channel_id': 'UCfixture',
+        'description': '', 'modified_date': '20240101', 'view_count': 1000, 'playlist_count': count,
+        'webpage_url': 'https://www.youtube.com/playlist?list=PLfixture', 'extractor': 'youtube:tab',
+        'extractor_key': 'YoutubeTab', 'epoch': 1760000000,
+    }
+
+FIXTURES = {
+    'video_small': lambda rng: make_video(rng, max_height=720, duration=212),
+    'video_4k': lambda rng: make_video(rng, max_height=2160, duration=612),
+    'playlist_1000': lambda rng: make_playlist(rng, 1000),
+}
+
+def write(name, info):
+    path = os.path.join(HERE, f'{name}.json.gz')
+    data = json.dumps(info).encode('utf-8')
+    with open(path, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+        f.write(data) # fixed mtime keeps regenerated files byte-identical
+    return path
+
+def main():
+    for name, build in FIXTURES.items():
+        path = write(name, build(random.Random(name)))
+        print(f'{path} ({os.path.getsize(path) // 1024} KB)')
+
+if __name__ == '__main__':
+    main()
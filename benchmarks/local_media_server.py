@@ -0,0 +1,242 @@
+"""
+Small stand-in for a media CDN, for offline benchmarks.
+
+Serves deterministic fake media files over HTTP/1.1 with keep-alive and
+Range support. Counts connections and requests so callers can see how many
+TCP connections a client really opened.
+
+Faults can be injected into GET responses, either at random (`faults`, a
+kind -> probability map) or scripted for the next requests (inject()):
+  stall  sends part of the body, then goes silent for `stall_seconds`
+  reset  sends part of the body, then drops the connection with a TCP RST
+  slow   sends the whole body at `slow_rate` bytes/s (a tail-latency request)
+  429    answers Too Many Requests with Retry-After: `retry_after`
+  503    answers Service Unavailable
+
+Usage (standalone): python benchmarks/local_media_server.py --port 8765
+"""
+import argparse
+import http.server
+import random
+import re
+import socket
+import struct
+import threading
+import time
+
+_RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)')
+# Byte at position i is i % 251, so any range can be verified independently
+_PATTERN = bytes(range(251)) * 300
+FAULT_KINDS = ('stall', 'reset', 'slow', '429', '503')
+
+class _QuietServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections is normal here
+        pass
+
+class MediaServer:
+    """
+    Runs a threaded HTTP server in the background.
+    Files are registered by path with a size; content is a repeating pattern
+    so nothing large has to be kept in memory.
+
+    `latency` (seconds) is added before every response.
+    `rate` (bytes/s) caps each connection, to mimic a link where a single
+    TCP stream can't use the full bandwidth.
+    `faults` maps fault kinds to the probability of injecting them into a
+    GET; `seed` makes that sequence repeatable.
+    """
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, rate=None, faults=None, seed=None,
+                 stall_seconds=30.0, slow_rate=256 * 1024, retry_after=1):
+        self.latency = latency
+        self.rate = rate
+        self.faults = dict(faults or {})
+        self.stall_seconds = stall_seconds
+        self.slow_rate = slow_rate
+        self.retry_after = retry_after
+        self.files = {}
+        self.stats = {'connections': 0, 'requests': 0, 'range_requests': 0, 'bytes_sent': 0}
+        self.stats.update({f'fault_{k}': 0 for k in FAULT_KINDS})
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._scripted = []
+
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # keep-alive
+
+            def setup(self):
+                super().setup()
+                server._count('connections')
+
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                self._serve(send_body=False)
+
+            def do_GET(self):
+                self._serve(send_body=True)
+
+            def _serve(self, send_body):
+                server._count('requests')
+                if server.latency: time.sleep(server.latency)
+
+                entry = server.files.get(self.path.split('?')[0])
+                if not entry:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                size, content_type = entry
+                fault = server._next_fault() if send_body else None
+                if fault in ('429', '503'):
+                    self.send_response(int(fault))
+                    if fault == '429': self.send_header("Retry-After", str(server.retry_after))
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                start, end = 0, size - 1
+                status = 200
+                m = _RANGE_RE.match(self.headers.get("Range", ""))
+                if m and (m.group(1) or m.group(2)):
+                    server._count('range_requests')
+                    if m.group(1):
+                        start = int(m.group(1))
+                        if m.group(2): end = min(int(m.group(2)), size - 1)
+                    else:
+                        start = max(0, size - int(m.group(2)))
+                    if start >= size:
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{size}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    status = 206
+
+                length = end - start + 1
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Length", str(length))
+                if status == 206: self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                self.end_headers()
+                if send_body: self._write_body(start, length, fault)
+
+            def _write_body(self, offset, length, fault=None):
+                chunk = 64 * 1024
+                rate = server.slow_rate if fault == 'slow' else server.rate
+                # Stalls and resets hit somewhere in the first half of the body
+                cut = length // 2 if fault in ('stall', 'reset') else None
+                started, sent = time.monotonic(), 0
+                while length > 0:
+                    if cut is not None and sent >= cut:
+                        if fault == 'stall':
+                            time.sleep(server.stall_seconds)
+                        else:
+                            # SO_LINGER 0: close() sends RST instead of FIN
+                            self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+                        self.close_connection = True
+                        self.connection.close()
+                        return
+                    if rate:
+                        ahead = sent / rate - (time.monotonic() - started)
+                        if ahead > 0: time.sleep(ahead)
+                    n = min(chunk, length, cut - sent if cut else chunk)
+                    try:
+                        self.wfile.write(server.content(offset, n))
+                    except (BrokenPipeError, ConnectionResetError):
+                        return
+                    offset += n
+                    length -= n
+                    sent += n
+                    server._count('bytes_sent', n)
+
+        self.httpd = _QuietServer((host, port), Handler)
+        self.host, self.port = self.httpd.server_address[:2]
+        self._thread = None
+
+    def add_file(self, path, size, content_type="video/mp4"):
+        self.files[path] = (size, content_type)
+        return self.url(path)
+
+    def url(self, path):
+        return f"http://{self.host}:{self.port}{path}"
+
+    @staticmethod
+    def content(offset, length):
+        parts = []
+        while length > 0:
+            start = offset % 251
+            n = min(length, len(_PATTERN) - start)
+            parts.append(_PATTERN[start:start + n])
+            offset += n
+            length -= n
+        return b"".join(parts)
+
+    def inject(self, kind, count=1):
+        """
+        Makes the next `count` GET requests fail with `kind`, before any random faults.
+        """
+        if kind not in FAULT_KINDS: raise ValueError(f"unknown fault {kind!r}")
+        with self._lock:
+            self._scripted.extend([kind] * count)
+
+    def _next_fault(self):
+        with self._lock:
+            if self._scripted:
+                kind = self._scripted.pop(0)
+            else:
+                kind = None
+                for k, p in self.faults.items():
+                    if self._random.random() < p:
+                        kind = k
+                        break
+            if kind: self.stats[f'fault_{kind}'] += 1
+            return kind
+
+    def reset_stats(self):
+        with self._lock:
+            for k in self.stats: self.stats[k] = 0
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True, name="media-server")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--size-mb", type=float, default=50)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--rate-mb", type=float, default=0, help="per-connection cap in MB/s (0 = none)")
+    parser.add_argument("--fault", action="append", default=[], metavar="KIND=P",
+                        help=f"inject a fault ({', '.join(FAULT_KINDS)}) into this fraction of GETs; repeatable")
+    args = parser.parse_args()
+
+    faults = {k: float(p) for k, p in (f.split("=", 1) for f in args.fault)}
+    srv = MediaServer(port=args.port, latency=args.latency, rate=args.rate_mb * 1024 * 1024 or None, faults=faults)
+    print(srv.add_file("/video.mp4", int(args.size_mb * 1024 * 1024)))
+    srv.start()
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.stop()
@@ -0,0 +1,31 @@
+"""
+Captures a real extract_info result as a benchmark fixture.
+
+Needs network access. The output replaces (or adds to) the generated files
+in benchmarks/fixtures; signed URLs in it expire, which doesn't matter for
+replay.
+
+Usage: python benchmarks/record_fixture.py URL NAME
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import yt_dlp
+
+from fixtures.make_fixtures import write
+
+def main():
+    parser = argparse.ArgumentParser(description="Record an extractor fixture")
+    parser.add_argument("url")
+    parser.add_argument("name", help="fixture name, e.g. video_4k")
+    args = parser.parse_args()
+
+    with yt_dlp.YoutubeDL({'quiet': True, 'extract_flat': 'in_playlist'}) as ydl:
+        info = ydl.sanitize_info(ydl.extract_info(args.url, download=False))
+    print(write(args.name, info))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""
+Offline benchmark suite.
+
+Replays recorded extractor output (benchmarks/fixtures) through
+summarize_info / get_video_info / select_download_options, and runs
+download_stream end to end against the local media server. Nothing touches
+the network, so results are comparable between releases. One download
+runs with faults injected, to keep retries and hedging honest.
+
+Writes one JSON document: run metadata plus a list of results, each with
+`name`, `unit`, `value` (the headline number), `better` ('lower' or
+'higher') and details. With --baseline, results are compared against an
+earlier run and the exit code is 1 if any got worse by more than --tolerance.
+
+Usage:
+  python benchmarks/run_suite.py --out results.json
+  python benchmarks/run_suite.py --quick --baseline results.json
+  python benchmarks/run_suite.py --only replay
+"""
+import argparse
+import gzip
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+sys.path.insert(0, ROOT)
+
+import yt_dlp
+
+import core_downloader
+import staging
+from bandwidth import scheduler as bandwidth_scheduler
+from core_downloader import FormatIndex, download_stream, get_video_info, select_download_options, summarize_info
+from info_cache import InfoCache
+from local_media_server import MediaServer
+from telemetry import Trace
+
+FIXTURE_URLS = {
+    'video_small': "https://www.youtube.com/watch?v=fixtureSmal",
+    'video_4k': "https://www.youtube.com/watch?v=fixture4K00",
+    'playlist_1000': "https://www.youtube.com/playlist?list=PLfixture1000",
+}
+
+def load_fixture(name):
+    with gzip.open(os.path.join(FIXTURES, f"{name}.json.gz"), "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+def sample(fn, iterations, warmup=3):
+    for _ in range(warmup): fn()
+    times = []
+    for _ in range(iterations):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return times
+
+def time_result(name, times, **extra):
+    times = sorted(times)
+    us = [t * 1e6 for t in times]
+    return dict({
+        'name': name, 'unit': 'us', 'better': 'lower',
+        'value': round(statistics.median(us), 2),
+        'mean': round(statistics.mean(us), 2),
+        'p95': round(us[max(0, int(len(us) * 0.95) - 1)], 2),
+        'n': len(us),
+    }, **extra)
+
+class ReplayExtractor:
+    """
+    Stands in for core_downloader._extract_raw: returns the recorded dict for
+    a fixture URL and counts calls, so cache hits can be told apart from misses.
+    """
+    def __init__(self, fixtures):
+        self.by_url = {FIXTURE_URLS[k]: v for k, v in fixtures.items()}
+        self.calls = 0
+
+    def __call__(self, url):
+        self.calls += 1
+        return self.by_url[url]
+
+def bench_replay(args, fixtures, tmp):
+    """
+    Metadata path: summarizing, the cached get_video_info path, and the format picker.
+    """
+    results = []
+    n = args.iterations
+    replay = ReplayExtractor(fixtures)
+    real_extract, real_cache = core_downloader._extract_raw, core_downloader._info_cache
+    core_downloader._extract_raw = replay
+    try:
+        for name, info in fixtures.items():
+            url = FIXTURE_URLS[name]
+            count = max(5, n // 10) if name.startswith('playlist') else n
+            results.append(time_result(f"replay.summarize.{name}", sample(lambda: summarize_info(info, url), count)))
+
+            db = os.path.join(tmp, f"cache_{name}.sqlite3")
+            cache = core_downloader._info_cache = InfoCache(db_path=db, ttl=3600)
+
+            def cold():
+                cache.clear()
+                get_video_info(url)
+            results.append(time_result(f"replay.get_video_info.cold.{name}", sample(cold, count)))
+
+            get_video_info(url)
+            results.append(time_result(f"replay.get_video_info.memory_hit.{name}", sample(lambda: get_video_info(url), n)))
+
+            def disk_hit():
+                # A fresh cache object on the same file: what a restarted app sees
+                core_downloader._info_cache = InfoCache(db_path=db, ttl=3600)
+                get_video_info(url)
+            results.append(time_result(f"replay.get_video_info.disk_hit.{name}", sample(disk_hit, count)))
+
+            raw_formats = info.get('formats')
+            if raw_formats:
+                results.append(time_result(f"replay.format_index.{name}", sample(lambda: FormatIndex.from_formats(raw_formats), n),
+                                           formats=len(raw_formats)))
+                index = get_video_info(url)['formats']
+                results.append(time_result(f"replay.select_download_options.{name}", sample(lambda: select_download_options(index), n),
+                                           formats=len(index)))
+    finally:
+        core_downloader._extract_raw, core_downloader._info_cache = real_extract, real_cache
+    return results
+
+def bench_download(args, tmp):
+    """
+    download_stream end to end: per-call latency for small files and throughput for a large one.
+    """
+    results = []
+    with MediaServer(latency=args.latency, rate=args.rate_mb * 1024 * 1024 or None) as server:
+        small = server.add_file("/small.mp4", 256 * 1024)
+        out = os.path.join(tmp, "dl")
+        os.makedirs(out, exist_ok=True)
+
+        def fetch_small():
+            ok, msg = download_stream(small, None, out)
+            if not ok: raise RuntimeError(msg)
+        server.reset_stats()
+        results.append(time_result("download.small_256k.latency", sample(fetch_small, max(5, args.iterations // 20)),
+                                   requests=server.stats['requests'], connections=server.stats['connections']))
+
+        size = int(args.large_mb * 1024 * 1024)
+        large = server.add_file("/large.mp4", size)
+        for conns in (1, None):
+            label = conns or 'auto'
+            runs = []
+            for _ in range(args.download_runs):
+                with tempfile.TemporaryDirectory(dir=tmp) as d:
+                    t = time.perf_counter()
+                    ok, msg = download_stream(large, None, d, connections=conns)
+                    elapsed = time.perf_counter() - t
+                    if not ok: raise RuntimeError(msg)
+                    runs.append(size / elapsed / 1024 / 1024)
+            results.append({
+                'name': f"download.large_{args.large_mb:g}mb.connections_{label}.throughput",
+                'unit': 'MB/s', 'better': 'higher',
+                'value': round(statistics.median(runs), 2), 'runs': [round(r, 2) for r in runs],
+            })
+
+        results.append(bench_bandwidth_cap(args, server, tmp))
+        results.append(bench_disk_full(server, tmp))
+    results.append(bench_faults(args, tmp))
+    return results
+
+def bench_faults(args, tmp):
+    """
+    The large download with resets, 429/503 answers and slow responses mixed
+    in (same seed every run): time to a complete file, and how it got there.
+    """
+    size = int(args.large_mb * 1024 * 1024)
+    faults = {'reset': 0.05, '429': 0.05, '503': 0.05, 'slow': 0.1}
+    with MediaServer(latency=args.latency, rate=args.rate_mb * 1024 * 1024 or None, faults=faults, seed=7) as server:
+        url = server.add_file("/faulty.mp4", size)
+        with tempfile.TemporaryDirectory(dir=tmp) as d:
+            trace = Trace("faults")
+            t = time.perf_counter()
+            ok, msg = download_stream(url, None, d, connections=4, trace=trace)
+            elapsed = time.perf_counter() - t
+            if not ok: raise RuntimeError(msg)
+    return {
+        'name': f"download.faults_{args.large_mb:g}mb.seconds",
+        'unit': 's', 'better': 'lower', 'value': round(elapsed, 2),
+        'retries': trace.retries, 'counters': trace.counters,
+        'faults': {k: v for k, v in server.stats.items() if k.startswith('fault_') and v},
+    }
+
+def bench_bandwidth_cap(args, server, tmp):
+    """
+    Two downloads at once under a global cap, one with twice the weight:
+    how close the combined rate stays to the cap, and how the cap was split.
+    """
+    cap = args.cap_mb * 1024 * 1024
+    size = int(args.cap_mb * 1024 * 1024 * 2)
+    urls = [server.add_file(f"/capped_{i}.mp4", size) for i in range(2)]
+    finished = {}
+
+    def fetch(i, d):
+        ok, msg = download_stream(urls[i], None, d, bandwidth_weight=1.0 + i)
+        if not ok: raise RuntimeError(msg)
+        finished[i] = time.perf_counter()
+
+    bandwidth_scheduler.set_rate(cap)
+    try:
+        with tempfile.TemporaryDirectory(dir=tmp) as d:
+            threads = [threading.Thread(target=fetch, args=(i, d)) for i in range(2)]
+            t = time.perf_counter()
+            for th in threads: th.start()
+            for th in threads: th.join()
+    finally:
+        bandwidth_scheduler.set_rate(None)
+    elapsed = max(finished.values()) - t
+    return {
+        'name': f"download.bandwidth_cap_{args.cap_mb:g}mb.accuracy",
+        'unit': 'ratio', 'better': 'higher',
+        # 1.0 = the cap was fully used and never exceeded
+        'value': round(min(1.0, 2 * size / elapsed / cap), 3),
+        'achieved_mb_s': round(2 * size / elapsed / 1024 / 1024, 2),
+        # With weights 2:1 the heavier job should finish at about 3/4 of the total time
+        'weighted_finish_ratio': round((finished[1] - t) / elapsed, 3),
+    }
+
+def bench_disk_full(server, tmp):
+    """
+    A download that doesn't fit on the disk must fail before the transfer:
+    bytes the downloader received, and requests for byte ranges (both 0).
+    """
+    url = server.add_file("/too_big.mp4", 16 * 1024 * 1024)
+    received = []
+    def hook(d): received.append(d.get('downloaded_bytes') or 0)
+
+    real_reserve = staging.DISK_RESERVE
+    # No volume has this much free, so the preflight always refuses
+    staging.DISK_RESERVE = 10 ** 18
+    try:
+        with tempfile.TemporaryDirectory(dir=tmp) as d:
+            server.reset_stats()
+            ok, msg = download_stream(url, None, d, progress_hook=hook)
+            leftovers = [f for _, _, files in os.walk(d) for f in files]
+    finally:
+        staging.DISK_RESERVE = real_reserve
+    fetched = max(received, default=0)
+    if ok or fetched or server.stats['range_requests'] or leftovers:
+        raise RuntimeError(f"disk-space preflight let the download through: {msg} ({fetched} bytes, files: {leftovers})")
+    return {
+        'name': "download.disk_full.bytes_fetched",
+        'unit': 'bytes', 'better': 'lower', 'value': fetched,
+        'range_requests': server.stats['range_requests'], 'message': msg,
+    }
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        'commit': commit or None,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'yt_dlp': yt_dlp.version.__version__,
+    }
+
+def compare(results, baseline, tolerance):
+    """
+    Returns the results that got worse than the baseline by more than `tolerance` (a fraction).
+    """
+    old = {r['name']: r for r in baseline.get('results', [])}
+    regressions = []
+    for r in results:
+        b = old.get(r['name'])
+        if not b or not b['value']: continue
+        change = (r['value'] - b['value']) / b['value']
+        if r['better'] == 'higher': change = -change
+        r['baseline'] = b['value']
+        r['change'] = round(change, 4)
+        if change > tolerance: regressions.append(r)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite")
+    parser.add_argument("--out", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before failing (default 0.2 = 20%%)")
+    parser.add_argument("--only", help="run only results whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations, for CI smoke runs")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--large-mb", type=float, default=32)
+    parser.add_argument("--download-runs", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.02, help="media server latency per response (s)")
+    parser.add_argument("--cap-mb", type=float, default=4, help="global bandwidth cap for the fair-share run in MB/s")
+    parser.add_argument("--rate-mb", type=float, default=8, help="media server per-connection cap in MB/s (0 = none)")
+    args = parser.parse_args()
+    if args.quick:
+        args.iterations, args.large_mb, args.download_runs = 30, 8, 1
+
+    fixtures = {name: load_fixture(name) for name in FIXTURE_URLS}
+    with tempfile.TemporaryDirectory() as tmp:
+        results = []
+        if not args.only or "replay" in args.only or "select" in args.only:
+            results += bench_replay(args, fixtures, tmp)
+        if not args.only or "download" in args.only:
+            results += bench_download(args, tmp)
+    if args.only: results = [r for r in results if args.only in r['name']]
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+    doc = {'meta': metadata(), 'results': results}
+    if args.baseline: doc['regressions'] = [r['name'] for r in regressions]
+    text = json.dumps(doc, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    for r in regressions:
+        print(f"REGRESSION {r['name']}: {r['baseline']} -> {r['value']} {r['unit']} ({r['change']:+.0%})", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+"""
+Headless command line for the downloader, for servers and scripted runs.
+
+Reads links from the arguments, a file (-i FILE) or stdin, and prints one
+JSON line per item to stdout as soon as it finishes. Logs go to stderr.
+
+Usage:
+  python cli.py info URL [URL ...]
+  python cli.py download -f 720p -o downloads -j 4 < links.txt
+  python cli.py reindex -o downloads
+  python cli.py sync -f 720p -o downloads CHANNEL_OR_PLAYLIST_URL
+  python cli.py sync                      (re-checks every source synced before)
+
+Exit codes: 0 all items succeeded, 1 some failed, 2 bad usage or no links,
+3 every item failed, 130 interrupted.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from auto_quality import AUTO_PRESET
+from bandwidth import mb_per_s, scheduler as bandwidth_scheduler
+from core_downloader import get_video_info, playlist_entries
+from download_index import get_download_index
+from download_queue import DownloadQueue, DONE, FINAL_STATES
+from playlist_engine import PLAYLIST_PRESETS, entry_url
+from postprocess import get_postprocess_pool
+from sync import get_sync_archive, sync_source
+from telemetry import serve_metrics
+
+EXIT_OK = 0
+EXIT_PARTIAL = 1
+EXIT_USAGE = 2
+EXIT_ALL_FAILED = 3
+EXIT_INTERRUPTED = 130
+
+_print_lock = threading.Lock()
+
+def emit(record):
+    with _print_lock:
+        sys.stdout.write(json.dumps(record) + "\n")
+        sys.stdout.flush()
+
+def log(msg):
+    with _print_lock:
+        print(msg, file=sys.stderr, flush=True)
+
+def read_urls(args):
+    """
+    Links from the command line, then -i FILE ('-' for stdin). Blank lines and
+    '#' comments are skipped. Reads stdin when nothing else was given and it's piped.
+    """
+    urls = [u for u in args.urls if u != "-"]
+    source = "-" if "-" in args.urls else args.input
+    if source is None and not urls and not sys.stdin.isatty(): source = "-"
+    if source:
+        f = sys.stdin if source == "-" else open(source, encoding="utf-8")
+        with f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"): urls.append(line)
+    return urls
+
+def resolve_format(name):
+    """
+    Accepts a playlist preset key ('720p', 'audio_m4a', ...) or a raw yt-dlp format selector.
+    """
+    if name in PLAYLIST_PRESETS: return PLAYLIST_PRESETS[name][1]
+    return name
+
+def exit_code(ok, failed):
+    if failed and not ok: return EXIT_ALL_FAILED
+    if failed: return EXIT_PARTIAL
+    return EXIT_OK
+
+def run_info(args, urls):
+    """
+    Looks up metadata for every link on a bounded pool.
+    """
+    def lookup(url):
+        started = time.perf_counter()
+        info = get_video_info(url, use_cache=not args.no_cache)
+        record = {'url': url, 'elapsed_s': round(time.perf_counter() - started, 3)}
+        if 'error' in info:
+            record.update(ok=False, error=info['error'])
+        elif info.get('type') == 'playlist':
+            record.update(ok=True, type='playlist', title=info['title'], count=info['count'])
+        else:
+            record.update(ok=True, type='video', title=info['title'], duration=info.get('duration'),
+                          formats=[f.to_dict() for f in info['formats']])
+        emit(record)
+        return record['ok']
+
+    with ThreadPoolExecutor(max_workers=args.jobs, thread_name_prefix="cli-info") as pool:
+        results = list(pool.map(lookup, urls))
+    return exit_code(results.count(True), results.count(False))
+
+def expand_playlists(urls, no_cache):
+    """
+    Replaces playlist links by their entries (streamed page by page); other links pass through unchanged.
+    Yields (url, error): error is set for links that couldn't be looked up.
+    """
+    for url in urls:
+        # Channels, /@handle/videos and other sites' playlists have no list= in them; ask the extractor
+        info = get_video_info(url, use_cache=not no_cache)
+        if 'error' in info:
+            yield url, info['error']
+        elif info.get('type') == 'playlist':
+            count = info['count'] if info['count'] is not None else "an unknown number of"
+            log(f"Playlist '{info['title']}': {count} items")
+            # Later pages are listed while the first items are already downloading
+            try:
+                for entry in playlist_entries(info):
+                    yield entry_url(entry), None
+            except Exception as e:
+                yield url, f"Playlist listing stopped: {e}"
+        else:
+            yield url, None
+
+def run_download(args, urls):
+    """
+    Feeds every link to a DownloadQueue with `args.jobs` workers and reports each job as it finishes.
+    """
+    os.makedirs(args.output, exist_ok=True)
+    fmt = resolve_format(args.format)
+    options = {'connections': args.connections, 'force': args.force, 'scratch_dir': args.scratch_dir}
+    if fmt == AUTO_PRESET:
+        options.update(budget_seconds=args.max_minutes * 60 if args.max_minutes else None,
+                       budget_bytes=args.max_mb * 1024 * 1024 if args.max_mb else None)
+    counts = {'ok': 0, 'failed': 0}
+    pending = {}
+    all_done = threading.Condition()
+    queue = DownloadQueue(max_workers=args.jobs, postprocess=get_postprocess_pool())
+
+    def on_job(job):
+        if job.status not in FINAL_STATES: return
+        with all_done:
+            if pending.pop(job.id, None) is None: return # already reported
+            counts['ok' if job.status == DONE else 'failed'] += 1
+            all_done.notify_all()
+        record = job.to_dict()
+        record.update(
+            ok=job.status == DONE,
+            elapsed_s=round((job.finished_at or time.time()) - (job.started_at or job.created_at), 3),
+            wait_s=round((job.started_at or job.created_at) - job.created_at, 3),
+            requested_format=fmt,
+        )
+        if job.status != DONE: record['error'] = job.message
+        emit(record)
+
+    queue.add_listener(on_job)
+    started = time.perf_counter()
+    try:
+        for url, error in expand_playlists(urls, args.no_cache):
+            if error:
+                counts['failed'] += 1
+                emit({'url': url, 'ok': False, 'status': 'failed', 'error': error})
+                continue
+            with all_done:
+                job = queue.submit(url, fmt, args.output, **options)
+                pending[job.id] = job
+        with all_done:
+            while pending: all_done.wait()
+    except KeyboardInterrupt:
+        log("Interrupted, cancelling running downloads")
+        queue.shutdown()
+        return EXIT_INTERRUPTED
+
+    queue.shutdown()
+    total = counts['ok'] + counts['failed']
+    log(f"{counts['ok']}/{total} succeeded in {time.perf_counter() - started:.1f}s")
+    return exit_code(counts['ok'], counts['failed'])
+
+def run_reindex(args):
+    """
+    Rebuilds the download index from the files in the output folder.
+    """
+    started = time.perf_counter()
+    counts = get_download_index().rebuild(args.output)
+    emit(dict(counts, folder=os.path.abspath(args.output), elapsed_s=round(time.perf_counter() - started, 3)))
+    return EXIT_OK
+
+def run_sync(args, urls):
+    """
+    Downloads only what's new in each source; with no links, re-checks every
+    source synced before with its saved preset and folder.
+    Prints one record per finished download and a summary per source.
+    """
+    archive = get_sync_archive()
+    saved = {s['url']: s for s in archive.sources()}
+    if not urls: urls = list(saved)
+    if not urls:
+        log("No links given and no sources synced yet")
+        return EXIT_USAGE
+
+    counts = {'ok': 0, 'failed': 0}
+    queue = DownloadQueue(max_workers=args.jobs, postprocess=get_postprocess_pool())
+
+    def on_job(job):
+        record = job.to_dict()
+        record['ok'] = job.status == DONE
+        if job.status != DONE: record['error'] = job.message
+        emit(record)
+
+    try:
+        for url in urls:
+            prev = saved.get(url, {})
+            preset = args.format or prev.get('preset') or "best"
+            output = args.output or prev.get('output_dir') or "downloads"
+            os.makedirs(output, exist_ok=True)
+            try:
+                summary = sync_source(queue, archive, url, preset, output, full=args.full,
+                                      mark_only=args.mark_only, on_job=on_job)
+            except Exception as e:
+                counts['failed'] += 1
+                emit({'url': url, 'ok': False, 'type': 'sync', 'error': str(e)})
+                continue
+            incomplete = summary['failed'] or summary['paused']
+            counts['failed' if incomplete else 'ok'] += 1
+            emit(dict(summary, ok=not incomplete, type='sync'))
+            log(f"{summary['title'] or url}: {summary['new']} new, {summary['downloaded']} downloaded, "
+                f"{summary['failed']} failed, {summary['paused']} paused ({summary['checked']} entries checked)")
+    except KeyboardInterrupt:
+        log("Interrupted, cancelling running downloads")
+        queue.shutdown()
+        return EXIT_INTERRUPTED
+
+    queue.shutdown()
+    return exit_code(counts['ok'], counts['failed'])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless YouTube downloader (JSON lines on stdout)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(p):
+        p.add_argument("urls", nargs="*", help="links to process (default: read from -i or stdin)")
+        p.add_argument("-i", "--input", help="file with one link per line, '-' for stdin")
+        p.add_argument("-j", "--jobs", type=int, default=2, help="items processed at once (default 2)")
+        p.add_argument("--no-cache", action="store_true", help="always extract fresh metadata")
+        p.add_argument("--metrics-port", type=int, default=0, help="serve Prometheus metrics on this port while running")
+
+    add_common(sub.add_parser("info", help="print metadata for each link"))
+    dl = sub.add_parser("download", help="download each link")
+    add_common(dl)
+    dl.add_argument("-f", "--format", default="best",
+                    help=f"preset ({', '.join(PLAYLIST_PRESETS)}) or a yt-dlp format selector (default best)")
+    dl.add_argument("-o", "--output", default="downloads", help="output folder (default downloads)")
+    dl.add_argument("-c", "--connections", type=int, default=None, help="connections per file (default auto)")
+    dl.add_argument("--force", action="store_true", help="download again even if the file is already in the download index")
+    dl.add_argument("-r", "--limit-rate", type=float, default=0, help="total download cap in MB/s, shared by all jobs (default none)")
+    dl.add_argument("--scratch-dir", help="folder for partial files and merges (default: .incomplete inside the output folder)")
+    dl.add_argument("--max-minutes", type=float, default=0, help="with -f auto: best quality that downloads within this many minutes")
+    dl.add_argument("--max-mb", type=float, default=0, help="with -f auto: best quality of at most this many MB per video")
+
+    reindex = sub.add_parser("reindex", help="rebuild the download index by scanning the output folder")
+    reindex.add_argument("-o", "--output", default="downloads", help="folder to scan (default downloads)")
+
+    sync = sub.add_parser("sync", help="download only the videos added to playlists/channels since the last sync")
+    add_common(sync)
+    sync.add_argument("-f", "--format", default=None, help="preset or format selector (default: as last synced, else best)")
+    sync.add_argument("-o", "--output", default=None, help="output folder (default: as last synced, else downloads)")
+    sync.add_argument("--full", action="store_true", help="list every entry instead of stopping at already synced ones")
+    sync.add_argument("--mark-only", action="store_true", help="record the current entries as synced without downloading them")
+    sync.add_argument("-r", "--limit-rate", type=float, default=0, help="total download cap in MB/s (default none)")
+
+    args = parser.parse_args(argv)
+    if args.command == "reindex": return run_reindex(args)
+    if args.jobs < 1: parser.error("--jobs must be at least 1")
+    try:
+        urls = read_urls(args)
+    except OSError as e:
+        log(f"Cannot read links: {e}")
+        return EXIT_USAGE
+    if not urls and args.command != "sync":
+        log("No links given")
+        return EXIT_USAGE
+    if args.metrics_port: serve_metrics(args.metrics_port)
+    if getattr(args, 'limit_rate', 0): bandwidth_scheduler.set_rate(mb_per_s(args.limit_rate))
+
+    try:
+        if args.command == "info": return run_info(args, urls)
+        if args.command == "sync": return run_sync(args, urls)
+        return run_download(args, urls)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+
+if __name__ == "__main__":
+    sys.exit(main())
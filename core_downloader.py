@@ -1,5 +1,27 @@
 import yt_dlp
+import itertools
 import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from yt_dlp.postprocessor import MoveFilesAfterDownloadPP
+from yt_dlp.utils import LazyList, PagedList, PlaylistEntries, get_compatible_ext
+
+from app_config import data_path
+from info_cache import InfoCache, canonical_key
+from session_pool import get_session_pool
+from segmented_download import SegmentedDownloadPP, tuner as connection_tuner
+from audio_presets import AUDIO_PRESETS, AudioTiming, codec_family, plan_audio
+from auto_quality import AUTO_PRESET, pick_format
+from download_index import get_download_index, tagged_preset, video_id_for
+from staging import DiskSpacePP, copy_atomic, publish, remove_if_empty, scratch_dir as get_scratch_dir
+import bandwidth
+import resilience
+import telemetry
 
 def format_size(bytes_val):
     if not bytes_val: return "N/A"
@@ -9,131 +31,779 @@ def format_size(bytes_val):
         bytes_val /= 1024
     return f"{bytes_val:.1f} TB"
 
-def get_video_info(url):
-    # ... (rest of docstring and ydl_opts)
-    ydl_opts = {
-        'quiet': True,
-        'extract_flat': 'in_playlist', 
-    }
-    
+def format_duration(seconds):
+    if not seconds: return "--:--"
+    seconds = int(seconds)
+    h, m, s = seconds // 3600, seconds // 60 % 60, seconds % 60
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+
+# Format lists are stable for a while; playlists change more often.
+INFO_CACHE_TTL = 3600
+PLAYLIST_CACHE_TTL = 600
+# Bump when the cached summary layout changes so old entries are ignored
+INFO_FORMAT_VERSION = 4
+# Playlist entries are read (and cached) this many at a time; see PlaylistStream
+PLAYLIST_PAGE_SIZE = 100
+
+_info_cache = None
+
+def get_info_cache():
+    global _info_cache
+    if _info_cache is None:
+        _info_cache = InfoCache(db_path=data_path("info_cache.sqlite3"), ttl=INFO_CACHE_TTL)
+        telemetry.metrics.add_collector(_info_cache_metrics)
+    return _info_cache
+
+def _info_cache_metrics():
+    return [(f"ytdl_info_cache_{k}", v, {}) for k, v in get_info_cache_stats().items()]
+
+def get_info_cache_stats():
+    return get_info_cache().stats()
+
+def get_video_info(url, use_cache=True):
+    """
+    Returns video/playlist metadata for the UI.
+    Results are cached per canonical video ID and concurrent lookups of
+    the same link share a single extraction.
+    """
+    if not use_cache:
+        info = _extract_video_info(url)
+        if info.get('type') == 'video': info['formats'] = FormatIndex.from_rows(info['formats'])
+        return info
+
+    key = f"{canonical_key(url)}#v{INFO_FORMAT_VERSION}"
+    info = get_info_cache().get_or_load(
+        key,
+        lambda: _extract_video_info(url),
+        should_store=lambda i: 'error' not in i,
+        ttl=PLAYLIST_CACHE_TTL if key.startswith("yt:playlist:") else INFO_CACHE_TTL
+    )
+    if 'error' in info: return info
+
+    # Cached entries are shared; hand out a copy that points at the link the user gave us
+    info = dict(info)
+    info['original_url'] = url
+    if info.get('type') == 'video':
+        info['formats'] = _format_index(key, info['formats'])
+    return info
+
+_indexes = OrderedDict() # cache key -> (rows, FormatIndex), so memory hits don't re-index
+_indexes_lock = threading.Lock()
+MAX_INDEXES = 512
+
+def _format_index(key, rows):
+    with _indexes_lock:
+        entry = _indexes.get(key)
+        if entry and entry[0] is rows:
+            _indexes.move_to_end(key)
+            return entry[1]
+    index = FormatIndex.from_rows(rows)
+    with _indexes_lock:
+        _indexes[key] = (rows, index)
+        _indexes.move_to_end(key)
+        while len(_indexes) > MAX_INDEXES: _indexes.popitem(last=False)
+    return index
+
+# Fixed options for the pooled YoutubeDL sessions (see session_pool.py)
+_ytdl_logger = telemetry.YtdlLogger() # retries and errors go to telemetry, not the console
+EXTRACT_PROFILE = {
+    'quiet': True,
+    'extract_flat': 'in_playlist', 
+    'socket_timeout': 20,
+    'logger': _ytdl_logger,
+}
+DOWNLOAD_PROFILE = {
+    'quiet': True,
+    'noprogress': True, # progress goes to our hooks, not the console
+    # A read that returns nothing for this long is retried rather than waited on
+    'socket_timeout': resilience.STALL_TIMEOUT,
+    # yt-dlp's API default is no retries for a single-stream download
+    'retries': resilience.REQUEST_RETRIES,
+    'fragment_retries': resilience.REQUEST_RETRIES,
+    # Jittered backoff between yt-dlp's own fragment/stream retries, cut short on pause/cancel
+    'retry_sleep_functions': {'http': resilience.ytdl_sleep_function(), 'fragment': resilience.ytdl_sleep_function()},
+    'logger': _ytdl_logger,
+}
+
+def _sessions():
+    pool = get_session_pool()
+    pool.register_profile('extract', EXTRACT_PROFILE)
+    pool.register_profile('download', DOWNLOAD_PROFILE)
+    return pool
+
+def warm_sessions():
+    """
+    Builds an extraction session ahead of the first lookup; creating the
+    first YoutubeDL loads yt-dlp's extractor classes.
+    """
+    _sessions().warm('extract')
+
+def _extract_raw(url):
+    with _sessions().session('extract') as ydl:
+        info = _extract_unprocessed(ydl, url)
+        if info.get('_type') in ('playlist', 'multi_video'):
+            # Only the first page is read here; PlaylistStream enumerates the rest on demand
+            return _first_page(ydl, info)
+        return ydl.process_ie_result(info, download=False)
+
+def _extract_unprocessed(ydl, url, max_redirects=3):
+    """
+    extract_info without processing, following 'url' results (e.g. a channel
+    link pointing at its uploads tab), so playlists come back with lazy entries.
+    """
+    info = ydl.extract_info(url, download=False, process=False)
+    for _ in range(max_redirects):
+        if info.get('_type') not in ('url', 'url_transparent'): break
+        info = ydl.extract_info(info['url'], download=False, ie_key=info.get('ie_key'), process=False)
+    return info
+
+def _iter_entries(ydl, info, start=1):
+    """
+    Raw entries from position `start` on. Generators are read directly:
+    PlaylistEntries would wrap them in a LazyList that keeps every entry seen.
+    Lists and paged lists go through PlaylistEntries and the session's playlist_items range.
+    """
+    entries = info.get('entries')
+    if entries is not None and not isinstance(entries, (list, PagedList, LazyList)):
+        return (e for e in islice(entries, start - 1, None) if e)
+    return (e for _, e in PlaylistEntries(ydl, info).get_requested_items() if e)
+
+def _first_page(ydl, info):
+    # One entry past the page tells whether there is more
+    page = list(islice(_iter_entries(ydl, info), PLAYLIST_PAGE_SIZE + 1))
+    info = dict(info, entries=page[:PLAYLIST_PAGE_SIZE])
+    info['_complete'] = len(page) <= PLAYLIST_PAGE_SIZE
+    return info
+
+def _extract_video_info(url):
+    started = time.monotonic()
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            
-            if 'entries' in info:
-                # Playlist logic
-                return {
-                    'type': 'playlist',
-                    'title': info.get('title', 'Unknown Playlist'),
-                    'thumbnail': None, 
-                    'count': len(info['entries']),
-                    'entries': info['entries']
-                }
-            else:
-                # Single video
-                formats = []
-                for f in info.get('formats', []):
-                    size_bytes = f.get('filesize') or f.get('filesize_approx')
-                    size_str = format_size(size_bytes) if size_bytes else "Unknown Size"
-                    
-                    # Extract height safely
-                    h = f.get('height')
-                    if not isinstance(h, int): continue # Skip non-video/weird streams
-                    
-                    # Base Format Dict
-                    fmt = {
-                        'format_id': f['format_id'],
-                        'ext': f['ext'],
-                        'height': h,
-                        'note': f.get('format_note', ''),
-                        'filesize_str': size_str,
-                        'filesize_raw': size_bytes or 0
-                    }
-
-                    if f.get('vcodec') != 'none' and f.get('acodec') != 'none':
-                         fmt['type'] = 'video+audio'
-                         fmt['note'] = 'Standard'
-                         formats.append(fmt)
-                    elif f.get('vcodec') != 'none':
-                         fmt['type'] = 'video'
-                         fmt['note'] = 'Video Only'
-                         formats.append(fmt)
-                    elif f.get('acodec') != 'none':
-                        # Audio items usually have None height, so logic above skips them.
-                        # We need separate logic or check.
-                        pass 
-                
-                # Audio Pass
-                for f in info.get('formats', []):
-                    if f.get('vcodec') == 'none' and f.get('acodec') != 'none':
-                         size_bytes = f.get('filesize') or f.get('filesize_approx')
-                         formats.append({
-                             'format_id': f['format_id'],
-                             'ext': f['ext'],
-                             'abr': f.get('abr', 0),
-                             'note': f.get('format_note', 'Audio Only'),
-                             'filesize_str': format_size(size_bytes) if size_bytes else "Unknown Size",
-                             'type': 'audio'
-                        })
-                
-                return {
-                    'type': 'video',
-                    'title': info.get('title', 'Unknown Title'),
-                    'thumbnail': info.get('thumbnail'),
-                    'duration': info.get('duration_string'),
-                    'formats': formats,
-                    'original_url': url
-                }
+        info = summarize_info(_extract_raw(url), url)
+        telemetry.metrics.inc("ytdl_extractions_total", result="ok")
+        return info
     except Exception as e:
+        telemetry.metrics.inc("ytdl_extractions_total", result=telemetry.error_class(e))
         return {'error': str(e)}
+    finally:
+        telemetry.metrics.observe("ytdl_phase_seconds", time.monotonic() - started, phase="lookup")
 
-def download_stream(url, format_id, output_folder, progress_hook=None):
+# Format kinds
+MUXED = 'video+audio'
+VIDEO_ONLY = 'video'
+AUDIO_ONLY = 'audio'
+
+class FormatRecord:
+    """
+    One downloadable format, numbers only; sizes are formatted by the UI.
+    `filesize` is 0 and `abr` 0.0 when unknown; `height` is 0 for audio.
+    `estimated` is set when the size was worked out from bitrate and duration.
+    """
+    __slots__ = ('format_id', 'kind', 'ext', 'height', 'abr', 'filesize', 'acodec', 'estimated')
+
+    def __init__(self, format_id, kind, ext, height, abr, filesize, acodec, estimated=False):
+        self.format_id = format_id
+        self.kind = kind
+        self.ext = ext
+        self.height = height
+        self.abr = abr
+        self.filesize = filesize
+        self.acodec = acodec
+        self.estimated = estimated
+
+    @property
+    def has_video(self):
+        return self.kind != AUDIO_ONLY
+
+    @property
+    def needs_audio(self):
+        return self.kind == VIDEO_ONLY
+
+    def selector(self, fallback="best"):
+        """
+        yt-dlp format selector for this stream (plus the best audio if it has
+        none), or `fallback` if it has disappeared by the time of the download.
+        """
+        own = f"{self.format_id}+bestaudio" if self.needs_audio else self.format_id
+        return f"{own}/{fallback}"
+
+    def row(self):
+        return [self.format_id, self.kind, self.ext, self.height, self.abr, self.filesize, self.acodec, self.estimated]
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+class FormatIndex:
+    """
+    Formats of one video, indexed in a single pass: the largest format per
+    height, the best audio per ~10 kbps bitrate bucket, and the best audio
+    per codec family (for the no-re-encode audio presets).
+    Stored in the info cache as plain rows (see rows()/from_rows()).
+    """
+    __slots__ = ('records', 'best_by_height', 'best_by_abr_bucket', 'best_by_codec', 'best_audio')
+
+    def __init__(self):
+        self.records = []
+        self.best_by_height = {}
+        self.best_by_abr_bucket = {}
+        self.best_by_codec = {}
+        self.best_audio = None
+
+    @classmethod
+    def from_formats(cls, formats, duration=None):
+        """
+        Builds the index straight from yt-dlp's format dicts. Formats without
+        a size get one from their bitrate and the video's `duration` (seconds).
+        """
+        index = cls()
+        add = index._add
+        for f in formats:
+            vcodec, acodec = f.get('vcodec'), f.get('acodec')
+            if vcodec != 'none':
+                h = f.get('height')
+                if not isinstance(h, int): continue # Skip non-video/weird streams
+                kind = VIDEO_ONLY if acodec == 'none' else MUXED
+            elif acodec != 'none':
+                kind, h = AUDIO_ONLY, 0
+            else:
+                continue
+            size = f.get('filesize') or f.get('filesize_approx') or 0
+            estimated = False
+            if not size and duration:
+                # kbit/s -> bytes over the whole video
+                kbps = f.get('tbr') or (f.get('vbr') or 0) + (f.get('abr') or 0)
+                size = int(kbps * 125 * duration)
+                estimated = bool(size)
+            add(FormatRecord(f['format_id'], kind, f['ext'], h, f.get('abr') or 0.0, size, acodec, estimated))
+        return index
+
+    @classmethod
+    def from_rows(cls, rows):
+        index = cls()
+        for row in rows: index._add(FormatRecord(*row))
+        return index
+
+    def rows(self):
+        return [r.row() for r in self.records]
+
+    def _add(self, rec):
+        self.records.append(rec)
+        if rec.kind == AUDIO_ONLY:
+            key = (rec.abr, rec.filesize)
+            best = self.best_audio
+            if best is None or key > (best.abr, best.filesize): self.best_audio = rec
+            family = codec_family(rec.acodec)
+            best = self.best_by_codec.get(family)
+            if best is None or key > (best.abr, best.filesize): self.best_by_codec[family] = rec
+            if rec.abr:
+                # Group bitrates closely (e.g. 128 vs 130)
+                bucket = round(rec.abr, -1)
+                best = self.best_by_abr_bucket.get(bucket)
+                if best is None or key > (best.abr, best.filesize): self.best_by_abr_bucket[bucket] = rec
+        elif rec.height:
+            best = self.best_by_height.get(rec.height)
+            if best is None or rec.filesize > best.filesize: self.best_by_height[rec.height] = rec
+
+    def video_options(self):
+        """
+        One format per height, highest first.
+        """
+        return [self.best_by_height[h] for h in sorted(self.best_by_height, reverse=True)]
+
+    def audio_options(self):
+        """
+        One audio format per bitrate bucket, highest first.
+        """
+        return [self.best_by_abr_bucket[b] for b in sorted(self.best_by_abr_bucket, reverse=True)]
+
+    def best_video(self, max_height=None):
+        heights = [h for h in self.best_by_height if max_height is None or h <= max_height]
+        return self.best_by_height[max(heights)] if heights else None
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+def summarize_info(info, url):
+    """
+    Turns a raw yt-dlp extract_info dict into the compact video/playlist
+    dict the UI uses. Pure, so recorded extractor output can be replayed.
+    Video formats are stored as FormatIndex rows; get_video_info hands out
+    the built index.
+    """
+    if 'entries' in info:
+        # Playlist logic: only the first page is kept, the rest is streamed (PlaylistStream)
+        entries = list(info['entries'] or [])
+        complete = info.get('_complete', True) and len(entries) <= PLAYLIST_PAGE_SIZE
+        if info.get('_complete', True): count = len(entries)
+        else: count = info.get('playlist_count') # None when the site doesn't say
+        return {
+            'type': 'playlist',
+            'title': info.get('title', 'Unknown Playlist'),
+            'thumbnail': None, 
+            'count': count,
+            'complete': complete,
+            'entries': [compact_entry(e) for e in entries[:PLAYLIST_PAGE_SIZE]]
+        }
+    return {
+        'type': 'video',
+        'title': info.get('title', 'Unknown Title'),
+        'thumbnail': info.get('thumbnail'),
+        'duration': info.get('duration_string'),
+        'formats': FormatIndex.from_formats(info.get('formats') or [], info.get('duration')).rows(),
+        'original_url': url
+    }
+
+def compact_entry(entry):
+    """
+    The few fields of a flat playlist entry the app uses; raw entries carry
+    several thumbnail dicts each, which adds up over tens of thousands of them.
+    """
+    thumbs = entry.get('thumbnails') or []
+    return {
+        'id': entry.get('id'),
+        'url': entry.get('url') or entry.get('webpage_url'),
+        'title': entry.get('title'),
+        'duration': entry.get('duration'),
+        'ie_key': entry.get('ie_key'),
+        'thumbnail': entry.get('thumbnail') or (thumbs[-1].get('url') if thumbs else None),
+    }
+
+class PlaylistStream:
+    """
+    Enumerates a playlist lazily, one page of compact entries at a time,
+    without ever holding the whole list. yt-dlp's own paging fetches each
+    continuation only when the previous page has been consumed; `start`
+    skips entries already seen (via the playlist_items range for paged lists).
+
+        stream = PlaylistStream(url, start=101)
+        for page in stream.pages(): ...
+
+    `title` and `reported_count` (the site's own count, often None) are set
+    once the first page is in; `enumerated` counts entries yielded so far.
+    Extraction errors propagate from pages().
+    """
+    def __init__(self, url, page_size=PLAYLIST_PAGE_SIZE, start=1):
+        self.url = url
+        self.page_size = page_size
+        self.start = start
+        self.title = None
+        self.reported_count = None
+        self.enumerated = 0
+        self.finished = False
+
+    def pages(self):
+        # The session stays checked out while the caller works through the pages
+        with _sessions().session('extract', playlist_items=f"{self.start}:") as ydl:
+            info = _extract_unprocessed(ydl, self.url)
+            self.title = info.get('title')
+            if info.get('_type') not in ('playlist', 'multi_video'):
+                # A single video: a one-entry "playlist"
+                self.enumerated = 1
+                self.finished = True
+                yield [compact_entry(dict(info, url=self.url))]
+                return
+            self.reported_count = info.get('playlist_count')
+            items = _iter_entries(ydl, info, self.start)
+            while True:
+                page = [compact_entry(e) for e in islice(items, self.page_size)]
+                if not page: break
+                self.enumerated += len(page)
+                yield page
+        self.finished = True
+
+    def __iter__(self):
+        for page in self.pages():
+            yield from page
+
+def playlist_entries(info):
+    """
+    Every entry of a playlist summary from get_video_info: the cached first
+    page, then the rest streamed page by page.
+    """
+    first = info.get('entries') or []
+    yield from first
+    if not info.get('complete', True):
+        yield from PlaylistStream(info['original_url'], start=len(first) + 1)
+
+def select_download_options(index):
+    """
+    Picks the rows the format picker shows from a FormatIndex.
+    Returns (audio_presets, audio_formats, video_formats): preset dicts with
+    'id', 'label', 'ext' and 'size' (bytes, 0 if unknown before conversion),
+    then FormatRecords, best first.
+    """
+    presets = []
+    # Converted / copied presets; the plan says whether a re-encode is needed
+    for preset_id, (label, codec, _) in AUDIO_PRESETS.items():
+        plan = plan_audio(index, preset_id)
+        src = plan['source']
+        presets.append({
+            'id': preset_id, 'label': label, 'ext': codec,
+            'size': src.filesize if plan['copy'] and src else 0,
+        })
+    return presets, index.audio_options(), index.video_options()
+
+class InfoLookup:
+    """
+    Runs get_video_info on a background pool so UI handlers never block.
+    Only the most recent lookup reports back; older ones are cancelled
+    if they haven't started yet, or their results are dropped.
+    Pass a shared `pool` (an executor) to run several sessions' lookups on the same threads.
+    """
+    def __init__(self, max_workers=2, slow_after=4.0, timeout=45.0, prefetch_delay=0.6, pool=None):
+        self.slow_after = slow_after
+        self.timeout = timeout
+        self.prefetch_delay = prefetch_delay
+        self._owns_pool = pool is None
+        self._pool = pool or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="info-lookup")
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._future = None
+        self._prefetch_timer = None
+
+    def submit(self, url, on_done, on_slow=None, on_timeout=None):
+        """
+        Starts a lookup. Callbacks run on a worker thread:
+        on_done(info, elapsed), on_slow(elapsed), on_timeout(elapsed).
+        """
+        with self._lock:
+            self._generation += 1
+            gen = self._generation
+            if self._future: self._future.cancel()
+            started = time.monotonic()
+            future = self._future = self._pool.submit(get_video_info, url)
+
+        def is_current(): return gen == self._generation
+
+        # Latency budget: warn once, then give up on this request (the extraction
+        # itself keeps running and still lands in the cache for the next try).
+        def _slow():
+            if is_current() and not future.done() and on_slow:
+                on_slow(time.monotonic() - started)
+
+        def _timeout():
+            if is_current() and not future.done():
+                self.cancel()
+                if on_timeout: on_timeout(time.monotonic() - started)
+
+        timers = [threading.Timer(self.slow_after, _slow), threading.Timer(self.timeout, _timeout)]
+        for t in timers:
+            t.daemon = True
+            t.start()
+
+        def _done(f):
+            for t in timers: t.cancel()
+            if f.cancelled() or not is_current(): return
+            try:
+                info = f.result()
+            except Exception as e:
+                info = {'error': str(e)}
+            on_done(info, time.monotonic() - started)
+
+        future.add_done_callback(_done)
+        return gen
+
+    def prefetch(self, url):
+        """
+        Debounced warm-up for a link that is still being typed/pasted.
+        The result only fills the info cache; a later submit() for the same
+        link joins the running extraction instead of starting a new one.
+        """
+        with self._lock:
+            if self._prefetch_timer: self._prefetch_timer.cancel()
+            if not url or not url.startswith(("http://", "https://")): return
+            self._prefetch_timer = threading.Timer(self.prefetch_delay, lambda: self._pool.submit(get_video_info, url))
+            self._prefetch_timer.daemon = True
+            self._prefetch_timer.start()
+
+    def cancel(self):
+        """
+        Supersedes whatever lookup is in flight.
+        """
+        with self._lock:
+            self._generation += 1
+            if self._future: self._future.cancel()
+            self._future = None
+
+    def close(self):
+        """
+        Drops pending work, e.g. when the session that owns this lookup ends.
+        """
+        self.cancel()
+        with self._lock:
+            if self._prefetch_timer: self._prefetch_timer.cancel()
+            self._prefetch_timer = None
+        if self._owns_pool: self._pool.shutdown(wait=False, cancel_futures=True)
+
+def download_stream(url, format_id, output_folder, progress_hook=None, connections=None, trace=None,
+                    bandwidth_key=None, bandwidth_weight=1.0, force=False, postprocess=None,
+                    budget_seconds=None, budget_bytes=None, hedge=True, scratch_dir=None):
     """
     Downloads a specific format. 
-    If format_id is 'best_audio', it converts to MP3.
+    If format_id is an audio preset (see audio_presets.py), the audio stream
+    is copied when its codec already matches and converted otherwise.
+    `connections` sets parallel connections per file (1 = single stream,
+    None = auto-tuned from earlier downloads from the same host).
+    `trace` (a telemetry.Trace) gets spans for extraction, transfers and postprocessing.
+    The transfer draws from the global bandwidth cap (see bandwidth.py) under
+    `bandwidth_key` with `bandwidth_weight` (a bigger weight, a bigger share).
+    A video already fetched in this format is reused from the download index
+    unless `force` is set.
+    With `postprocess` (a postprocess.PostprocessPool), merging and conversion
+    run there after the transfer: the call returns as soon as the streams are
+    on disk, with a Future for the final (success, message) in place of the message.
+    The 'auto' preset picks the best video that downloads within
+    `budget_seconds` at the recently measured speed and/or fits in
+    `budget_bytes` (see auto_quality.py).
+    Failed requests are retried per error class with backoff (see
+    resilience.py); if the whole attempt still fails with a retryable error,
+    it is started again, resuming from the partial files. `hedge=False` turns
+    off duplicate requests for slow segments.
+    Partial files, separate streams and merges are written to `scratch_dir`
+    (default: a hidden .incomplete folder in `output_folder`) after checking
+    there is room for them; the finished file is then moved into
+    `output_folder` in one step (see staging.py).
     """
-    
+    if format_id == AUTO_PRESET:
+        # Resolved first, so the download index is keyed on the format actually fetched
+        choice = pick_format(get_video_info(url).get('formats'), budget_seconds, budget_bytes)
+        format_id = choice['format']
+    index = get_download_index()
+    video_id = video_id_for(url)
+    existing = None if force else index.lookup(video_id, format_id, _expected_file(url, format_id))
+    if existing: return _reuse_download(existing, output_folder, progress_hook, trace)
+
+    conns = connections or connection_tuner.suggest(url)
+    try:
+        scratch = get_scratch_dir(output_folder, scratch_dir)
+    except OSError as e:
+        return False, f"Unexpected Error: could not create scratch folder: {e}"
+    lease = bandwidth.scheduler.open(bandwidth_key, bandwidth_weight)
     ydl_opts = {
-        'outtmpl': os.path.join(output_folder, '%(title)s.%(ext)s'),
-        'progress_hooks': [progress_hook] if progress_hook else [],
-        'quiet': True,
-        'overwrites': True
+        # The ID keeps same-titled videos apart and lets the index be rebuilt from the folder
+        'outtmpl': os.path.join(scratch, '%(title)s [%(id)s]%(height& {}p|)s.%(ext)s'),
+        'progress_hooks': [h for h in (progress_hook, trace and trace.progress_hook, _throttle_hook(lease)) if h],
+        'postprocessor_hooks': [trace.postprocessor_hook] if trace else [],
+        'overwrites': True,
+        # Keep and continue .part files, so interrupted jobs resume where they stopped
+        'continuedl': True,
+        # DASH/HLS fragments in parallel; large progressive files get ranged segments
+        'concurrent_fragment_downloads': conns,
+        'extra_postprocessors': [
+            (SegmentedDownloadPP(connections=connections, hedge=hedge), 'before_dl'),
+            # After the segmented step, which may have probed the missing sizes
+            (DiskSpacePP(scratch=scratch, target=output_folder, converts=format_id in AUDIO_PRESETS), 'before_dl'),
+        ],
     }
+    if bandwidth.scheduler.rate:
+        # Fixed small reads, so the throttle is charged in small steps instead of multi-MB bursts
+        ydl_opts.update({'buffersize': THROTTLED_BUFFER, 'noresizebuffer': True})
 
-    if format_id == 'audio_mp3_best':
+    timing = None
+    if format_id in AUDIO_PRESETS:
+        # The format list is normally cached from the lookup the user just did
+        info = get_video_info(url)
+        plan = plan_audio(info.get('formats'), format_id)
+        timing = AudioTiming(plan)
         ydl_opts.update({
-            'format': 'bestaudio/best',
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }],
-        })
-    elif format_id == 'audio_mp3_320':
-        ydl_opts.update({
-            'format': 'bestaudio/best',
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '320',
-            }],
+            'format': plan['format'],
+            'postprocessors': [plan['postprocessor']],
+            'postprocessor_hooks': ydl_opts['postprocessor_hooks'] + [timing.hook],
         })
     elif format_id:
         ydl_opts['format'] = format_id
-        # If it's pure video, we might want to merge audio? 
-        # For simplicity in this iteration, we trust what user selected or provide 'bestvideo+bestaudio' if ffmpeg present.
-        if '+' in format_id: # e.g. custom combined string
-            pass
 
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
-        return True, "Download Successful"
-    except yt_dlp.utils.DownloadError as e:
+        for attempt in itertools.count():
+            deferred = []
+            try:
+                info = _download_attempt(url, ydl_opts, lease, trace, postprocess, deferred)
+                break
+            except yt_dlp.utils.DownloadCancelled:
+                raise
+            except Exception as e:
+                kind, delay = resilience.plan_retry(e, attempt, job=True)
+                if delay is None: raise
+                with telemetry.bind(trace):
+                    telemetry.record_retry(kind)
+                resilience.wait(delay, lease=lease)
+        if deferred:
+            lease.close()
+            # Blocks while the postprocess backlog is full, holding this download slot back
+            return True, postprocess.submit(_postprocess_download, deferred, url, info, video_id, format_id, timing, trace,
+                                            output_folder, scratch_dir)
+        return _completed(index, video_id, info, format_id, timing, output_folder, scratch_dir)
+    except yt_dlp.utils.DownloadCancelled:
+        return False, "Download Cancelled"
+    except Exception as e:
+        return _failed(e, url, trace)
+    finally:
+        lease.close()
+
+def _download_attempt(url, ydl_opts, lease, trace, postprocess, deferred):
+    with bandwidth.bind(lease), telemetry.bind(trace), _sessions().session('download', **ydl_opts) as ydl:
+        if postprocess: _defer_post_process(ydl, deferred)
+        try:
+            return ydl.extract_info(url)
+        finally:
+            # The session goes back to the pool with yt-dlp's own post_process
+            ydl.__dict__.pop('post_process', None)
+
+def _completed(index, video_id, info, format_id, timing, output_folder, scratch_dir=None):
+    try:
+        _publish_download(info, output_folder)
+    except OSError as e:
+        return False, f"Unexpected Error: could not move the finished file into {output_folder}: {e}"
+    # The default scratch folder only exists while something is downloading
+    if not scratch_dir: remove_if_empty(get_scratch_dir(output_folder))
+    # Only links we can map to an ID without extracting can be looked up again
+    if video_id: _index_download(index, video_id, info, format_id)
+    if timing: return True, f"Download Successful ({timing.finish()})"
+    return True, "Download Successful"
+
+def _failed(e, url, trace):
+    if trace: trace.fail(e)
+    if isinstance(e, (yt_dlp.utils.DownloadError, yt_dlp.utils.PostProcessingError)):
         err_msg = str(e)
         if "ffmpeg" in err_msg.lower():
              return False, "Error: FFmpeg not found. Cannot merge video/audio or convert to MP3."
+        if trace and trace.retries:
+            return False, f"Download Error ({resilience.error_kind(e)}, gave up after {trace.retries} retries): {err_msg}"
         return False, f"Download Error: {err_msg}"
+    telemetry.log_event("download_error", url=url, error_class=telemetry.error_class(e), message=str(e))
+    return False, f"Unexpected Error: {str(e)}"
+
+def _defer_post_process(ydl, deferred):
+    """
+    Makes `ydl` record each file's post_process step (merge, conversion,
+    fixups, moving into place) in `deferred` instead of running it. Files
+    with nothing to merge or convert are moved into place right away.
+    """
+    # The session's postprocessor lists are rebuilt on its next checkout; keep this call's
+    pps = {key: list(ydl._pps[key]) for key in ('post_process', 'after_move')}
+    def capture(filename, info, files_to_move=None):
+        if not (info.get('__postprocessors') or info.get('requested_formats') or pps['post_process']):
+            return type(ydl).post_process(ydl, filename, info, files_to_move)
+        info['filepath'] = filename
+        # yt-dlp strips fields shared with the parent info once the file is done; keep a full copy
+        deferred.append({'info': dict(info), 'files_to_move': files_to_move or {}, 'target': info, 'pps': pps})
+        return info
+    ydl.post_process = capture
+
+def _run_post_process(item):
+    """
+    The post_process step yt-dlp would have run, on a session of our own.
+    """
+    with _sessions().session('download', overwrites=True) as ydl:
+        info = item['info']
+        info['__files_to_move'] = item['files_to_move']
+        for pp in (info.get('__postprocessors') or []) + item['pps']['post_process']:
+            pp.set_downloader(ydl)
+            info = ydl.run_pp(pp, info)
+        info = ydl.run_pp(MoveFilesAfterDownloadPP(ydl), info)
+        del info['__files_to_move']
+        for pp in item['pps']['after_move']:
+            pp.set_downloader(ydl)
+            info = ydl.run_pp(pp, info)
+    item['target']['filepath'] = info['filepath']
+
+def _postprocess_download(deferred, url, info, video_id, format_id, timing, trace, output_folder, scratch_dir):
+    """
+    Runs on a postprocess worker; returns the job's final (success, message).
+    """
+    try:
+        with telemetry.bind(trace):
+            for item in deferred: _run_post_process(item)
+        return _completed(get_download_index(), video_id, info, format_id, timing, output_folder, scratch_dir)
     except Exception as e:
-        print(f"Download Error: {e}")
-        return False, f"Unexpected Error: {str(e)}"
+        return _failed(e, url, trace)
+
+def _reuse_download(entry, output_folder, progress_hook, trace):
+    """
+    Serves a download from a file we already have, copying it if it lives in another folder.
+    """
+    path = entry['path']
+    if os.path.dirname(path) != os.path.abspath(output_folder):
+        target = os.path.join(output_folder, os.path.basename(path))
+        if not (os.path.exists(target) and os.path.getsize(target) == entry['size']):
+            try:
+                copy_atomic(path, target)
+            except OSError as e:
+                return False, f"Unexpected Error: could not copy {os.path.basename(path)}: {e}"
+        path = target
+    if trace: trace.mark_extracted()
+    telemetry.metrics.inc("ytdl_download_index_hits_total")
+    if progress_hook:
+        progress_hook({'status': 'finished', 'filename': path, 'downloaded_bytes': entry['size'], 'total_bytes': entry['size']})
+    return True, f"Already downloaded: {os.path.basename(path)}"
+
+def _publish_download(info, output_folder):
+    """
+    Moves the finished files from the scratch folder into `output_folder`.
+    """
+    info = info or {}
+    for d in info.get('requested_downloads') or []:
+        path = d.get('filepath')
+        if not path or not os.path.exists(path): continue
+        d['filepath'] = publish(path, output_folder)
+        if info.get('filepath') == path: info['filepath'] = d['filepath']
+
+def _expected_file(url, format_id):
+    """
+    The 'h<height>:<ext>' preset of the file a video format selector with
+    audio will produce, judged from the cached format list (no extraction);
+    None for audio, video-only selectors or when it can't be told.
+    """
+    if format_id in AUDIO_PRESETS: return None
+    key = f"{canonical_key(url)}#v{INFO_FORMAT_VERSION}"
+    summary = get_info_cache().get(key)
+    if not summary or summary.get('type') != 'video': return None
+    index = _format_index(key, summary['formats'])
+    # yt-dlp's default selector merges the best video with the best audio
+    first = (format_id or 'bestvideo+bestaudio').split('/')[0]
+    if first.startswith('best'):
+        # 'bestvideo+bestaudio/best' and the playlist presets' 'bestvideo[height<=N]+bestaudio/...'
+        m = re.search(r'height<=(\d+)', first)
+        rec = index.best_video(int(m.group(1)) if m else None)
+    else:
+        rec = next((r for r in index if r.format_id == first.split('+')[0] and r.has_video), None)
+    if not rec: return None
+    if not rec.needs_audio: return f"h{rec.height}:{rec.ext}"
+    audio = index.best_audio
+    if '+' not in first or not audio: return None
+    ext = get_compatible_ext(vcodecs=[None], acodecs=[audio.acodec], vexts=[rec.ext], aexts=[audio.ext])
+    return f"h{rec.height}:{ext}"
+
+def _index_download(index, video_id, info, format_id):
+    for d in (info or {}).get('requested_downloads') or []:
+        path = d.get('filepath')
+        if not path or not os.path.exists(path): continue
+        # Also under the name-derived preset, which is what a reindex of the folder produces;
+        # a video-only file mustn't stand in for requests that want audio
+        tagged = tagged_preset(os.path.basename(path))
+        aliases = [tagged[1]] if tagged and d.get('acodec') != 'none' else ()
+        try:
+            index.record(video_id, format_id, path, aliases=aliases)
+        except OSError as e:
+            telemetry.log_event("index_error", video_id=video_id, path=path, message=str(e))
+
+THROTTLED_BUFFER = 64 * 1024
+
+def _throttle_hook(lease):
+    """
+    Progress hook that charges newly downloaded bytes to `lease`, sleeping
+    while the job is over its share of the bandwidth cap.
+    """
+    seen = {}
+    def hook(d):
+        # The segmented downloader charges its workers directly
+        if d.get('_throttled') or d['status'] != 'downloading': return
+        name = d.get('tmpfilename') or d.get('filename')
+        downloaded = d.get('downloaded_bytes') or 0
+        # Resumed .part bytes show up in the first report; they weren't transferred now
+        previous = seen.setdefault(name, downloaded)
+        seen[name] = downloaded
+        lease.consume(downloaded - previous)
+    return hook
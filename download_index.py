@@ -0,0 +1,182 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from app_config import data_path
+from audio_presets import AUDIO_PRESETS
+from info_cache import canonical_key
+
+# Finished files are named '<title> [<video id>][ <height>p].<ext>' (see download_stream)
+_TAGGED_NAME_RE = re.compile(r"\[([^\[\]]+)\](?: (\d+)p)?\.(\w+)$")
+HASH_CHUNK = 1024 * 1024
+
+def video_id_for(url):
+    """
+    YouTube video ID from a link without extracting it, or None for other links.
+    """
+    key = canonical_key(url)
+    return key[len("yt:video:"):] if key.startswith("yt:video:") else None
+
+def preset_key(format_id):
+    return format_id or "best"
+
+def tagged_preset(name):
+    """
+    (video id, preset) from a tagged file name: 'h<height>:<ext>' for video
+    (taken to have audio, as the app's video presets do), 'ext:<ext>'
+    otherwise. None for untagged names.
+    """
+    m = _TAGGED_NAME_RE.search(name)
+    if not m: return None
+    ext = m.group(3).lower()
+    return m.group(1), f"h{m.group(2)}:{ext}" if m.group(2) else f"ext:{ext}"
+
+def file_checksum(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class DownloadIndex:
+    """
+    Completed downloads keyed by (video ID, format/preset), with the file's
+    path, size and SHA-256. download_stream looks here first and hands back
+    the existing file instead of fetching it again.
+
+    Entries are checked against the file on every lookup (exists, same
+    size), so deleted or replaced files simply stop matching. rebuild()
+    recreates the index from the ID tags in the file names.
+    """
+    def __init__(self, db_path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS downloads ("
+            " video_id TEXT NOT NULL, preset TEXT NOT NULL, path TEXT NOT NULL,"
+            " size INTEGER NOT NULL, mtime REAL NOT NULL, sha256 TEXT NOT NULL, completed_at REAL NOT NULL,"
+            " PRIMARY KEY (video_id, preset))"
+        )
+        self._db.commit()
+
+    def lookup(self, video_id, format_id, expected=None):
+        """
+        The entry for this video and format as a dict, or None if there's no
+        usable file. Audio presets also match a rebuilt file with their
+        extension; `expected` is the 'h<height>:<ext>' a video format with
+        audio resolves to, matching a file of that height and container.
+        """
+        if not video_id: return None
+        entries = [self._get(video_id, preset_key(format_id))]
+        if format_id in AUDIO_PRESETS: entries.append(self._get(video_id, f"ext:{AUDIO_PRESETS[format_id][1]}"))
+        if expected: entries.append(self._get(video_id, expected))
+        for entry in entries:
+            if not entry: continue
+            try:
+                if os.path.getsize(entry['path']) == entry['size']: return entry
+            except OSError:
+                pass
+            self.forget(video_id, entry['preset'])
+        return None
+
+    def record(self, video_id, format_id, path, aliases=()):
+        """
+        Adds a finished file, hashing it, under its format and any `aliases`
+        (other presets it satisfies). Returns the entry.
+        """
+        st = os.stat(path)
+        entry = {
+            'video_id': video_id, 'preset': preset_key(format_id), 'path': os.path.abspath(path),
+            'size': st.st_size, 'mtime': st.st_mtime, 'sha256': file_checksum(path), 'completed_at': time.time(),
+        }
+        self._put(entry)
+        for alias in aliases:
+            if alias != entry['preset']: self._put(dict(entry, preset=alias))
+        return entry
+
+    def forget(self, video_id, preset):
+        with self._lock:
+            self._db.execute("DELETE FROM downloads WHERE video_id = ? AND preset = ?", (video_id, preset))
+            self._db.commit()
+
+    def entries(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT video_id, preset, path, size, mtime, sha256, completed_at FROM downloads ORDER BY completed_at"
+            ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def rebuild(self, folder):
+        """
+        Rescans `folder`: drops entries whose file is gone, re-hashes changed
+        ones and adds tagged files that aren't indexed yet.
+        Files whose preset isn't known are indexed as 'h<height>:<extension>'
+        (video) or 'ext:<extension>' (see tagged_preset()).
+        Returns {'kept', 'added', 'removed'} counts.
+        """
+        folder = os.path.abspath(folder)
+        known = {}
+        removed = 0
+        for entry in self.entries():
+            try:
+                st = os.stat(entry['path'])
+            except OSError:
+                self.forget(entry['video_id'], entry['preset'])
+                removed += 1
+                continue
+            if st.st_size != entry['size'] or st.st_mtime != entry['mtime']:
+                # Rewritten in place: keep its preset, refresh size and checksum
+                entry = self.record(entry['video_id'], entry['preset'], entry['path'])
+            known[entry['path']] = entry
+
+        added = 0
+        try:
+            names = os.listdir(folder)
+        except OSError:
+            names = []
+        for name in names:
+            path = os.path.join(folder, name)
+            tagged = tagged_preset(name)
+            if not tagged or path in known or not os.path.isfile(path): continue
+            self.record(tagged[0], tagged[1], path)
+            added += 1
+        return {'kept': len(known), 'added': added, 'removed': removed}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # --- Internals ---
+
+    def _get(self, video_id, preset):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT video_id, preset, path, size, mtime, sha256, completed_at FROM downloads"
+                " WHERE video_id = ? AND preset = ?", (video_id, preset)
+            ).fetchone()
+        return self._entry(row) if row else None
+
+    def _put(self, entry):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO downloads (video_id, preset, path, size, mtime, sha256, completed_at)"
+                " VALUES (:video_id, :preset, :path, :size, :mtime, :sha256, :completed_at)", entry
+            )
+            self._db.commit()
+
+    @staticmethod
+    def _entry(row):
+        keys = ('video_id', 'preset', 'path', 'size', 'mtime', 'sha256', 'completed_at')
+        return dict(zip(keys, row))
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_download_index():
+    global _index
+    with _index_lock:
+        if _index is None: _index = DownloadIndex(data_path("downloads.sqlite3"))
+        return _index
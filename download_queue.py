@@ -0,0 +1,374 @@
+import heapq
+import itertools
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+from yt_dlp.utils import DownloadCancelled
+
+from auto_quality import record_throughput
+from bandwidth import priority_weight, scheduler as bandwidth_scheduler
+from core_downloader import download_stream
+from progress_events import SpeedMeter
+from telemetry import Trace
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+POSTPROCESSING = "postprocessing" # transfer done, merging/converting without holding a download slot
+PAUSED = "paused"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINAL_STATES = (DONE, FAILED, CANCELLED)
+
+class JobStopped(DownloadCancelled):
+    """
+    Raised from a job's progress hook to stop yt-dlp when the job is paused or cancelled.
+    """
+
+class JobProgress:
+    """
+    Numeric progress for one job, fed by yt-dlp progress hooks.
+    Speed and ETA are smoothed from the raw byte counters.
+    """
+    def __init__(self):
+        self.downloaded_bytes = 0
+        self.total_bytes = 0
+        self.speed = 0.0 # bytes/s
+        self.eta = None # seconds
+        self.phase = "waiting"
+        self.resolved_format = None # format yt-dlp actually picked, e.g. "137+140"
+        self.filename = None # file being written, so an interrupted job can be found again
+        self.completed_bytes = 0 # summed over finished streams (video + audio for a merge)
+        self._meter = SpeedMeter()
+
+    @property
+    def fraction(self):
+        if not self.total_bytes: return 0.0
+        return min(1.0, self.downloaded_bytes / self.total_bytes)
+
+    def update_from_hook(self, d):
+        info = d.get('info_dict') or {}
+        self.resolved_format = info.get('format_id') or self.resolved_format
+        self.filename = d.get('tmpfilename') or d.get('filename') or self.filename
+        if d['status'] == 'downloading':
+            self.phase = "downloading"
+            self.downloaded_bytes = d.get('downloaded_bytes') or 0
+            self.total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate') or self.total_bytes
+            self.speed = self._meter.add_sample(self.downloaded_bytes)
+            self.eta = self._meter.eta(self.downloaded_bytes, self.total_bytes)
+        elif d['status'] == 'finished':
+            # A merged download fires this once per stream; the merge follows
+            self.phase = "processing"
+            self.downloaded_bytes = d.get('downloaded_bytes') or d.get('total_bytes') or self.downloaded_bytes
+            self.completed_bytes += self.downloaded_bytes
+            self.total_bytes = self.downloaded_bytes
+            self.speed = 0.0
+            self.eta = 0
+            self._meter.reset()
+
+class DownloadJob:
+    """
+    One requested download and its live state.
+    """
+    _ids = itertools.count(1)
+
+    def __init__(self, url, format_id, output_dir, title=None, priority=0, options=None, uid=None, owner=None):
+        self.id = next(DownloadJob._ids)
+        self.uid = uid or uuid.uuid4().hex # stable across restarts, unlike `id`
+        self.owner = owner # app session that submitted it; None = shown to every session
+        self.url = url
+        self.format_id = format_id
+        self.output_dir = output_dir
+        self.title = title or url
+        self.priority = priority
+        self.options = options or {} # extra keyword arguments for the downloader
+        self.status = QUEUED
+        self.message = ""
+        self.progress = JobProgress()
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.trace = None # telemetry.Trace of the latest run
+        self._stop_as = None # PAUSED or CANCELLED while running
+        self._postprocess = None # Future of the merge/conversion while POSTPROCESSING
+
+    def to_dict(self):
+        return {
+            'id': self.id, 'uid': self.uid, 'url': self.url, 'format_id': self.format_id, 'title': self.title,
+            'priority': self.priority, 'status': self.status, 'message': self.message,
+            'downloaded_bytes': self.progress.downloaded_bytes, 'total_bytes': self.progress.total_bytes,
+            'completed_bytes': self.progress.completed_bytes, 'resolved_format': self.progress.resolved_format,
+            'created_at': self.created_at, 'started_at': self.started_at, 'finished_at': self.finished_at,
+            'phases': self.trace.phase_totals() if self.trace else {},
+            'retries': self.trace.retries if self.trace else 0,
+            'retry_counters': dict(self.trace.counters) if self.trace else {},
+            'error_class': self.trace.error_class if self.trace else None,
+        }
+
+class DownloadQueue:
+    """
+    Priority queue of download jobs served by a bounded pool of worker threads.
+    Higher priority runs first; equal priorities run in submission order.
+    Listeners are called with the job whenever its state or progress changes.
+    With a `postprocess` pool (see postprocess.py), a job's merge/conversion
+    runs there and its worker moves on to the next download meanwhile.
+    """
+    def __init__(self, max_workers=2, downloader=download_stream, postprocess=None):
+        self.downloader = downloader
+        self.postprocess = postprocess
+        self._max_workers = max(1, int(max_workers))
+        self._cond = threading.Condition()
+        self._heap = []
+        self._seq = itertools.count()
+        self._jobs = {}
+        self._running = 0
+        self._listeners = []
+        self._workers = []
+        self._closed = False
+        self._spawn_workers()
+
+    # --- Public API ---
+
+    def submit(self, url, format_id, output_dir, title=None, priority=0, uid=None, start_paused=False, owner=None, **options):
+        """
+        Queues a download. Extra keyword `options` go to the downloader as-is
+        (e.g. connections=4 for download_stream). `uid` and `start_paused`
+        are for jobs restored from the journal; `owner` tags the session it came from.
+        """
+        job = DownloadJob(url, format_id, output_dir, title=title, priority=priority, options=options, uid=uid, owner=owner)
+        with self._cond:
+            self._jobs[job.id] = job
+            if start_paused:
+                job.status = PAUSED
+            else:
+                self._push(job)
+                self._cond.notify()
+        self._notify(job)
+        return job
+
+    def jobs(self):
+        with self._cond:
+            return sorted(self._jobs.values(), key=lambda j: j.id)
+
+    def status_counts(self):
+        with self._cond:
+            counts = dict.fromkeys((QUEUED, RUNNING, POSTPROCESSING, PAUSED, DONE, FAILED, CANCELLED), 0)
+            for job in self._jobs.values(): counts[job.status] += 1
+            return counts
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def pause(self, job_id):
+        self._stop(job_id, PAUSED)
+
+    def cancel(self, job_id):
+        self._stop(job_id, CANCELLED)
+
+    def resume(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job or job.status not in (PAUSED, FAILED): return
+            job.status = QUEUED
+            job.message = ""
+            self._push(job)
+            self._cond.notify()
+        self._notify(job)
+
+    def set_priority(self, job_id, priority):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job: return
+            job.priority = priority
+            if job.status == QUEUED:
+                # Stale heap entries are skipped when popped
+                self._push(job)
+            elif job.status == RUNNING:
+                bandwidth_scheduler.set_weight(job.uid, priority_weight(priority))
+
+    def remove_finished(self):
+        with self._cond:
+            for job_id in [j.id for j in self._jobs.values() if j.status in FINAL_STATES]:
+                del self._jobs[job_id]
+
+    def prune_finished(self, keep):
+        """
+        Forgets all but the `keep` most recently finished jobs, so a long-running
+        server doesn't hold every job it ever ran. Failed ones stay in the journal.
+        """
+        with self._cond:
+            finished = sorted((j for j in self._jobs.values() if j.status in FINAL_STATES),
+                              key=lambda j: j.finished_at or 0, reverse=True)
+            for job in finished[keep:]:
+                del self._jobs[job.id]
+            return len(finished[keep:])
+
+    @property
+    def max_workers(self):
+        return self._max_workers
+
+    def set_max_workers(self, n):
+        """
+        Resizes the pool. Extra workers are started right away; surplus ones
+        exit after their current job.
+        """
+        with self._cond:
+            self._max_workers = max(1, int(n))
+            self._spawn_workers()
+            self._cond.notify_all()
+
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    def remove_listener(self, fn):
+        if fn in self._listeners: self._listeners.remove(fn)
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            for job in self._jobs.values():
+                if job.status == RUNNING:
+                    job._stop_as = CANCELLED
+                    bandwidth_scheduler.interrupt(job.uid)
+            self._cond.notify_all()
+
+    # --- Internals ---
+
+    def _push(self, job):
+        heapq.heappush(self._heap, (-job.priority, next(self._seq), job.id, job.priority))
+
+    def _spawn_workers(self):
+        self._workers = [w for w in self._workers if w.is_alive()]
+        while len(self._workers) < self._max_workers:
+            w = threading.Thread(target=self._worker, daemon=True, name=f"download-worker-{len(self._workers) + 1}")
+            self._workers.append(w)
+            w.start()
+
+    def _next_job(self):
+        # Call with self._cond held
+        while self._heap:
+            _, _, job_id, priority = heapq.heappop(self._heap)
+            job = self._jobs.get(job_id)
+            if job and job.status == QUEUED and job.priority == priority:
+                return job
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed: return
+                    if len(self._workers) > self._max_workers:
+                        # Pool was shrunk; let this thread go
+                        self._workers = [w for w in self._workers if w is not threading.current_thread()]
+                        return
+                    if self._running < self._max_workers:
+                        job = self._next_job()
+                        if job: break
+                    self._cond.wait()
+                self._running += 1
+                job.status = RUNNING
+                job.started_at = time.time()
+                job.progress.completed_bytes = 0 # a resumed run reports finished streams again
+                job._stop_as = None
+            self._notify(job)
+
+            try:
+                self._run(job)
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    self._cond.notify_all()
+            self._notify(job)
+
+    def _run(self, job):
+        def hook(d):
+            if job._stop_as: raise JobStopped(job._stop_as)
+            job.progress.update_from_hook(d)
+            self._notify(job)
+
+        job.trace = trace = Trace(job.uid, url=job.url, format=job.format_id, title=job.title)
+        options = dict(job.options, postprocess=self.postprocess) if self.postprocess else job.options
+        try:
+            success, msg = self.downloader(job.url, job.format_id, job.output_dir, hook, trace=trace,
+                                           bandwidth_key=job.uid, bandwidth_weight=priority_weight(job.priority),
+                                           **options)
+        except Exception as e:
+            trace.fail(e)
+            success, msg = False, f"Unexpected Error: {e}"
+
+        if isinstance(msg, Future):
+            # Bytes are on disk; the merge/conversion finishes the job from the postprocess pool
+            with self._cond:
+                job.status = POSTPROCESSING
+                job.message = "Merging" if '+' in (job.progress.resolved_format or '') else "Converting"
+                job._stop_as = None
+                job._postprocess = msg
+            msg.add_done_callback(lambda f: self._postprocessed(job, f))
+            return
+        self._finish(job, success, msg)
+
+    def _postprocessed(self, job, future):
+        if future.cancelled():
+            success, msg = False, "Cancelled"
+        else:
+            try:
+                success, msg = future.result()
+            except Exception as e:
+                job.trace.fail(e)
+                success, msg = False, f"Unexpected Error: {e}"
+        with self._cond:
+            job._postprocess = None
+            if future.cancelled(): job._stop_as = CANCELLED
+        self._finish(job, success, msg)
+        self._notify(job)
+
+    def _finish(self, job, success, msg):
+        with self._cond:
+            job.finished_at = time.time()
+            if job._stop_as:
+                job.status = job._stop_as
+                job.message = "Paused" if job._stop_as == PAUSED else "Cancelled"
+            else:
+                job.status = DONE if success else FAILED
+                job.message = msg
+            job._stop_as = None
+        if job.status == DONE:
+            # Feeds the speed the 'auto' preset plans with
+            record_throughput(job.trace.bytes, job.trace.phase_totals().get('download', 0))
+        job.trace.finish(job.status, message=job.message)
+
+    def _stop(self, job_id, state):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job or job.status in FINAL_STATES: return
+            if job.status == POSTPROCESSING:
+                # Only a merge that hasn't started yet can be called off
+                if state == CANCELLED and job._postprocess: job._postprocess.cancel()
+                return
+            if job.status == RUNNING:
+                # Picked up by the progress hook on the next tick, or right
+                # away if the job is sleeping in the bandwidth throttle
+                job._stop_as = state
+                bandwidth_scheduler.interrupt(job.uid)
+                return
+            if job.status == PAUSED and state == PAUSED: return
+            # Not running: stopped right here, the way _finish stops a running job
+            job.finished_at = time.time()
+            job.status = state
+            job.message = "Paused" if state == PAUSED else "Cancelled"
+            # The job isn't running, so any trace it has is from an earlier run and already closed
+            job.trace = Trace(job.uid, url=job.url, format=job.format_id, title=job.title)
+        job.trace.finish(job.status, message=job.message)
+        self._notify(job)
+
+    def _notify(self, job):
+        for fn in list(self._listeners):
+            try:
+                fn(job)
+            except Exception as e:
+                print(f"Queue listener error: {e}")
@@ -0,0 +1,84 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app_config import data_path, get_setting
+from bandwidth import mb_per_s, scheduler as bandwidth_scheduler
+from download_queue import DownloadQueue, FINAL_STATES
+from job_journal import JobJournal
+from postprocess import get_postprocess_pool
+from telemetry import metrics
+
+# Finished jobs kept in memory across all sessions; older ones are forgotten
+MAX_FINISHED_JOBS = 200
+LOOKUP_WORKERS = 4
+
+class DownloadEngine:
+    """
+    The shared queue, journal and lookup pool, plus the set of live sessions.
+    """
+    def __init__(self):
+        self.queue = DownloadQueue(max_workers=get_setting("max_parallel_downloads", 2), postprocess=get_postprocess_pool())
+        # Records every job so unfinished ones come back after a restart
+        self.journal = JobJournal(data_path("jobs.sqlite3"))
+        self.journal.attach(self.queue)
+        self.lookup_pool = ThreadPoolExecutor(max_workers=LOOKUP_WORKERS, thread_name_prefix="info-lookup")
+        self._lock = threading.Lock()
+        self._sessions = set()
+        self._restored = False
+        self.queue.add_listener(self._on_job)
+        # One cap shared by every running download (MB/s, 0 = unlimited)
+        bandwidth_scheduler.set_rate(mb_per_s(get_setting("bandwidth_limit_mb", 0)))
+        metrics.add_collector(self._metrics)
+
+    def open_session(self, session_id):
+        with self._lock:
+            self._sessions.add(session_id)
+
+    def close_session(self, session_id):
+        """
+        Forgets a session. Its jobs keep running and are shown to every session from now on.
+        """
+        with self._lock:
+            self._sessions.discard(session_id)
+        for job in self.queue.jobs():
+            if job.owner == session_id: job.owner = None
+
+    def restore(self):
+        """
+        Re-queues the journal's unfinished jobs the first time it's called;
+        returns them (an empty list on later calls).
+        """
+        with self._lock:
+            if self._restored: return []
+            self._restored = True
+        return self.journal.restore(self.queue)
+
+    @staticmethod
+    def visible_to(job, session_id):
+        return job.owner is None or job.owner == session_id
+
+    def jobs_for(self, session_id):
+        return [j for j in self.queue.jobs() if self.visible_to(j, session_id)]
+
+    # --- Internals ---
+
+    def _on_job(self, job):
+        if job.status in FINAL_STATES: self.queue.prune_finished(MAX_FINISHED_JOBS)
+
+    def _metrics(self):
+        with self._lock:
+            sessions = len(self._sessions)
+        rows = [("ytdl_queue_jobs", n, {'status': s}) for s, n in self.queue.status_counts().items()]
+        rows.append(("ytdl_sessions", sessions, {}))
+        return rows
+
+metrics.describe("ytdl_sessions", "gauge", "Open app sessions (browser tabs in web mode)")
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None: _engine = DownloadEngine()
+        return _engine
@@ -0,0 +1,228 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# YouTube IDs are 11 chars; playlists are longer but share the alphabet.
+_VIDEO_ID_RE = re.compile(r'(?:[?&]v=|youtu\.be/|/shorts/|/embed/|/live/)([0-9A-Za-z_-]{11})')
+_PLAYLIST_ID_RE = re.compile(r'[?&]list=([0-9A-Za-z_-]+)')
+
+def canonical_key(url):
+    """
+    Maps the many spellings of a YouTube link to one cache key.
+    Mirrors yt-dlp: a watch link that carries `list=` resolves to the playlist.
+    """
+    url = url.strip()
+    m = _PLAYLIST_ID_RE.search(url)
+    if m: return f"yt:playlist:{m.group(1)}"
+    m = _VIDEO_ID_RE.search(url)
+    if m: return f"yt:video:{m.group(1)}"
+    return f"url:{url.rstrip('/')}"
+
+class _Flight:
+    """
+    One in-progress load that concurrent callers wait on.
+    """
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+class InfoCache:
+    """
+    Two tier cache: an in-memory LRU in front of a SQLite file.
+    Entries expire after their TTL and both tiers are bounded by size in bytes.
+    Concurrent loads of the same key are coalesced into a single call.
+    """
+    def __init__(self, db_path=None, ttl=3600, max_memory_bytes=8 * 1024 * 1024, max_disk_bytes=64 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict() # key -> (expires_at, size, value)
+        self._memory_bytes = 0
+        self._flights = {}
+        self._stats = {
+            'hits_memory': 0, 'hits_disk': 0, 'misses': 0, 'coalesced': 0,
+            'evictions_memory': 0, 'evictions_disk': 0, 'expired': 0, 'errors_disk': 0,
+        }
+
+        self._db = None
+        self._disk_bytes = 0
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS info ("
+                    " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                    " expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                self._db.execute("DELETE FROM info WHERE expires_at <= ?", (time.time(),))
+                self._db.commit()
+                self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM info").fetchone()[0]
+            except sqlite3.Error as e:
+                # A broken cache must never break lookups; fall back to memory only.
+                print(f"Info cache disabled on disk: {e}")
+                self._db = None
+
+    # --- Public API ---
+
+    def get(self, key):
+        with self._lock:
+            return self._get_locked(key)
+
+    def put(self, key, value, ttl=None):
+        payload = json.dumps(value, default=str)
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            self._put_memory(key, value, len(payload), expires_at)
+            self._put_disk(key, payload, expires_at)
+
+    def get_or_load(self, key, loader, should_store=None, ttl=None):
+        """
+        Returns the cached value for `key`, or calls `loader()` once no matter
+        how many threads ask at the same time.
+        `should_store(value)` can veto caching (e.g. error results).
+        """
+        with self._lock:
+            value = self._get_locked(key, count_miss=False)
+            if value is not None: return value
+
+            flight = self._flights.get(key)
+            if flight:
+                self._stats['coalesced'] += 1
+                leader = False
+            else:
+                flight = self._flights[key] = _Flight()
+                self._stats['misses'] += 1
+                leader = True
+
+        if not leader:
+            flight.event.wait()
+            if flight.error: raise flight.error
+            return flight.value
+
+        try:
+            value = loader()
+            if should_store is None or should_store(value):
+                self.put(key, value, ttl=ttl)
+            flight.value = value
+            return value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    def invalidate(self, key):
+        with self._lock:
+            self._drop_memory(key)
+            if self._db:
+                try:
+                    row = self._db.execute("SELECT size FROM info WHERE key = ?", (key,)).fetchone()
+                    if row:
+                        self._db.execute("DELETE FROM info WHERE key = ?", (key,))
+                        self._db.commit()
+                        self._disk_bytes -= row[0]
+                except sqlite3.Error:
+                    self._stats['errors_disk'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self._db:
+                try:
+                    self._db.execute("DELETE FROM info")
+                    self._db.commit()
+                    self._disk_bytes = 0
+                except sqlite3.Error:
+                    self._stats['errors_disk'] += 1
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+            s['hits'] = s['hits_memory'] + s['hits_disk']
+            s['memory_items'] = len(self._memory)
+            s['memory_bytes'] = self._memory_bytes
+            s['disk_bytes'] = self._disk_bytes
+            return s
+
+    # --- Internals (call with self._lock held) ---
+
+    def _get_locked(self, key, count_miss=True):
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry:
+            expires_at, size, value = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self._stats['hits_memory'] += 1
+                return value
+            self._drop_memory(key)
+            self._stats['expired'] += 1
+
+        if self._db:
+            try:
+                row = self._db.execute("SELECT value, size, expires_at FROM info WHERE key = ?", (key,)).fetchone()
+                if row:
+                    payload, size, expires_at = row
+                    if expires_at > now:
+                        self._db.execute("UPDATE info SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        value = json.loads(payload)
+                        self._put_memory(key, value, size, expires_at)
+                        self._stats['hits_disk'] += 1
+                        return value
+                    self._db.execute("DELETE FROM info WHERE key = ?", (key,))
+                    self._db.commit()
+                    self._disk_bytes -= size
+                    self._stats['expired'] += 1
+            except sqlite3.Error:
+                self._stats['errors_disk'] += 1
+
+        if count_miss: self._stats['misses'] += 1
+        return None
+
+    def _put_memory(self, key, value, size, expires_at):
+        self._drop_memory(key)
+        if size > self.max_memory_bytes: return
+        self._memory[key] = (expires_at, size, value)
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, (_, old_size, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= old_size
+            self._stats['evictions_memory'] += 1
+
+    def _drop_memory(self, key):
+        entry = self._memory.pop(key, None)
+        if entry: self._memory_bytes -= entry[1]
+
+    def _put_disk(self, key, payload, expires_at):
+        if not self._db: return
+        size = len(payload)
+        if size > self.max_disk_bytes: return
+        try:
+            row = self._db.execute("SELECT size FROM info WHERE key = ?", (key,)).fetchone()
+            if row: self._disk_bytes -= row[0]
+            self._db.execute(
+                "INSERT OR REPLACE INTO info (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, size, expires_at, time.time())
+            )
+            self._disk_bytes += size
+
+            # Evict least recently used rows until we are back under budget
+            while self._disk_bytes > self.max_disk_bytes:
+                victim = self._db.execute("SELECT key, size FROM info ORDER BY accessed_at ASC LIMIT 1").fetchone()
+                if not victim: break
+                self._db.execute("DELETE FROM info WHERE key = ?", (victim[0],))
+                self._disk_bytes -= victim[1]
+                self._stats['evictions_disk'] += 1
+            self._db.commit()
+        except sqlite3.Error:
+            self._stats['errors_disk'] += 1
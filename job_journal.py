@@ -0,0 +1,104 @@
+import json
+import sqlite3
+import threading
+import time
+
+from download_queue import PAUSED, FAILED, DONE, CANCELLED
+
+# How often a running job's byte offset is written; state changes are written at once.
+PROGRESS_WRITE_INTERVAL = 2.0
+
+class JobJournal:
+    """
+    Persists download jobs so unfinished ones survive an app restart,
+    a process kill on Android or a network drop.
+
+    Attach it to a DownloadQueue and it records every job's URL, requested
+    and resolved format, output path and byte offset. On the next start,
+    restore() puts unfinished jobs back on the queue; yt-dlp (and the
+    segmented downloader) then continue from the existing .part files.
+    """
+    def __init__(self, db_path):
+        self._lock = threading.Lock()
+        self._last_write = {}
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " uid TEXT PRIMARY KEY, url TEXT NOT NULL, format_id TEXT, output_dir TEXT NOT NULL,"
+            " title TEXT, priority INTEGER NOT NULL DEFAULT 0, options TEXT NOT NULL DEFAULT '{}',"
+            " status TEXT NOT NULL, message TEXT, resolved_format TEXT, filename TEXT,"
+            " downloaded_bytes INTEGER NOT NULL DEFAULT 0, total_bytes INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def attach(self, queue):
+        queue.add_listener(self.record)
+
+    def record(self, job):
+        """
+        Queue listener: upserts the job, or drops it once it's finished for good.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if job.status in (DONE, CANCELLED):
+                self._db.execute("DELETE FROM jobs WHERE uid = ?", (job.uid,))
+                self._db.commit()
+                self._last_write.pop(job.uid, None)
+                return
+
+            # Progress ticks arrive many times per second; offsets only need to be roughly current
+            last_status, last_time = self._last_write.get(job.uid, (None, 0))
+            if job.status == last_status and now - last_time < PROGRESS_WRITE_INTERVAL: return
+            self._last_write[job.uid] = (job.status, now)
+
+            p = job.progress
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs (uid, url, format_id, output_dir, title, priority, options, status,"
+                " message, resolved_format, filename, downloaded_bytes, total_bytes, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.uid, job.url, job.format_id, job.output_dir, job.title, job.priority,
+                 json.dumps(job.options), job.status, job.message, p.resolved_format, p.filename,
+                 p.downloaded_bytes, p.total_bytes, job.created_at, time.time())
+            )
+            self._db.commit()
+
+    def unfinished(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT uid, url, format_id, output_dir, title, priority, options, status, message,"
+                " resolved_format, filename, downloaded_bytes, total_bytes"
+                " FROM jobs ORDER BY created_at"
+            ).fetchall()
+        keys = ('uid', 'url', 'format_id', 'output_dir', 'title', 'priority', 'options', 'status', 'message',
+                'resolved_format', 'filename', 'downloaded_bytes', 'total_bytes')
+        result = []
+        for row in rows:
+            entry = dict(zip(keys, row))
+            entry['options'] = json.loads(entry['options'] or '{}')
+            result.append(entry)
+        return result
+
+    def restore(self, queue):
+        """
+        Re-queues unfinished jobs. Jobs that were queued or running when the
+        app stopped start again right away; paused and failed ones come back
+        paused so the user decides.
+        """
+        jobs = []
+        for entry in self.unfinished():
+            paused = entry['status'] in (PAUSED, FAILED)
+            job = queue.submit(
+                entry['url'], entry['format_id'], entry['output_dir'],
+                title=entry['title'], priority=entry['priority'],
+                uid=entry['uid'], start_paused=paused, **entry['options']
+            )
+            job.progress.downloaded_bytes = entry['downloaded_bytes']
+            job.progress.total_bytes = entry['total_bytes']
+            if paused: job.message = "Interrupted, tap resume to continue"
+            jobs.append(job)
+        return jobs
+
+    def close(self):
+        with self._lock:
+            self._db.close()
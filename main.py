@@ -1,42 +1,68 @@
+import startup # first, so its clock includes the Flet import
 import flet as ft
 import os
-import threading
 
 # NOTE: Major imports moved INSIDE app_main to prevent startup crashes on Android
 
 def app_main(page: ft.Page):
+    # App Configuration
+    page.title = "YouTube Downloader"
+    page.theme_mode = ft.ThemeMode.DARK
+    page.padding = 0 
+
+    # Draw something before yt-dlp and the app modules load
+    splash = ft.Container(
+        ft.Column([ft.ProgressRing(), ft.Text("Starting...", color=ft.Colors.GREY_400)],
+                  alignment=ft.MainAxisAlignment.CENTER, horizontal_alignment=ft.CrossAxisAlignment.CENTER),
+        alignment=ft.Alignment.CENTER, expand=True
+    )
+    page.add(splash)
+    page.update()
+    startup.mark("shell")
+
     # --- LAZY IMPORTS START ---
     try:
         # Standard app imports
-        from core_downloader import get_video_info, download_stream
-        from ui_components import SafeContainer, ResponsiveGrid, VideoCard, DownloadOptionRow, ProgressCard
-        
-        # Risky binary imports
-        try:
-            import static_ffmpeg
-            # Auto-install/add ffmpeg to path
-            static_ffmpeg.add_paths()
-        except ImportError:
-            print("static_ffmpeg not found (Expected on mobile)")
-        except Exception as e:
-            print(f"static_ffmpeg error: {e}")
-            
+        from app_config import get_setting, set_setting
+        from auto_quality import AUTO_PRESET, budget_from_settings, pick_format
+        from core_downloader import InfoLookup, PlaylistStream, playlist_entries, select_download_options, format_size, format_duration
+        from download_queue import DONE
+        from engine import get_engine
+        from download_index import get_download_index, video_id_for
+        from thumbnails import THUMBNAIL_PREFETCH_ENTRIES, get_thumbnail_cache, entry_source
+        from telemetry import log_event, serve_metrics
+        from bandwidth import mb_per_s, scheduler as bandwidth_scheduler
+        from playlist_engine import PlaylistDownload, PLAYLIST_PRESETS
+        from progress_events import UIPublisher
+        from ui_components import SafeContainer, ResponsiveGrid, VideoCard, DownloadOptionRow, QueuePanel, PlaylistCard, PlaylistEntryRow
+        # ffmpeg (static_ffmpeg) is found on the warm-up thread once the UI is up
     except Exception as e:
         # If imports fail, re-raise so the global handler catches it
         raise Exception(f"dependency_import_failed: {e}")
     # --- LAZY IMPORTS END ---
+    startup.mark("imports")
 
-    # App Configuration
-    page.title = "YouTube Downloader"
-    page.theme_mode = ft.ThemeMode.DARK
-    page.padding = 0 
-    
     # State References
+    # Queue, journal and lookup threads are shared by every session (browser tab) in this process
+    engine = get_engine()
+    session_id = page.session.id
+    engine.open_session(session_id)
+    download_queue = engine.queue
     current_video_info = None
+    lookup = InfoLookup(pool=engine.lookup_pool)
+    # Every change coming from a worker thread goes through here
+    publisher = UIPublisher(page, rate_hz=get_setting("ui_update_rate", 4))
+    playlist_batches = [] # (batch, listener) started from this session
     
     # Global Components
     status_text = ft.Text("")
-    progress_card = ProgressCard()
+    queue_panel = QueuePanel(
+        on_pause=download_queue.pause,
+        on_resume=download_queue.resume,
+        on_cancel=download_queue.cancel,
+        # Jump ahead of everything that is still waiting
+        on_prioritize=lambda job_id: download_queue.set_priority(job_id, max((j.priority for j in download_queue.jobs()), default=0) + 1)
+    )
     
     # --- Tab 1: Downloader ---
     
@@ -44,140 +70,116 @@ def app_main(page: ft.Page):
         hint_text="Paste video or playlist link...", 
         expand=True,
         border_color=ft.Colors.PRIMARY,
-        prefix_icon=ft.Icons.LINK
+        prefix_icon=ft.Icons.LINK,
+        # Start extracting as soon as a link is pasted; search then joins that request
+        on_change=lambda e: lookup.prefetch((url_input.value or "").strip())
     )
     
     results_area = ResponsiveGrid([], page)
 
-    def on_progress(d):
-        if d['status'] == 'downloading':
-            p = d.get('_percent_str', '0%').replace('%','')
-            try:
-                percent = float(p) / 100
-                # Extract MB info if available
-                downloaded = d.get('downloaded_bytes', 0)
-                total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
-                speed = d.get('_speed_str', 'N/A')
-                
-                def fmt_mb(b): return f"{b/1024/1024:.1f} MB"
-                
-                stats_str = f"{fmt_mb(downloaded)} / {fmt_mb(total)}" if total > 0 else f"{fmt_mb(downloaded)}"
-                
-                progress_card.update_progress(percent, stats_str.split('/')[0], stats_str.split('/')[-1] if '/' in stats_str else '?', speed)
-                
-            except Exception as e:
-                print(f"Progress Error: {e}")
-            page.update()
-        elif d['status'] == 'finished':
-            progress_card.update_progress(1.0, "Done", "Done", "0 B/s")
-            
-            # Show Completion Popup
-            def close_popup(e):
-                success_dialog.open = False
-                progress_card.reset()
-                status_text.value = "Download Complete!"
-                page.update()
-                
-            success_dialog = ft.AlertDialog(
-                title=ft.Text("Success"),
-                content=ft.Text("Download finished successfully!"),
-                actions=[ft.TextButton("Okay", on_click=close_popup)]
-            )
-            page.overlay.append(success_dialog)
-            success_dialog.open = True
-            page.update()
-
-    def download_wrapper(format_id, ext):
-        if not current_video_info: return
-        
-        status_text.value = "Starting download..."
-        progress_card.reset() # Reset
-        progress_card.visible = True
+    def close_popup(e):
+        success_dialog.open = False
+        status_text.value = "Download Complete!"
         page.update()
-        
+
+    # One dialog per session, reused for every completion instead of piling up in the overlay
+    success_text = ft.Text("")
+    success_dialog = ft.AlertDialog(
+        title=ft.Text("Success"),
+        content=success_text,
+        actions=[ft.TextButton("Okay", on_click=close_popup)]
+    )
+    page.overlay.append(success_dialog)
+
+    def show_completion_popup(job):
+        success_text.value = f"{job.title}\n\nDownload finished successfully!"
+        success_dialog.open = True
+
+    def on_job_changed(job):
+        # Called from download worker threads on every yt-dlp tick; only the
+        # latest state per job is drawn, at the publisher's rate.
+        if not engine.visible_to(job, session_id): return
+        def apply():
+            newly_done = job.status == DONE and queue_panel.status_of(job.id) != DONE
+            queue_panel.sync_job(job)
+            if newly_done: show_completion_popup(job)
+        publisher.mark_dirty(('job', job.id), apply)
+
+    download_queue.add_listener(on_job_changed)
+    # Jobs already running (other tabs' restored ones, or this tab after a reload)
+    for job in engine.jobs_for(session_id): on_job_changed(job)
+
+    # Prometheus-style /metrics next to the web UI (8550); 0 turns it off
+    metrics_port = get_setting("metrics_port", 8551)
+    if metrics_port: serve_metrics(metrics_port, host=get_setting("metrics_host", "127.0.0.1"))
+
+    def get_output_dir():
         output_dir = "downloads" # TODO: Make configurable via Settings
         if not os.path.exists(output_dir): os.makedirs(output_dir)
+        return output_dir
 
-        def _target():
-            url = current_video_info['original_url']
-            success, msg = download_stream(url, format_id, output_dir, on_progress)
-            
-            if not success:
-                status_text.value = msg
-                status_text.color = ft.Colors.ERROR
-                page.update()
+    def job_options(format_id=None):
+        # Per-job downloader settings taken from the Settings tab at submit time
+        options = {
+            'connections': get_setting("connections_per_download"), # None = auto
+            'scratch_dir': get_setting("scratch_dir"), # None = hidden folder inside the output folder
+        }
+        if format_id == AUTO_PRESET: options.update(budget_from_settings())
+        return options
+
+    def download_wrapper(format_id, ext):
+        if not current_video_info: return
+        
+        output_dir = get_output_dir()
 
-        threading.Thread(target=_target, daemon=True).start()
+        # Capture the video now; the user may look up another one while this waits in the queue
+        download_queue.submit(current_video_info['original_url'], format_id, output_dir, title=current_video_info['title'],
+                              owner=session_id, **job_options(format_id))
+        status_text.value = "Added to download queue"
+        status_text.color = ft.Colors.WHITE
+        page.update()
 
     def build_formats_list(formats, dialog_ref=None):
-        # 1. Processing Logic
-        # Audio Candidates
-        audio_candidates = [f for f in formats if f.get('type') == 'audio']
-        audio_candidates.sort(key=lambda x: (x.get('abr', 0), x.get('filesize_raw', 0)), reverse=True)
-        
-        final_audio = []
-        seen_abr = set()
-        
-        # Add MP3 conversion options
-        final_audio.append({
-            'custom': True, 'quality': "High Quality MP3 (320kbps)", 'ext': 'mp3', 
-            'size': '~', # Unknown size before conversion
-            'id': 'audio_mp3_320', 'type': 'mp3'
-        })
-        final_audio.append({
-            'custom': True, 'quality': "Standard MP3 (192kbps)", 'ext': 'mp3', 
-            'size': audio_candidates[0].get('filesize_str', '~') if audio_candidates else 'N/A',
-            'id': 'audio_mp3_best', 'type': 'mp3'
-        })
-        
-        # Add distinct original bitrates
-        for f in audio_candidates:
-            abr = f.get('abr', 0)
-            if abr == 0: continue
-            
-            # Group bitrates closely (e.g. 128 vs 130)
-            abr_group = round(abr, -1) 
-            if abr_group not in seen_abr:
-                seen_abr.add(abr_group)
-                final_audio.append(f)
-
-        # Video Candidates
-        video_candidates = [f for f in formats if 'video' in f.get('type', '')]
-        video_candidates.sort(key=lambda x: (x.get('height', 0), x.get('filesize_raw', 0)), reverse=True)
-
-        seen_heights = set()
-        final_videos = []
-        for f in video_candidates:
-            h = f.get('height', 0)
-            if h == 0: continue
-            if h not in seen_heights:
-                seen_heights.add(h)
-                final_videos.append(f)
+        # 1. Processing Logic (indexed once in core_downloader)
+        presets, audio_formats, video_formats = select_download_options(formats)
+
+        def size_str(n, estimated=False):
+            # Sizes worked out from the bitrate are marked as approximate
+            if not n: return "Unknown Size"
+            return f"~{format_size(n)}" if estimated else format_size(n)
 
         # 2. HELPER: Generate UI Rows
+        def make_preset_rows(items):
+            # Special Custom Rows (like MP3); a converted file's size isn't known up front
+            return [DownloadOptionRow(
+                quality=p['label'], size_str=format_size(p['size']) if p['size'] else "~", ext=p['ext'],
+                on_click=lambda e, i=p['id'], x=p['ext']: download_wrapper(i, x)
+            ) for p in items]
+
+        def make_auto_rows():
+            # Best quality within the Settings budget at the recently measured speed; re-picked at download time
+            pick = pick_format(formats, **budget_from_settings())
+            if not pick['height']: return []
+            quality = f"Auto ({pick['height']}p)" if pick['fits'] else f"Auto ({pick['height']}p, over budget)"
+            return [DownloadOptionRow(
+                quality=quality, size_str=f"{size_str(pick['size'], pick['estimated'])}, ~{format_duration(pick['seconds'])}",
+                ext='mp4', on_click=lambda e: download_wrapper(AUTO_PRESET, 'mp4')
+            )]
+
         def make_rows(items, is_video):
             rows = []
             for item in items:
-                if item.get('custom'):
-                    # Special Custom Rows (like MP3)
-                    rows.append(DownloadOptionRow(
-                        quality=item['quality'], size_str=item['size'], ext=item['ext'],
-                        on_click=lambda e, i=item['id']: download_wrapper(i, item['type'])
-                    ))
-                    continue
-                    
-                size = item.get('filesize_str', 'N/A')
-                ext = item['ext']
+                size = size_str(item.filesize, item.estimated)
+                ext = item.ext
                 
                 if is_video:
-                    res = item['height']
+                    res = item.height
                     label = f"{res}p"
                     if res >= 2160: label = f"4K ({res}p)"
                     elif res >= 1440: label = f"2K ({res}p)"
                     elif res >= 1080: label = f"HD ({res}p)"
                     
-                    fid = item['format_id']
-                    if 'video' in item.get('type', ''): fid = f"{fid}+bestaudio/best"
+                    fid = f"{item.format_id}+bestaudio/best"
                     
                     rows.append(DownloadOptionRow(
                         quality=f"{label} Video", size_str=size, ext=ext,
@@ -185,12 +187,11 @@ def app_main(page: ft.Page):
                     ))
                 else:
                     # Audio
-                    abr = int(item.get('abr', 0))
-                    label = f"{abr} kbps"
+                    label = f"{int(item.abr)} kbps"
                     
                     rows.append(DownloadOptionRow(
                         quality=f"Audio ({label})", size_str=size, ext=ext,
-                        on_click=lambda e, i=item['format_id'], x=ext: download_wrapper(i, x) # Force orig ext
+                        on_click=lambda e, i=item.format_id, x=ext: download_wrapper(i, x) # Force orig ext
                     ))
             return rows
 
@@ -198,12 +199,12 @@ def app_main(page: ft.Page):
         audio_col = ft.Column([
             ft.Text("Audio Formats", weight=ft.FontWeight.BOLD),
             ft.Divider(height=5, color=ft.Colors.GREY_800),
-        ] + make_rows(final_audio, False), spacing=5, width=350)
+        ] + make_preset_rows(presets) + make_rows(audio_formats, False), spacing=5, width=350)
 
         video_col = ft.Column([
             ft.Text("Video Formats", weight=ft.FontWeight.BOLD),
             ft.Divider(height=5, color=ft.Colors.GREY_800),
-        ] + make_rows(final_videos, True), spacing=5, width=350)
+        ] + make_auto_rows() + make_rows(video_formats, True), spacing=5, width=350)
 
         # 4. Return Split Layout (Simple Row)
         return ft.Container(
@@ -217,49 +218,219 @@ def app_main(page: ft.Page):
             padding=5
         )
 
-    def search_click(e):
-        nonlocal current_video_info
-        url = url_input.value
-        if not url: return
+    def build_playlist_card(info):
+        batch = None
+        # Warm the thumbnail cache for the first screens of entries
+        get_thumbnail_cache().prefetch((entry_source(e) for e in (info.get('entries') or [])[:THUMBNAIL_PREFETCH_ENTRIES]),
+                                       height=PlaylistEntryRow.THUMB_HEIGHT)
 
-        status_text.value = "Fetching Info..."
-        status_text.color = ft.Colors.WHITE
-        results_area.set_items([])
-        page.update()
-        
-        info = get_video_info(url)
+        def on_batch_changed(b):
+            # Called from worker threads; stats are computed once per UI tick
+            publisher.mark_dirty(('playlist', id(b)), lambda: card.apply_stats(b.stats()))
+
+        def start_download(preset):
+            nonlocal batch
+            # Downloads start with the first page while later pages are still being listed
+            batch = PlaylistDownload(download_queue, playlist_entries(info), preset, get_output_dir(),
+                                     job_options=job_options(PLAYLIST_PRESETS[preset][1]), total=info['count'], owner=session_id)
+            batch.add_listener(on_batch_changed)
+            playlist_batches.append((batch, on_batch_changed))
+            card.set_running(True)
+            card.details_text.value = "Resolving videos..."
+            page.update()
+            batch.start()
+
+        def cancel_download():
+            if batch: batch.cancel()
+
+        card = PlaylistCard(
+            title=info['title'],
+            count=info['count'] if info['count'] is not None else f"{len(info['entries'])}+",
+            presets={k: label for k, (label, _, _) in PLAYLIST_PRESETS.items()},
+            on_download=start_download,
+            on_cancel=cancel_download
+        )
+        return card
+
+    def show_info(info, elapsed):
+        # Lookup results arrive on a worker thread
+        publisher.post(lambda: render_info(info, elapsed))
+
+    def build_entry_row(entry, position, width):
+        def on_thumbnail(src):
+            if src or url: publisher.post(lambda: row.set_thumbnail(src or url))
+        url, video_id = entry_source(entry)
+        row = PlaylistEntryRow(position, entry.get('title') or entry.get('id') or "Unknown", format_duration(entry.get('duration')), width=width)
+        src = get_thumbnail_cache().src_for(url, video_id, height=PlaylistEntryRow.THUMB_HEIGHT, on_ready=on_thumbnail)
+        if src: row.set_thumbnail(src)
+        return row
+
+    def show_playlist(info):
+        # Entry rows are built as they scroll into view; only a few screens' worth exist at once
+        entries = list(info.get('entries') or [])
+        width = PlaylistEntryRow.WIDTH if (page.width or 400) >= ResponsiveGrid.GRID_BREAKPOINT else None
+        # Later pages are listed only when the user scrolls near the end
+        more = None if info.get('complete', True) else PlaylistStream(info['original_url'], start=len(entries) + 1).pages()
+
+        def load_more():
+            if more is None: return
+            def fetch():
+                try:
+                    next_page = next(more, None)
+                except Exception as e:
+                    print(f"Playlist page error: {e}")
+                    return
+                if next_page:
+                    def apply():
+                        entries.extend(next_page)
+                        results_area.set_count(len(entries))
+                    publisher.post(apply)
+            page.run_thread(fetch)
+
+        results_area.set_source(
+            len(entries), lambda i: build_entry_row(entries[i], i + 1, width),
+            item_extent=PlaylistEntryRow.HEIGHT + 8, item_width=PlaylistEntryRow.WIDTH,
+            # Roughly the playlist card above the entries
+            header=[build_playlist_card(info)], header_extent=180, on_end_reached=load_more
+        )
+
+    def render_info(info, elapsed):
+        nonlocal current_video_info
         
         if 'error' in info:
             status_text.value = f"Error: {info['error']}"
             status_text.color = ft.Colors.ERROR
         elif info['type'] == 'playlist':
-            status_text.value = f"Found Playlist: {info['title']}"
-            # Placeholder for Playlist UI
-            results_area.set_items([
-                ft.Container(content=ft.Text("Playlist Download Coming Soon", size=20), padding=20)
-            ])
+            status_text.value = f"Found Playlist: {info['title']} ({elapsed:.1f}s)"
+            status_text.color = ft.Colors.WHITE
+            show_playlist(info)
         else:
             current_video_info = info
-            status_text.value = "Video Found"
+            status_text.value = f"Video Found ({elapsed:.1f}s)"
+            status_text.color = ft.Colors.WHITE
             
             # Build Formats Control
-            formats_ui = build_formats_list(info.get('formats', []))
+            formats_ui = build_formats_list(info['formats'])
             
+            # Local downscaled copy; until it's cached the card shows a placeholder
+            def on_thumbnail(src):
+                publisher.post(lambda: card.set_thumbnail(src or info['thumbnail']))
+            thumb = get_thumbnail_cache().src_for(info['thumbnail'], video_id_for(info['original_url']), on_ready=on_thumbnail)
+
             card = VideoCard(
                 title=info['title'],
-                thumbnail_url=info['thumbnail'],
+                thumbnail_url=thumb,
                 duration=info.get('duration', '??:??'),
                 formats_control=formats_ui
             )
             results_area.set_items([card])
-            
+
+    def on_lookup_slow(elapsed):
+        def apply():
+            status_text.value = f"Fetching Info... still working ({elapsed:.0f}s)"
+        publisher.post(apply)
+
+    def on_lookup_timeout(elapsed):
+        def apply():
+            status_text.value = f"Error: No response after {elapsed:.0f}s. Check the link or your connection and try again."
+            status_text.color = ft.Colors.ERROR
+        publisher.post(apply)
+
+    def search_click(e):
+        url = (url_input.value or "").strip()
+        if not url: return
+
+        status_text.value = "Fetching Info..."
+        status_text.color = ft.Colors.WHITE
+        results_area.set_items([])
         page.update()
+        
+        # Runs in the background; a newer search supersedes this one
+        lookup.submit(url, on_done=show_info, on_slow=on_lookup_slow, on_timeout=on_lookup_timeout)
 
     # --- Tab 2: Settings ---
+    def on_parallel_change(e):
+        n = int(e.control.value)
+        download_queue.set_max_workers(n)
+        set_setting("max_parallel_downloads", n)
+
+    def on_connections_change(e):
+        set_setting("connections_per_download", None if e.control.value == "auto" else int(e.control.value))
+
+    def on_bandwidth_change(e):
+        limit = float(e.control.value)
+        set_setting("bandwidth_limit_mb", limit)
+        # Running downloads pick the new cap up on their next read
+        bandwidth_scheduler.set_rate(mb_per_s(limit))
+
+    def on_scratch_dir_change(e):
+        folder = e.control.value.strip()
+        set_setting("scratch_dir", os.path.abspath(folder) if folder else None)
+
+    def on_auto_minutes_change(e):
+        set_setting("auto_max_minutes", int(e.control.value))
+
+    def on_auto_mb_change(e):
+        set_setting("auto_max_mb", int(e.control.value))
+
+    index_status = ft.Text("", size=12, color=ft.Colors.GREY_500)
+
+    def on_rebuild_index(e):
+        index_status.value = "Scanning downloads folder..."
+        page.update()
+
+        def rebuild():
+            counts = get_download_index().rebuild(get_output_dir())
+            def apply():
+                index_status.value = f"{counts['kept']} kept, {counts['added']} added, {counts['removed']} removed"
+            publisher.mark_dirty('download_index', apply)
+        # Hashing new files can take a while
+        page.run_thread(rebuild)
+
     settings_content = ft.Column([
         ft.Text("Settings", size=24, weight=ft.FontWeight.BOLD),
         ft.Divider(),
         ft.TextField(label="Download Location", value=os.path.abspath("downloads"), read_only=True, suffix_icon=ft.Icons.FOLDER),
+        ft.TextField(
+            label="Scratch folder for downloads in progress",
+            value=get_setting("scratch_dir") or "",
+            hint_text="Default: a hidden .incomplete folder in the download location",
+            on_blur=on_scratch_dir_change
+        ),
+        ft.Dropdown(
+            label="Parallel downloads",
+            value=str(download_queue.max_workers),
+            options=[ft.dropdown.Option(str(n)) for n in range(1, 7)],
+            on_select=on_parallel_change
+        ),
+        ft.Dropdown(
+            label="Connections per download",
+            value=str(get_setting("connections_per_download") or "auto"),
+            options=[ft.dropdown.Option(key="auto", text="Auto")] + [ft.dropdown.Option(str(n)) for n in (1, 2, 4, 8)],
+            on_select=on_connections_change
+        ),
+        ft.Dropdown(
+            label="Bandwidth limit (all downloads)",
+            value=f"{get_setting('bandwidth_limit_mb', 0):g}",
+            options=[ft.dropdown.Option(key="0", text="Unlimited")] + [ft.dropdown.Option(key=str(n), text=f"{n} MB/s") for n in (1, 2, 5, 10, 20, 50)],
+            on_select=on_bandwidth_change
+        ),
+        ft.Dropdown(
+            label="Auto quality: finish within",
+            value=str(get_setting("auto_max_minutes", 0)),
+            options=[ft.dropdown.Option(key="0", text="No time limit")] + [ft.dropdown.Option(key=str(n), text=f"{n} min") for n in (1, 2, 5, 10, 30)],
+            on_select=on_auto_minutes_change
+        ),
+        ft.Dropdown(
+            label="Auto quality: at most",
+            value=str(get_setting("auto_max_mb", 0)),
+            options=[ft.dropdown.Option(key="0", text="No size limit")] + [ft.dropdown.Option(key=str(n), text=f"{n} MB") for n in (50, 100, 250, 500, 1000)],
+            on_select=on_auto_mb_change
+        ),
+        ft.Row([
+            ft.TextButton("Rebuild download index", icon=ft.Icons.MANAGE_SEARCH, on_click=on_rebuild_index),
+            index_status,
+        ]),
         ft.Container(height=20),
         ft.Text("About", size=20, weight=ft.FontWeight.BOLD),
         ft.Text("Version: 2.0.0"),
@@ -268,8 +439,8 @@ def app_main(page: ft.Page):
         ft.ExpansionTile(
             title=ft.Text("FAQ / Help"),
             controls=[
-                ft.ListTile(title=ft.Text("Where are files saved?"), subtitle=ft.Text("In the 'downloads' folder inside the app directory.")),
-                ft.ListTile(title=ft.Text("Why is it slow?"), subtitle=ft.Text("High quality video merging (4K/8K) takes CPU power."))
+                ft.ListTile(title=ft.Text("Where are files saved?"), subtitle=ft.Text("In the 'downloads' folder inside the app directory. Files appear there once complete; until then they are in the scratch folder.")),
+                ft.ListTile(title=ft.Text("Why is it slow?"), subtitle=ft.Text("High quality video merging (4K/8K) takes CPU power. Merges run one per CPU core while the next downloads continue."))
             ]
         )
     ], scroll=ft.ScrollMode.AUTO)
@@ -279,10 +450,11 @@ def app_main(page: ft.Page):
     downloader_view = ft.Container(content=ft.Column([
         ft.Row([url_input, ft.IconButton(ft.Icons.SEARCH, on_click=search_click, icon_color=ft.Colors.PRIMARY)]),
         status_text,
-        progress_card,
+        queue_panel,
         ft.Divider(),
+        # The results grid scrolls on its own, so its window only has the playlist card above it
         results_area
-    ], scroll=ft.ScrollMode.ADAPTIVE), padding=10)
+    ], expand=True), padding=10)
     
     settings_view = ft.Container(content=settings_content, padding=10)
 
@@ -315,6 +487,7 @@ def app_main(page: ft.Page):
         ]
     )
     
+    page.controls.remove(splash)
     page.add(SafeContainer(body, page))
 
     # Show Coffee Dialog on Load
@@ -333,6 +506,42 @@ def app_main(page: ft.Page):
     page.overlay.append(coffee_dialog)
     coffee_dialog.open = True
     page.update()
+    startup.mark("ready")
+
+    def on_warm():
+        # Pick up downloads the last run didn't finish (once per process); they continue from their .part files.
+        # Waits for the warm-up so ffmpeg is on PATH before any of them merges.
+        restored = engine.restore()
+        if restored:
+            # Runs on the warm-up thread; the page is only touched from the publisher's
+            def apply():
+                status_text.value = f"Resuming {len(restored)} unfinished download(s)"
+                status_text.color = ft.Colors.WHITE
+            publisher.post(apply)
+        log_event("startup", **startup.timings)
+
+    startup.warm_up(on_done=on_warm)
+
+    def on_resize(e):
+        # Column count and the windowed rows depend on the width; resizes arrive in bursts
+        publisher.mark_dirty('layout', results_area.update_layout)
+
+    def on_disconnect(e):
+        # Tab closed or offline; the session may still come back until it expires
+        lookup.cancel()
+
+    def on_close(e):
+        # Session expired: drop everything it holds. Its downloads keep running in the engine.
+        download_queue.remove_listener(on_job_changed)
+        for batch, listener in playlist_batches: batch.remove_listener(listener)
+        playlist_batches.clear()
+        lookup.close()
+        publisher.close()
+        engine.close_session(session_id)
+
+    page.on_resize = on_resize
+    page.on_disconnect = on_disconnect
+    page.on_close = on_close
 
 def main(page: ft.Page):
     try:
@@ -0,0 +1,235 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from audio_presets import plan_audio
+from auto_quality import AUTO_PRESET, pick_format
+from core_downloader import VIDEO_ONLY, get_video_info
+from download_queue import DONE, FAILED, CANCELLED, FINAL_STATES
+
+# One quality choice applied to every entry: key -> (label, yt-dlp format / preset id, max height)
+PLAYLIST_PRESETS = {
+    'best': ("Best Video", 'bestvideo+bestaudio/best', None),
+    '1080p': ("HD (1080p)", 'bestvideo[height<=1080]+bestaudio/best[height<=1080]', 1080),
+    '720p': ("720p", 'bestvideo[height<=720]+bestaudio/best[height<=720]', 720),
+    '480p': ("480p", 'bestvideo[height<=480]+bestaudio/best[height<=480]', 480),
+    'audio_mp3_320': ("High Quality MP3 (320kbps)", 'audio_mp3_320', 0),
+    'audio_mp3_best': ("Standard MP3 (192kbps)", 'audio_mp3_best', 0),
+    'audio_m4a': ("M4A (no re-encode)", 'audio_m4a', 0),
+    'audio_opus': ("Opus (no re-encode)", 'audio_opus', 0),
+    'auto': ("Auto (fits time/data budget)", AUTO_PRESET, None),
+}
+
+def entry_url(entry):
+    url = entry.get('url') or entry.get('webpage_url')
+    if url and url.startswith(("http://", "https://")): return url
+    return f"https://www.youtube.com/watch?v={entry['id']}"
+
+def estimate_preset_size(info, preset, budget=None):
+    """
+    Best guess of the bytes `preset` will fetch for a hydrated video, 0 if unknown.
+    `budget` holds the auto preset's budget_seconds/budget_bytes.
+    """
+    _, fmt, max_height = PLAYLIST_PRESETS[preset]
+    index = info.get('formats')
+    if not index: return 0
+    if fmt == AUTO_PRESET: return pick_format(index, **(budget or {}))['size']
+    if max_height == 0:
+        src = plan_audio(index, fmt)['source']
+        return src.filesize if src else 0
+
+    best = index.best_video(max_height)
+    if not best: return 0
+    size = best.filesize
+    if best.kind == VIDEO_ONLY and size and index.best_audio: size += index.best_audio.filesize
+    return size
+
+def hydrate_entries(entries, max_workers=4):
+    """
+    Resolves full metadata for flat playlist entries on a bounded pool.
+    Yields (entry, info) in completion order; lookups go through the info cache.
+    `entries` is consumed lazily with a small lookahead, so a streamed
+    playlist is only enumerated as fast as it is being resolved.
+    """
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="playlist-hydrate")
+    entries = iter(entries)
+    pending = {}
+
+    def fill():
+        while len(pending) < max_workers * 2:
+            entry = next(entries, None)
+            if entry is None: return
+            pending[pool.submit(get_video_info, entry_url(entry))] = entry
+
+    try:
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                entry = pending.pop(f)
+                try:
+                    info = f.result()
+                except Exception as e:
+                    info = {'error': str(e)}
+                yield entry, info
+            fill()
+    finally:
+        # Stopping early (cancel) must not wait for pending lookups
+        pool.shutdown(wait=False, cancel_futures=True)
+
+class PlaylistDownload:
+    """
+    Downloads every entry of a playlist with one preset.
+    Entries are hydrated in parallel and fed to the download queue as soon as
+    each one resolves, so downloads start while the rest is still being looked up.
+    `entries` may be a lazy iterable (core_downloader.playlist_entries); it is
+    consumed once, and `total` is the expected count if known up front.
+    `owner` is passed on to the queue with every job.
+    """
+    def __init__(self, queue, entries, preset, output_dir, hydrate_workers=4, job_options=None, total=None, owner=None):
+        self.queue = queue
+        self.owner = owner
+        self.job_options = job_options or {}
+        self.entries = entries
+        self.total = total
+        self._enumerated = 0
+        self._enumeration_done = False
+        self.enumeration_error = None
+        self.preset = preset
+        self.output_dir = output_dir
+        self.hydrate_workers = hydrate_workers
+
+        self._lock = threading.Lock()
+        self._job_ids = set()
+        self._estimates = {} # job id -> estimated bytes
+        self._finished = {} # job id -> finished job, in case the queue prunes it
+        self._hydrated = 0
+        self._unavailable = 0
+        self._started_at = None
+        self._listeners = []
+        self._cancelled = False
+
+    def add_listener(self, fn):
+        """
+        `fn(batch)` is called whenever something changed; call stats() when you
+        actually need numbers, it walks every job.
+        """
+        self._listeners.append(fn)
+
+    def remove_listener(self, fn):
+        if fn in self._listeners: self._listeners.remove(fn)
+
+    def start(self):
+        self._started_at = time.time()
+        self.queue.add_listener(self._on_job)
+        threading.Thread(target=self._feed, daemon=True, name="playlist-feed").start()
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled = True
+            job_ids = list(self._job_ids)
+        for job_id in job_ids:
+            self.queue.cancel(job_id)
+        self._emit()
+
+    def stats(self):
+        with self._lock:
+            jobs = [self.queue.get(i) or self._finished.get(i) for i in self._job_ids]
+            jobs = [j for j in jobs if j]
+            # Until enumeration ends the count is the site's figure, or what we've seen so far
+            if self._enumeration_done: total = self._enumerated
+            else: total = max(self.total or 0, self._enumerated)
+            done = sum(1 for j in jobs if j.status == DONE)
+            failed = sum(1 for j in jobs if j.status in (FAILED, CANCELLED)) + self._unavailable
+
+            bytes_done = 0
+            bytes_total = 0
+            speed = 0.0
+            for j in jobs:
+                est = self._estimates.get(j.id, 0)
+                if j.status == DONE:
+                    got = max(j.progress.downloaded_bytes, est)
+                    bytes_done += got
+                    bytes_total += got
+                else:
+                    bytes_done += j.progress.downloaded_bytes
+                    bytes_total += max(est, j.progress.total_bytes)
+                    speed += j.progress.speed or 0
+
+            # Entries we haven't resolved yet are assumed to be the average size so far
+            known = len(jobs)
+            if known and total > known: bytes_total += bytes_total / known * (total - known - self._unavailable)
+
+            eta = (bytes_total - bytes_done) / speed if speed > 0 and bytes_total > bytes_done else None
+            finished = self._enumeration_done and done + failed >= total
+            if self._cancelled: finished = all(j.status in FINAL_STATES for j in jobs)
+            return {
+                'items_total': total, 'items_done': done, 'items_failed': failed,
+                'items_hydrated': self._hydrated, 'items_enumerated': self._enumerated,
+                'enumerating': not self._enumeration_done, 'bytes_done': bytes_done,
+                'bytes_total': int(bytes_total), 'speed': speed, 'eta': eta,
+                'finished': finished,
+            }
+
+    # --- Internals ---
+
+    def _feed(self):
+        _, fmt, _ = PLAYLIST_PRESETS[self.preset]
+        try:
+            for entry, info in hydrate_entries(self._count_entries(), self.hydrate_workers):
+                estimate = estimate_preset_size(info, self.preset, self._budget())
+                with self._lock:
+                    if self._cancelled: break
+                    self._hydrated += 1
+                    if 'error' in info or info.get('type') != 'video':
+                        self._unavailable += 1
+                        continue
+                # Outside the lock: the queue calls every listener (UI included) from submit
+                job = self.queue.submit(info['original_url'], fmt, self.output_dir, title=info.get('title') or entry.get('title'),
+                                        owner=self.owner, **self.job_options)
+                with self._lock:
+                    self._job_ids.add(job.id)
+                    self._estimates[job.id] = estimate
+                    # cancel() may have run between the check and the submit, missing this job
+                    cancelled = self._cancelled
+                if cancelled:
+                    self.queue.cancel(job.id)
+                    break
+        except Exception as e:
+            # Enumeration failed part way; what was found so far still downloads
+            self.enumeration_error = str(e)
+            print(f"Playlist enumeration error: {e}")
+            with self._lock:
+                # Entries read ahead but never resolved count as failed
+                self._unavailable += self._enumerated - self._hydrated
+        with self._lock:
+            self._enumeration_done = True
+            submitted = bool(self._job_ids)
+        self._emit()
+        # _on_job only lets go of the queue when one of our jobs ends; there may be none
+        if not submitted or self.stats()['finished']: self.queue.remove_listener(self._on_job)
+
+    def _count_entries(self):
+        for entry in self.entries:
+            with self._lock:
+                self._enumerated += 1
+            yield entry
+
+    def _budget(self):
+        return {k: self.job_options[k] for k in ('budget_seconds', 'budget_bytes') if k in self.job_options}
+
+    def _on_job(self, job):
+        if job.id not in self._job_ids: return
+        if job.status in FINAL_STATES:
+            with self._lock:
+                self._finished[job.id] = job
+        self._emit()
+        if job.status in FINAL_STATES and self.stats()['finished']:
+            self.queue.remove_listener(self._on_job)
+
+    def _emit(self):
+        for fn in list(self._listeners):
+            try:
+                fn(self)
+            except Exception as e:
+                print(f"Playlist listener error: {e}")
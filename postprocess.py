@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from app_config import get_setting
+from telemetry import metrics
+
+def cpu_count():
+    """
+    Cores this process may run on.
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+class PostprocessPool:
+    """
+    Runs postprocessing callables on `max_workers` threads, with at most
+    `max_pending` more waiting. submit() returns a Future.
+    """
+    def __init__(self, max_workers=None, max_pending=None):
+        self.max_workers = max(1, int(max_workers or cpu_count()))
+        self.max_pending = max(0, int(max_pending if max_pending is not None else self.max_workers))
+        self._cond = threading.Condition()
+        self._backlog = deque()
+        self._active = 0
+        self._closed = False
+        self._stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'blocked_seconds': 0.0, 'busy_seconds': 0.0}
+        self._workers = [
+            threading.Thread(target=self._worker, daemon=True, name=f"postprocess-{i + 1}")
+            for i in range(self.max_workers)
+        ]
+        for w in self._workers: w.start()
+
+    def submit(self, fn, *args):
+        """
+        Queues `fn(*args)`, waiting while every worker is busy and the backlog is full.
+        """
+        future = Future()
+        with self._cond:
+            started = time.monotonic()
+            while not self._closed and self._active + len(self._backlog) >= self.max_workers + self.max_pending:
+                self._cond.wait()
+            if self._closed: raise RuntimeError("Postprocess pool is shut down")
+            self._stats['blocked_seconds'] += time.monotonic() - started
+            self._stats['submitted'] += 1
+            self._backlog.append((future, fn, args))
+            self._cond.notify_all()
+        return future
+
+    def stats(self):
+        with self._cond:
+            s = dict(self._stats)
+            s.update(workers=self.max_workers, active=self._active, queued=len(self._backlog))
+            return s
+
+    def shutdown(self):
+        """
+        Stops taking work; queued items not yet started are cancelled.
+        """
+        with self._cond:
+            self._closed = True
+            while self._backlog: self._backlog.popleft()[0].cancel()
+            self._cond.notify_all()
+
+    # --- Internals ---
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._backlog and not self._closed: self._cond.wait()
+                if not self._backlog: return
+                future, fn, args = self._backlog.popleft()
+                if not future.set_running_or_notify_cancel(): continue
+                self._active += 1
+            started = time.monotonic()
+            try:
+                result = fn(*args)
+                error = None
+            except BaseException as e:
+                error = e
+            with self._cond:
+                self._active -= 1
+                self._stats['busy_seconds'] += time.monotonic() - started
+                self._stats['failed' if error else 'completed'] += 1
+                self._cond.notify_all()
+            if error: future.set_exception(error)
+            else: future.set_result(result)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_postprocess_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None: _pool = PostprocessPool(max_workers=get_setting("postprocess_workers", 0) or None)
+        return _pool
+
+def _pool_metrics():
+    if _pool is None: return []
+    stats = _pool.stats()
+    return [
+        ("ytdl_postprocess_workers", stats['workers'], {}),
+        ("ytdl_postprocess_active", stats['active'], {}),
+        ("ytdl_postprocess_queued", stats['queued'], {}),
+    ]
+
+metrics.describe("ytdl_postprocess_active", "gauge", "Merges/conversions running now")
+metrics.describe("ytdl_postprocess_queued", "gauge", "Finished downloads waiting for a postprocess worker")
+metrics.add_collector(_pool_metrics)
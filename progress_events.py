@@ -0,0 +1,111 @@
+import math
+import threading
+import time
+
+class SpeedMeter:
+    """
+    Smoothed transfer speed from raw byte counters.
+    Uses an exponential moving average with a time constant, so the result
+    doesn't depend on how often yt-dlp happens to call the hook.
+    """
+    def __init__(self, time_constant=3.0):
+        self.time_constant = time_constant
+        self.speed = 0.0
+        self._last_bytes = None
+        self._last_time = None
+
+    def reset(self):
+        self.speed = 0.0
+        self._last_bytes = None
+        self._last_time = None
+
+    def add_sample(self, downloaded_bytes, now=None):
+        now = now if now is not None else time.monotonic()
+        if self._last_bytes is None or downloaded_bytes < self._last_bytes:
+            # First sample, or a new stream started (e.g. audio after video)
+            self._last_bytes, self._last_time = downloaded_bytes, now
+            return self.speed
+
+        dt = now - self._last_time
+        if dt <= 0: return self.speed
+        instant = (downloaded_bytes - self._last_bytes) / dt
+        alpha = 1 - math.exp(-dt / self.time_constant)
+        self.speed = instant if self.speed == 0 else self.speed + alpha * (instant - self.speed)
+        self._last_bytes, self._last_time = downloaded_bytes, now
+        return self.speed
+
+    def eta(self, downloaded_bytes, total_bytes):
+        if not total_bytes or self.speed <= 0: return None
+        return max(0.0, (total_bytes - downloaded_bytes) / self.speed)
+
+class UIPublisher:
+    """
+    Coalesces UI changes from worker threads and applies them on one thread
+    at a fixed rate, followed by a single page.update().
+
+    mark_dirty(key, fn): `fn` mutates controls; only the latest fn per key runs.
+    post(fn): a one-off mutation (dialogs, status text) that runs on the next tick.
+    """
+    def __init__(self, page, rate_hz=4.0):
+        self.page = page
+        self.interval = 1.0 / max(0.5, float(rate_hz))
+        self._lock = threading.Lock()
+        self._dirty = {}
+        self._posted = []
+        self._wake = threading.Event()
+        self._closed = False
+        self._stats = {'events': 0, 'publishes': 0, 'apply_errors': 0}
+        self._thread = threading.Thread(target=self._run, daemon=True, name="ui-publisher")
+        self._thread.start()
+
+    def mark_dirty(self, key, fn):
+        with self._lock:
+            self._dirty[key] = fn
+            self._stats['events'] += 1
+        self._wake.set()
+
+    def post(self, fn):
+        with self._lock:
+            self._posted.append(fn)
+            self._stats['events'] += 1
+        self._wake.set()
+
+    def set_rate(self, rate_hz):
+        self.interval = 1.0 / max(0.5, float(rate_hz))
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait()
+            if self._closed: return
+            started = time.monotonic()
+            with self._lock:
+                self._wake.clear()
+                work = self._posted + list(self._dirty.values())
+                self._posted = []
+                self._dirty = {}
+
+            for fn in work:
+                try:
+                    fn()
+                except Exception as e:
+                    self._stats['apply_errors'] += 1
+                    print(f"UI update error: {e}")
+            try:
+                self.page.update()
+                self._stats['publishes'] += 1
+            except Exception as e:
+                # Browser tab disconnected; the controls are up to date if it reconnects.
+                # The thread ends when the session closes (close()).
+                print(f"UI publish error: {e}")
+
+            # Hold off so bursts of events collapse into the next tick
+            remaining = self.interval - (time.monotonic() - started)
+            if remaining > 0: time.sleep(remaining)
@@ -0,0 +1,164 @@
+import random
+import re
+import threading
+import time
+
+from yt_dlp.networking.exceptions import HTTPError, IncompleteRead, TransportError
+
+import bandwidth
+
+# Seconds without a single byte before a request counts as stalled
+STALL_TIMEOUT = 10
+# Retries per request for yt-dlp's own downloaders, which don't tell error classes apart
+REQUEST_RETRIES = 5
+# Longest single sleep while backing off (see bandwidth.MAX_WAIT)
+WAIT_STEP = bandwidth.MAX_WAIT
+
+HEDGE_PERCENTILE = 0.9
+HEDGE_MIN_SAMPLES = 3
+HEDGE_MIN_SECONDS = 1.0
+
+# Error classes
+RATE_LIMITED = 'rate_limited'
+SERVER = 'server'
+STALLED = 'stalled'
+RESET = 'reset'
+FORBIDDEN = 'forbidden'
+FATAL = 'fatal'
+
+_HTTP_STATUS_RE = re.compile(r'HTTP Error (\d{3})')
+
+class RetryPolicy:
+    """
+    How often one error class is retried: `retries` times per request
+    (segment or fragment), `job_retries` more times for the whole download,
+    waiting about `base` * 2^attempt seconds (at most `cap`) in between.
+    """
+    def __init__(self, retries, job_retries, base=1.0, cap=30.0):
+        self.retries = retries
+        self.job_retries = job_retries
+        self.base = base
+        self.cap = cap
+
+    def delay(self, attempt, exc=None):
+        """
+        Seconds to wait before retry number `attempt + 1`: half fixed, half random.
+        """
+        step = min(self.cap, self.base * 2 ** attempt)
+        wait = step / 2 + random.uniform(0, step / 2)
+        after = retry_after(exc)
+        if after: wait = max(wait, min(after, self.cap))
+        return wait
+
+POLICIES = {
+    RATE_LIMITED: RetryPolicy(5, 2, base=2.0, cap=60.0),
+    SERVER: RetryPolicy(4, 2, base=1.0, cap=30.0),
+    STALLED: RetryPolicy(5, 2, base=0.25, cap=8.0),
+    RESET: RetryPolicy(5, 2, base=0.25, cap=8.0),
+    # Usually an expired signed link: the same URL won't work again, a fresh extraction might
+    FORBIDDEN: RetryPolicy(0, 1, base=1.0, cap=5.0),
+    FATAL: RetryPolicy(0, 0),
+}
+
+def _causes(exc):
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        inner = getattr(exc, 'exc_info', None)
+        if inner and isinstance(inner[1], BaseException): exc = inner[1]
+        elif isinstance(getattr(exc, 'cause', None), BaseException): exc = exc.cause
+        else: exc = exc.__cause__ or exc.__context__
+
+def _status_kind(status):
+    if status == 429: return RATE_LIMITED
+    if status == 403: return FORBIDDEN
+    if status == 408 or status >= 500: return SERVER
+    return FATAL
+
+def error_kind(exc):
+    """
+    The retry class of an exception, looking through yt-dlp's wrappers.
+    """
+    for e in _causes(exc):
+        if isinstance(e, HTTPError): return _status_kind(e.status)
+        if isinstance(e, TimeoutError) or 'timed out' in str(e).lower(): return STALLED
+        if isinstance(e, (ConnectionError, IncompleteRead)): return RESET
+    m = _HTTP_STATUS_RE.search(str(exc))
+    if m: return _status_kind(int(m.group(1)))
+    # Other transport failures (closed mid-read, proxy/TLS hiccups) are worth another
+    # try; OSErrors with an errno are local (disk full, permissions) and aren't
+    if any(isinstance(e, TransportError) or (type(e) is OSError and e.errno is None) for e in _causes(exc)): return RESET
+    return FATAL
+
+def retry_after(exc):
+    """
+    Seconds from a Retry-After header on the HTTP error behind `exc`, if any.
+    """
+    for e in _causes(exc):
+        if isinstance(e, HTTPError):
+            try:
+                return float(e.response.headers.get('Retry-After'))
+            except (TypeError, ValueError, AttributeError):
+                return None
+    return None
+
+def plan_retry(exc, attempt, job=False):
+    """
+    Returns (error class, seconds to wait) for retrying after `exc` on
+    attempt number `attempt` (0-based), or (error class, None) to give up.
+    """
+    kind = error_kind(exc)
+    policy = POLICIES[kind]
+    if attempt >= (policy.job_retries if job else policy.retries): return kind, None
+    return kind, policy.delay(attempt, exc)
+
+def wait(seconds, stop=None, lease=None):
+    """
+    Sleeps up to `seconds`. Returns False early if `stop` (an Event) is set;
+    raises BandwidthInterrupted if the job's bandwidth `lease` is interrupted
+    (the job was paused or cancelled).
+    """
+    deadline = time.monotonic() + seconds
+    while True:
+        if lease is not None and lease.interrupted: raise bandwidth.BandwidthInterrupted("Download interrupted while backing off")
+        remaining = deadline - time.monotonic()
+        if remaining <= 0: return True
+        if stop is not None:
+            if stop.wait(min(WAIT_STEP, remaining)): return False
+        else:
+            time.sleep(min(WAIT_STEP, remaining))
+
+def ytdl_sleep_function(policy=POLICIES[RESET]):
+    """
+    A `retry_sleep_functions` entry for yt-dlp's own retry loops (fragments,
+    single-stream downloads): jittered backoff that ends early when the job
+    is paused or cancelled. It does the waiting itself and returns 0.
+    """
+    def sleep(n):
+        wait(policy.delay(n), lease=bandwidth.current_lease())
+        return 0
+    return sleep
+
+class LatencyTracker:
+    """
+    Durations of finished requests within one download, and the hedging
+    threshold derived from them (None until there are enough samples).
+    """
+    def __init__(self, percentile=HEDGE_PERCENTILE, min_samples=HEDGE_MIN_SAMPLES, min_seconds=HEDGE_MIN_SECONDS):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_seconds = min_seconds
+        self._lock = threading.Lock()
+        self._samples = []
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def threshold(self):
+        with self._lock:
+            if len(self._samples) < self.min_samples: return None
+            ordered = sorted(self._samples)
+        value = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))]
+        return max(self.min_seconds, value)
@@ -0,0 +1,385 @@
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from urllib.parse import urlparse
+
+import yt_dlp.downloader
+from yt_dlp.downloader.common import FileDownloader
+from yt_dlp.downloader.http import HttpFD
+from yt_dlp.networking import Request, HEADRequest
+from yt_dlp.postprocessor.common import PostProcessor
+
+import bandwidth
+import telemetry
+from bandwidth import BandwidthInterrupted
+from resilience import LatencyTracker, plan_retry, wait
+
+SEGMENTED_PROTOCOL = 'segmented_http'
+
+MIN_SEGMENTED_SIZE = 8 * 1024 * 1024 # smaller files aren't worth the extra requests
+SEGMENT_SIZE = 4 * 1024 * 1024 # YouTube throttles single ranges above ~10MB
+READ_BLOCK = 64 * 1024
+MAX_CONNECTIONS = 8
+DEFAULT_CONNECTIONS = 4
+# How often a connection with nothing left to fetch checks for a segment to hedge
+HEDGE_POLL = 0.1
+
+# Domains (and their subdomains) that belong to one site; media edge hosts change per video
+_SITE_ALIASES = {'youtube.com': 'youtube.com', 'youtu.be': 'youtube.com', 'googlevideo.com': 'youtube.com'}
+
+class RangeNotSupported(Exception):
+    pass
+
+def site_key(url):
+    """
+    What connection counts are learned per: the site for hosts under one of
+    _SITE_ALIASES ('youtube.com' for www.youtube.com and youtu.be alike),
+    the full host otherwise.
+    """
+    host = (urlparse(url).hostname or '').lower()
+    # Not the last two labels: under co.uk or com.br those are shared by unrelated sites
+    for domain, site in _SITE_ALIASES.items():
+        if host == domain or host.endswith('.' + domain): return site
+    return host
+
+class ConnectionTuner:
+    """
+    Picks a connection count per site (see site_key) from the throughput of earlier jobs.
+    Simple hill climb: keep the best count seen, and try one more connection
+    while that still looks like an improvement.
+    """
+    def __init__(self, default=DEFAULT_CONNECTIONS, maximum=MAX_CONNECTIONS, smoothing=0.5):
+        self.default = default
+        self.maximum = maximum
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self._history = {} # host -> {connections: smoothed bytes/s}
+
+    def suggest(self, url):
+        host = site_key(url)
+        with self._lock:
+            seen = self._history.get(host)
+            if not seen: return self.default
+            best = max(seen, key=seen.get)
+            # Explore upwards until adding a connection stops paying off
+            if best < self.maximum and best + 1 not in seen: return best + 1
+            return best
+
+    def record(self, url, connections, bytes_per_sec):
+        if bytes_per_sec <= 0: return
+        host = site_key(url)
+        with self._lock:
+            seen = self._history.setdefault(host, {})
+            old = seen.get(connections)
+            seen[connections] = bytes_per_sec if old is None else old + self.smoothing * (bytes_per_sec - old)
+
+    def snapshot(self):
+        with self._lock:
+            return {h: dict(v) for h, v in self._history.items()}
+
+tuner = ConnectionTuner()
+
+class SegmentedHttpFD(FileDownloader):
+    """
+    Downloads one file over several ranged requests in parallel.
+    Falls back to yt-dlp's HttpFD if the server ignores Range.
+    """
+    FD_NAME = 'segmented'
+
+    def real_download(self, filename, info_dict):
+        url = info_dict['url']
+        total = info_dict.get('filesize')
+        connections = max(1, min(MAX_CONNECTIONS, info_dict.get('_segment_connections') or DEFAULT_CONNECTIONS))
+        if not total or connections == 1:
+            return self._fallback(filename, info_dict)
+
+        tmpfilename = self.temp_name(filename)
+        self.report_destination(filename)
+        done = self._load_segment_map(tmpfilename, total)
+        if done:
+            self.to_screen(f'[download] Resuming: {len(done)} segments already downloaded')
+        else:
+            with open(tmpfilename, 'wb') as f:
+                f.truncate(total)
+
+        segments = queue.Queue()
+        resumed = 0
+        for start in range(0, total, SEGMENT_SIZE):
+            end = min(start + SEGMENT_SIZE, total) - 1
+            if start in done:
+                resumed += end - start + 1
+            else:
+                segments.put((start, end))
+
+        state = {'bytes': resumed, 'error': None} # bytes of finished segments
+        lock = threading.Lock()
+        stop = threading.Event()
+        headers = dict(info_dict.get('http_headers') or {})
+        retries = self.params.get('retries')
+        if retries is None or retries == float('inf'): retries = 10
+        # start -> {'end', 'started', 'hedged', 'progress': {request: bytes}} for segments being fetched
+        inflight = {}
+        latency = LatencyTracker()
+        hedging = info_dict.get('_segment_hedge', True)
+
+        def fetch(start, end, fh, request):
+            """
+            One ranged request; True once the segment is written, False if
+            stopped or another request finished the segment first.
+            """
+            got = 0
+            finished = False
+            # Reads give up after the session's socket_timeout (resilience.STALL_TIMEOUT)
+            resp = self.ydl.urlopen(Request(url, headers={**headers, 'Range': f'bytes={start}-{end}'}))
+            try:
+                if resp.status != 206: raise RangeNotSupported(f'HTTP {resp.status} for a ranged request')
+                fh.seek(start)
+                while start + got <= end:
+                    if stop.is_set() or start in done: return False
+                    block = resp.read(min(READ_BLOCK, end - start - got + 1))
+                    if not block: raise OSError(f'Connection closed at byte {start + got} of segment {start}-{end}')
+                    # A hedged copy writes the same bytes to the same place, so overlapping writes are harmless
+                    fh.write(block)
+                    got += len(block)
+                    with lock:
+                        seg = inflight.get(start)
+                        if seg: seg['progress'][request] = got
+                    if lease: lease.consume(len(block))
+                finished = True
+                return True
+            finally:
+                # Failed or lost requests stop counting towards progress
+                if not finished:
+                    with lock:
+                        seg = inflight.get(start)
+                        if seg: seg['progress'].pop(request, None)
+                resp.close()
+
+        def downloaded():
+            with lock:
+                return state['bytes'] + sum(max(s['progress'].values(), default=0) for s in inflight.values())
+
+        def complete(start, end, fh, started):
+            fh.flush()
+            with lock:
+                if start in done: return False
+                done.add(start)
+                inflight.pop(start, None)
+                state['bytes'] += end - start + 1
+                self._save_segment_map(tmpfilename, total, done)
+            latency.add(time.monotonic() - started)
+            return True
+
+        def fail(e):
+            state['error'] = e
+            stop.set()
+
+        def fetch_segment(start, end, fh):
+            with lock:
+                inflight[start] = {'end': end, 'started': time.monotonic(), 'hedged': False, 'progress': {}}
+            for attempt in itertools.count():
+                if start in done: return # a hedged request got there first
+                started = time.monotonic()
+                try:
+                    if fetch(start, end, fh, object()): complete(start, end, fh, started)
+                    return
+                except (RangeNotSupported, BandwidthInterrupted) as e:
+                    return fail(e)
+                except Exception as e:
+                    if stop.is_set() or start in done: return
+                    kind, delay = plan_retry(e, attempt)
+                    if delay is None or attempt >= retries: return fail(e)
+                    telemetry.record_retry(kind)
+                    self.write_debug(f'Segment {start}-{end}: {e} ({kind}); attempt {attempt + 2} in {delay:.1f}s')
+                    try:
+                        if not wait(delay, stop, lease): return
+                    except BandwidthInterrupted as e:
+                        return fail(e)
+
+        def pick_hedge():
+            threshold = latency.threshold()
+            if threshold is None: return None
+            now = time.monotonic()
+            with lock:
+                for start, seg in inflight.items():
+                    if not seg['hedged'] and now - seg['started'] > threshold:
+                        seg['hedged'] = True
+                        return start, seg['end']
+            return None
+
+        def hedge_segment(start, end, fh):
+            """
+            Races a second request against a slow segment; errors are left to the first one.
+            """
+            started = time.monotonic()
+            try:
+                won = fetch(start, end, fh, object()) and complete(start, end, fh, started)
+            except BandwidthInterrupted as e:
+                return fail(e)
+            except Exception as e:
+                self.write_debug(f'Hedged request for segment {start}-{end} failed: {e}')
+                won = False
+            if not stop.is_set(): telemetry.record_hedge(won)
+
+        trace = telemetry.current_trace()
+        # Workers charge the job's bandwidth lease themselves; progress dicts
+        # below are marked so the per-job throttle hook doesn't count them again
+        lease = bandwidth.current_lease()
+
+        def worker():
+            # Retries reported from here are attributed to the job's trace
+            with telemetry.bind(trace), open(tmpfilename, 'r+b') as fh:
+                while not stop.is_set():
+                    try:
+                        start, end = segments.get_nowait()
+                    except queue.Empty:
+                        # Out of new segments: help with the slow ones until all are in
+                        target = pick_hedge() if hedging else None
+                        if target:
+                            hedge_segment(*target, fh)
+                            continue
+                        with lock:
+                            if not hedging or not inflight: return
+                        stop.wait(HEDGE_POLL)
+                        continue
+                    fetch_segment(start, end, fh)
+
+        threads = [threading.Thread(target=worker, daemon=True, name=f'segment-{i}') for i in range(connections)]
+        started = time.time()
+        for t in threads: t.start()
+
+        try:
+            # Progress is reported from this thread only, so hooks never run concurrently
+            while any(t.is_alive() for t in threads):
+                time.sleep(0.2)
+                self._report(filename, tmpfilename, info_dict, downloaded(), total, started, resumed)
+        except BaseException:
+            stop.set()
+            for t in threads: t.join()
+            raise
+        for t in threads: t.join()
+
+        if isinstance(state['error'], BandwidthInterrupted):
+            raise state['error']
+        if isinstance(state['error'], RangeNotSupported):
+            self.to_screen(f'[download] Server does not support ranges ({state["error"]}); using a single connection')
+            os.remove(tmpfilename)
+            self._remove_segment_map(tmpfilename)
+            return self._fallback(filename, info_dict)
+        if state['error']:
+            self.report_error(f'Segmented download failed: {state["error"]}')
+            return False
+
+        elapsed = time.time() - started
+        # Learned under the page link, which is what download_stream asks the tuner with
+        if not resumed: tuner.record(info_dict.get('_segment_page') or url, connections, total / elapsed if elapsed > 0 else 0)
+        self._remove_segment_map(tmpfilename)
+        self.try_rename(tmpfilename, filename)
+        self._hook_progress({
+            'downloaded_bytes': total,
+            'total_bytes': total,
+            'filename': filename,
+            'status': 'finished',
+            'elapsed': elapsed,
+            '_throttled': True,
+        }, info_dict)
+        return True
+
+    def _load_segment_map(self, tmpfilename, total):
+        """
+        Starts of the segments already in the .part file, or an empty set if
+        there's nothing usable to resume from.
+        """
+        if not self.params.get('continuedl', True): return set()
+        try:
+            with open(tmpfilename + '.segments') as f:
+                saved = json.load(f)
+            if saved['total'] != total or saved['segment_size'] != SEGMENT_SIZE: return set()
+            if os.path.getsize(tmpfilename) != total: return set()
+            return set(saved['done'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return set()
+
+    def _save_segment_map(self, tmpfilename, total, done):
+        path = tmpfilename + '.segments'
+        try:
+            with open(path + '.tmp', 'w') as f:
+                json.dump({'total': total, 'segment_size': SEGMENT_SIZE, 'done': sorted(done)}, f)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            self.report_warning(f'Could not save segment map: {e}')
+
+    def _remove_segment_map(self, tmpfilename):
+        try:
+            os.remove(tmpfilename + '.segments')
+        except OSError:
+            pass
+
+    def _report(self, filename, tmpfilename, info_dict, downloaded, total, started, resumed=0):
+        elapsed = time.time() - started
+        speed = (downloaded - resumed) / elapsed if elapsed > 0 else None
+        self._hook_progress({
+            'status': 'downloading',
+            'downloaded_bytes': downloaded,
+            'total_bytes': total,
+            'filename': filename,
+            'tmpfilename': tmpfilename,
+            'elapsed': elapsed,
+            'speed': speed,
+            'eta': (total - downloaded) / speed if speed else None,
+            '_throttled': True,
+        }, info_dict)
+
+    def _fallback(self, filename, info_dict):
+        fd = HttpFD(self.ydl, self.params)
+        for ph in self._progress_hooks:
+            fd.add_progress_hook(ph)
+        return fd.real_download(filename, info_dict)
+
+yt_dlp.downloader.PROTOCOL_MAP[SEGMENTED_PROTOCOL] = SegmentedHttpFD
+
+class SegmentedDownloadPP(PostProcessor):
+    """
+    'before_dl' step that moves large progressive formats onto SegmentedHttpFD.
+    `connections=None` means auto-tune per host; `hedge` allows duplicate
+    requests for slow segments.
+    """
+    def __init__(self, downloader=None, connections=None, hedge=True):
+        super().__init__(downloader)
+        self.connections = connections
+        self.hedge = hedge
+
+    def run(self, info):
+        requested = info.get('requested_formats')
+        for f in requested or [info]:
+            if f.get('protocol') not in ('http', 'https'): continue
+            page = info.get('webpage_url') or f['url']
+            n = self.connections or tuner.suggest(page)
+            if n <= 1: continue
+            size = f.get('filesize') or self._probe_size(f)
+            if not size or size < MIN_SEGMENTED_SIZE: continue
+            f['protocol'] = SEGMENTED_PROTOCOL
+            f['filesize'] = size
+            f['_segment_connections'] = n
+            f['_segment_hedge'] = self.hedge
+            f['_segment_page'] = page
+            self.write_debug(f'Format {f.get("format_id")}: {n} connections for {size} bytes')
+        if requested:
+            info['protocol'] = '+'.join(f['protocol'] for f in requested)
+        return [], info
+
+    def _probe_size(self, fmt):
+        try:
+            resp = self._downloader.urlopen(HEADRequest(fmt['url'], headers=fmt.get('http_headers') or {}))
+            resp.close()
+        except Exception as e:
+            self.write_debug(f'Size probe failed: {e}')
+            return None
+        if resp.headers.get('Accept-Ranges', '').lower() != 'bytes': return None
+        try:
+            return int(resp.headers.get('Content-Length'))
+        except (TypeError, ValueError):
+            return None
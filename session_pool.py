@@ -0,0 +1,178 @@
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+
+import yt_dlp
+
+# Options that yt-dlp reads at call time. Everything else (network, cookies,
+# extractor setup) is fixed when the YoutubeDL object is built, so it belongs
+# in the profile and must not change between checkouts.
+PER_CALL_OPTIONS = (
+    'format', 'outtmpl', 'paths', 'overwrites', 'continuedl', 'ratelimit',
+    'progress_hooks', 'postprocessor_hooks', 'postprocessors', 'extra_postprocessors',
+    'concurrent_fragment_downloads', 'http_chunk_size', 'buffersize', 'noresizebuffer', 'retries', 'fragment_retries',
+    'noplaylist', 'playlist_items', 'playliststart', 'playlistend', 'extract_flat',
+)
+
+class _Session:
+    def __init__(self, profile, params):
+        self.profile = profile
+        self.source_params = params
+        self.ydl = yt_dlp.YoutubeDL(dict(params))
+        # Snapshot of the fully initialised params to restore on every checkout
+        self.base_params = dict(self.ydl.params)
+        self.base_params['outtmpl'] = dict(self.ydl.params['outtmpl'])
+        self.created_at = time.monotonic()
+        self.uses = 0
+
+    def prepare(self, opts):
+        ydl = self.ydl
+        ydl.params.clear()
+        ydl.params.update(self.base_params)
+        ydl.params['outtmpl'] = dict(self.base_params['outtmpl'])
+        ydl._download_retcode = 0
+
+        # Hooks and postprocessors are rebuilt from scratch for every call
+        ydl._progress_hooks = []
+        ydl._postprocessor_hooks = []
+        ydl._pps = {k: [] for k in ydl._pps}
+
+        for key, value in opts.items():
+            if key in ('progress_hooks', 'postprocessor_hooks', 'postprocessors', 'extra_postprocessors'): continue
+            if key == 'outtmpl':
+                ydl.params['outtmpl'] = {'default': value} if isinstance(value, str) else dict(value)
+                ydl._parse_outtmpl()
+            else:
+                ydl.params[key] = value
+
+        fmt = opts.get('format')
+        ydl.format_selector = ydl.build_format_selector(fmt) if fmt else None
+        for ph in opts.get('progress_hooks', []):
+            ydl.add_progress_hook(ph)
+        for pp_def in opts.get('postprocessors', []):
+            pp_def = dict(pp_def)
+            when = pp_def.pop('when', 'post_process')
+            ydl.add_post_processor(yt_dlp.postprocessor.get_postprocessor(pp_def.pop('key'))(ydl, **pp_def), when=when)
+        # Ready-made PostProcessor objects that aren't in yt-dlp's registry: [(pp, when), ...]
+        for pp, when in opts.get('extra_postprocessors', []):
+            ydl.add_post_processor(pp, when=when)
+        for ph in opts.get('postprocessor_hooks', []):
+            ydl.add_postprocessor_hook(ph)
+        self.uses += 1
+        return ydl
+
+    def close(self):
+        try:
+            self.ydl.close()
+        except Exception as e:
+            print(f"Session close error: {e}")
+
+class SessionPool:
+    """
+    Keeps initialised YoutubeDL objects around between calls, one set per
+    option profile (e.g. extraction vs. download). Reusing them skips
+    extractor setup and keeps HTTP connections alive.
+
+    A session is used by one thread at a time. Sessions are recycled after
+    `max_uses` calls, after `max_age` seconds, or when a call raised.
+    """
+    def __init__(self, max_idle_per_profile=4, max_uses=50, max_age=1800):
+        self.max_idle_per_profile = max_idle_per_profile
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self._profiles = {}
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._stats = {'created': 0, 'reused': 0, 'recycled': 0, 'discarded_on_error': 0}
+
+    def register_profile(self, name, params):
+        """
+        Defines the fixed options for a profile. Re-registering with different
+        options drops the idle sessions built from the old ones.
+        """
+        with self._lock:
+            if self._profiles.get(name) == params: return
+            self._profiles[name] = dict(params)
+            stale = self._idle.pop(name, [])
+        for s in stale: s.close()
+
+    @contextmanager
+    def session(self, profile, **opts):
+        """
+        Checks out a YoutubeDL for `profile` configured with the per-call `opts`
+        (see PER_CALL_OPTIONS) and returns it to the pool afterwards.
+        """
+        bad = [k for k in opts if k not in PER_CALL_OPTIONS]
+        if bad: raise ValueError(f"Options {bad} are fixed per profile")
+
+        sess = self._checkout(profile)
+        ok = False
+        try:
+            yield sess.prepare(opts)
+            ok = True
+        except yt_dlp.utils.YoutubeDLError:
+            # Bad link, unavailable video, cancelled download... the session itself is fine
+            ok = True
+            raise
+        finally:
+            self._checkin(sess, ok)
+
+    def warm(self, profile, count=1):
+        """
+        Builds sessions ahead of time (e.g. from a background thread at startup).
+        """
+        sessions = [self._create(profile) for _ in range(count)]
+        for s in sessions: self._checkin(s, True)
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+            s['idle'] = {k: len(v) for k, v in self._idle.items()}
+            return s
+
+    def close(self):
+        with self._lock:
+            idle = [s for sessions in self._idle.values() for s in sessions]
+            self._idle = {}
+        for s in idle: s.close()
+
+    # --- Internals ---
+
+    def _create(self, profile):
+        with self._lock:
+            params = self._profiles[profile]
+            self._stats['created'] += 1
+        return _Session(profile, params)
+
+    def _checkout(self, profile):
+        with self._lock:
+            if profile not in self._profiles: raise KeyError(f"Unknown session profile: {profile}")
+            idle = self._idle.get(profile)
+            if idle:
+                self._stats['reused'] += 1
+                return idle.pop()
+        return self._create(profile)
+
+    def _checkin(self, sess, ok):
+        expired = sess.uses >= self.max_uses or time.monotonic() - sess.created_at > self.max_age
+        with self._lock:
+            current = self._profiles.get(sess.profile) is sess.source_params
+            idle = self._idle.setdefault(sess.profile, [])
+            if ok and not expired and current and len(idle) < self.max_idle_per_profile:
+                idle.append(sess)
+                return
+            if not ok: self._stats['discarded_on_error'] += 1
+            elif expired: self._stats['recycled'] += 1
+        sess.close()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_session_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SessionPool()
+            atexit.register(_pool.close)
+        return _pool
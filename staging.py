@@ -0,0 +1,109 @@
+import errno
+import os
+import shutil
+
+from yt_dlp.postprocessor.common import PostProcessor
+from yt_dlp.utils import DownloadError
+
+# Default scratch folder: hidden inside the output folder, so publishing is a plain rename
+INCOMPLETE_DIR = ".incomplete"
+# Left free on a volume after a download
+DISK_RESERVE = 64 * 1024 * 1024
+# Merging or converting holds the inputs and the output at the same time
+MERGE_FACTOR = 2
+COPY_BLOCK = 1024 * 1024
+
+# Not a PostProcessingError: yt-dlp holds those back from 'before_dl' steps until after the transfer
+class NotEnoughSpace(DownloadError):
+    pass
+
+def scratch_dir(output_folder, scratch_root=None):
+    """
+    Folder for the in-progress files of downloads into `output_folder`.
+    """
+    folder = scratch_root or os.path.join(output_folder, INCOMPLETE_DIR)
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+def expected_size(fmt, duration=None):
+    """
+    Bytes a yt-dlp format dict will take, 0 if unknown.
+    """
+    size = fmt.get('filesize') or fmt.get('filesize_approx')
+    if not size and duration and fmt.get('tbr'): size = fmt['tbr'] * 125 * duration
+    return int(size or 0)
+
+def _mb(n):
+    return f"{n / (1024 * 1024):.0f} MB"
+
+def preflight(needed, scratch, target, merge=False):
+    """
+    Raises NotEnoughSpace unless `scratch` and `target` have room for a
+    download of `needed` bytes (`merge`: streams are merged or converted).
+    """
+    if not needed: return
+    in_scratch = needed * MERGE_FACTOR if merge else needed
+    checks = [(scratch, in_scratch)]
+    # On another volume the finished file is copied over; on the same one it's only renamed
+    if os.stat(scratch).st_dev != os.stat(target).st_dev: checks.append((target, needed))
+    for folder, n in checks:
+        free = shutil.disk_usage(folder).free
+        if free < n + DISK_RESERVE:
+            raise NotEnoughSpace(f"Not enough space in {os.path.abspath(folder)}: about {_mb(n)} needed, {_mb(free)} free")
+
+class DiskSpacePP(PostProcessor):
+    """
+    'before_dl' step that runs preflight() for the formats yt-dlp picked.
+    `converts` marks downloads that are converted after the transfer (audio presets).
+    """
+    def __init__(self, downloader=None, scratch=None, target=None, converts=False):
+        super().__init__(downloader)
+        self.scratch = scratch
+        self.target = target
+        self.converts = converts
+
+    def run(self, info):
+        requested = info.get('requested_formats')
+        needed = sum(expected_size(f, info.get('duration')) for f in requested or [info])
+        preflight(needed, self.scratch, self.target, merge=self.converts or len(requested or ()) > 1)
+        return [], info
+
+def publish(path, folder):
+    """
+    Moves a finished file into `folder` so it shows up there complete or not
+    at all, replacing a file of the same name. Returns the new path.
+    """
+    target = os.path.join(folder, os.path.basename(path))
+    if os.path.abspath(path) == os.path.abspath(target): return target
+    try:
+        os.replace(path, target)
+    except OSError as e:
+        if e.errno != errno.EXDEV: raise
+        copy_atomic(path, target)
+        os.remove(path)
+    return target
+
+def copy_atomic(src, target):
+    """
+    Copies `src` to a hidden name next to `target`, then renames it into place.
+    """
+    tmp = os.path.join(os.path.dirname(target), f".{os.path.basename(target)}.publishing")
+    try:
+        with open(src, 'rb') as fin, open(tmp, 'wb') as fout:
+            shutil.copyfileobj(fin, fout, COPY_BLOCK)
+            fout.flush()
+            os.fsync(fout.fileno())
+        shutil.copystat(src, tmp)
+        os.replace(tmp, target)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def remove_if_empty(folder):
+    try:
+        os.rmdir(folder)
+    except OSError:
+        pass
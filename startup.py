@@ -0,0 +1,80 @@
+# Standard library only, so this module is cheap to import first thing
+import os
+import shutil
+import threading
+import time
+
+from app_config import get_setting, set_setting
+
+FFMPEG_SETTING = "ffmpeg_dir"
+FFMPEG_BINARY = "ffmpeg.exe" if os.name == "nt" else "ffmpeg"
+
+# Close enough to process start when imported first thing
+_t0 = time.perf_counter()
+timings = {} # phase -> seconds since start
+
+_warm_lock = threading.Lock()
+_warm_started = False
+_warmed = threading.Event()
+
+def mark(phase):
+    timings[phase] = round(time.perf_counter() - _t0, 4)
+    return timings[phase]
+
+def ensure_ffmpeg():
+    """
+    Puts ffmpeg on PATH and returns its folder, or None when there isn't one
+    (mobile builds). Uses the folder found on an earlier start if it still has ffmpeg.
+    """
+    cached = get_setting(FFMPEG_SETTING)
+    if cached and os.path.isfile(os.path.join(cached, FFMPEG_BINARY)):
+        _add_to_path(cached)
+        return cached
+
+    found = shutil.which("ffmpeg")
+    if not found:
+        try:
+            import static_ffmpeg
+            # Auto-install/add ffmpeg to path
+            static_ffmpeg.add_paths()
+        except ImportError:
+            print("static_ffmpeg not found (Expected on mobile)")
+        except Exception as e:
+            print(f"static_ffmpeg error: {e}")
+        found = shutil.which("ffmpeg")
+    folder = os.path.dirname(os.path.abspath(found)) if found else None
+    if folder != cached: set_setting(FFMPEG_SETTING, folder)
+    return folder
+
+def _add_to_path(folder):
+    paths = os.environ.get("PATH", "").split(os.pathsep)
+    if folder not in paths: os.environ["PATH"] = os.pathsep.join([folder] + paths)
+
+def warm_up(on_done=None):
+    """
+    Finds ffmpeg, then imports yt-dlp and builds the first extraction session,
+    on a background thread. This happens once per process; later calls (other
+    app sessions) only wait for it. `on_done()` runs on that thread afterwards.
+    """
+    global _warm_started
+    with _warm_lock:
+        first = not _warm_started
+        _warm_started = True
+
+    def run():
+        if first:
+            try:
+                ensure_ffmpeg()
+                mark("ffmpeg")
+                from core_downloader import warm_sessions
+                warm_sessions()
+                mark("warm")
+            except Exception as e:
+                print(f"Warm-up failed: {e}")
+            _warmed.set()
+        else:
+            _warmed.wait()
+        if on_done: on_done()
+    thread = threading.Thread(target=run, daemon=True, name="warm-up")
+    thread.start()
+    return thread
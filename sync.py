@@ -0,0 +1,172 @@
+import sqlite3
+import threading
+import time
+
+from app_config import data_path
+from core_downloader import PlaylistStream
+from download_queue import DONE, FINAL_STATES, PAUSED
+from info_cache import canonical_key
+from playlist_engine import PLAYLIST_PRESETS, entry_url
+
+# Consecutive archived entries that end the listing (tolerates a few reordered or removed videos)
+STOP_AFTER_KNOWN = 10
+
+class SyncArchive:
+    """
+    Seen video IDs per source, and the settings each source was last synced with.
+    """
+    def __init__(self, db_path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            " source TEXT NOT NULL, video_id TEXT NOT NULL, added_at REAL NOT NULL,"
+            " PRIMARY KEY (source, video_id))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sources ("
+            " source TEXT PRIMARY KEY, url TEXT NOT NULL, preset TEXT NOT NULL, output_dir TEXT NOT NULL,"
+            " title TEXT, last_sync REAL, last_new INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.commit()
+
+    def known(self, source, video_ids):
+        """
+        The subset of `video_ids` already archived for `source`.
+        """
+        video_ids = [v for v in video_ids if v]
+        if not video_ids: return set()
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT video_id FROM seen WHERE source = ? AND video_id IN ({','.join('?' * len(video_ids))})",
+                [source] + video_ids
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def mark(self, source, video_ids):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO seen (source, video_id, added_at) VALUES (?, ?, ?)",
+                [(source, v, time.time()) for v in video_ids if v]
+            )
+            self._db.commit()
+
+    def count(self, source):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM seen WHERE source = ?", (source,)).fetchone()[0]
+
+    def save_source(self, source, url, preset, output_dir, title, new_count):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sources (source, url, preset, output_dir, title, last_sync, last_new)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (source, url, preset, output_dir, title, time.time(), new_count)
+            )
+            self._db.commit()
+
+    def sources(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT source, url, preset, output_dir, title, last_sync, last_new FROM sources ORDER BY url"
+            ).fetchall()
+        keys = ('source', 'url', 'preset', 'output_dir', 'title', 'last_sync', 'last_new')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+def find_new(archive, url, full=False, stop_after_known=STOP_AFTER_KNOWN):
+    """
+    Lists `url` until `stop_after_known` archived entries in a row (or to the
+    end with `full`, for playlists that add videos at the bottom).
+    Returns (new entries in listing order, stats dict).
+    """
+    source = canonical_key(url)
+    stream = PlaylistStream(url)
+    pages = stream.pages()
+    new = []
+    checked = streak = 0
+    stopped_early = False
+    try:
+        for page in pages:
+            known = archive.known(source, [e['id'] for e in page])
+            for entry in page:
+                checked += 1
+                if entry['id'] not in known:
+                    streak = 0
+                    new.append(entry)
+                    continue
+                streak += 1
+                if not full and streak >= stop_after_known:
+                    stopped_early = True
+                    break
+            if stopped_early: break
+    finally:
+        # Returns the extract session without listing the rest
+        pages.close()
+    return new, {
+        'source': source, 'title': stream.title, 'checked': checked,
+        'reported_count': stream.reported_count, 'stopped_early': stopped_early,
+    }
+
+def sync_source(queue, archive, url, preset, output_dir, full=False, mark_only=False, on_job=None):
+    """
+    Downloads what's new in one source through `queue` and archives it.
+    `mark_only` archives the current entries without downloading (to start
+    following a source from now on). `on_job(job)` gets each finished job.
+    A job that gets paused is counted as paused, left unarchived and passed to
+    `on_job` too: nothing would resume it while the sync waits. Returns a summary dict.
+    """
+    started = time.monotonic()
+    new, summary = find_new(archive, url, full=full)
+    source = summary['source']
+    summary.update(url=url, preset=preset, new=len(new), downloaded=0, failed=0, paused=0, archived_before=archive.count(source))
+
+    if mark_only:
+        archive.mark(source, [e['id'] for e in new])
+    elif new:
+        fmt = PLAYLIST_PRESETS[preset][1] if preset in PLAYLIST_PRESETS else preset
+        pending = {}
+        all_done = threading.Condition()
+
+        def listener(job):
+            if job.status not in FINAL_STATES and job.status != PAUSED: return
+            with all_done:
+                entry = pending.pop(job.id, None)
+                if entry is None: return
+                if job.status == DONE:
+                    summary['downloaded'] += 1
+                    archive.mark(source, [entry['id']])
+                elif job.status == PAUSED:
+                    summary['paused'] += 1
+                else:
+                    summary['failed'] += 1
+                all_done.notify_all()
+            if on_job: on_job(job)
+
+        queue.add_listener(listener)
+        try:
+            # Oldest first, so files and the archive fill in upload order
+            for entry in reversed(new):
+                with all_done:
+                    job = queue.submit(entry_url(entry), fmt, output_dir, title=entry.get('title'))
+                    pending[job.id] = entry
+            with all_done:
+                while pending: all_done.wait()
+        finally:
+            queue.remove_listener(listener)
+
+    archive.save_source(source, url, preset, output_dir, summary['title'], len(new))
+    summary['new_ids'] = [e['id'] for e in new]
+    summary['elapsed_s'] = round(time.monotonic() - started, 3)
+    return summary
+
+_archive = None
+_archive_lock = threading.Lock()
+
+def get_sync_archive():
+    global _archive
+    with _archive_lock:
+        if _archive is None: _archive = SyncArchive(data_path("sync.sqlite3"))
+        return _archive
@@ -0,0 +1,341 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app_config import data_path
+
+PHASE_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+LOG_MAX_BYTES = 5 * 1024 * 1024 # the log is rotated once to .1 at this size
+
+class Metrics:
+    """
+    Minimal counter/histogram registry rendered in the Prometheus text format.
+    Collectors add values computed at scrape time (queue sizes, cache stats).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = {} # name -> (type, help)
+        self._counters = {} # (name, labels) -> value
+        self._histograms = {} # (name, labels) -> [bucket counts..., sum, count]
+        self._collectors = []
+
+    def describe(self, name, kind, help_text):
+        self._meta[name] = (kind, help_text)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None: h = self._histograms[key] = [0] * (len(PHASE_BUCKETS) + 2)
+            for i, bound in enumerate(PHASE_BUCKETS):
+                if value <= bound: h[i] += 1
+            h[-2] += value
+            h[-1] += 1
+
+    def add_collector(self, fn):
+        """
+        `fn()` returns [(name, value, labels_dict), ...]; described names render as gauges.
+        """
+        self._collectors.append(fn)
+
+    def value(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: list(v) for k, v in self._histograms.items()}
+        gauges = []
+        for fn in list(self._collectors):
+            try:
+                gauges.extend(fn())
+            except Exception as e:
+                print(f"Metrics collector error: {e}")
+
+        def header(name, default_kind):
+            kind, help_text = self._meta.get(name, (default_kind, ""))
+            if help_text: lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        seen = set()
+        for (name, labels), value in sorted(counters.items()):
+            if name not in seen:
+                seen.add(name)
+                header(name, "counter")
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for (name, labels), h in sorted(histograms.items()):
+            if name not in seen:
+                seen.add(name)
+                header(name, "histogram")
+            for bound, count in zip(PHASE_BUCKETS, h):
+                lines.append(f"{name}_bucket{_labels(labels + (('le', str(bound)),))} {count}")
+            lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {h[-1]}")
+            lines.append(f"{name}_sum{_labels(labels)} {round(h[-2], 6)}")
+            lines.append(f"{name}_count{_labels(labels)} {h[-1]}")
+        for name, value, labels in gauges:
+            if name not in seen:
+                seen.add(name)
+                header(name, "gauge")
+            lines.append(f"{name}{_labels(tuple(sorted(labels.items())))} {value}")
+        return "\n".join(lines) + "\n"
+
+def _labels(labels):
+    if not labels: return ""
+    body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")) for k, v in labels)
+    return "{" + body + "}"
+
+metrics = Metrics()
+metrics.describe("ytdl_phase_seconds", "histogram", "Time spent per job phase")
+metrics.describe("ytdl_downloads_total", "counter", "Finished download jobs by final status")
+metrics.describe("ytdl_download_failures_total", "counter", "Failed download jobs by error class")
+metrics.describe("ytdl_downloaded_bytes_total", "counter", "Bytes of completed streams")
+metrics.describe("ytdl_retries_total", "counter", "Retries reported by yt-dlp and the segmented downloader")
+metrics.describe("ytdl_hedged_requests_total", "counter", "Duplicate requests for slow segments, by whether they finished first")
+metrics.describe("ytdl_extractions_total", "counter", "Metadata extractions by result")
+metrics.describe("ytdl_download_index_hits_total", "counter", "Downloads served from a file already on disk")
+
+# --- JSON log ---
+
+_log_lock = threading.Lock()
+
+def log_event(event, **fields):
+    """
+    Appends one JSON line to data/telemetry.jsonl.
+    """
+    record = {'ts': round(time.time(), 3), 'event': event}
+    record.update(fields)
+    line = json.dumps(record, default=str) + "\n"
+    path = data_path("telemetry.jsonl")
+    with _log_lock:
+        try:
+            if os.path.exists(path) and os.path.getsize(path) > LOG_MAX_BYTES:
+                os.replace(path, path + ".1")
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            print(f"Telemetry log error: {e}")
+
+def error_class(exc):
+    """
+    Name of the underlying error; yt-dlp wraps most failures in DownloadError.
+    """
+    inner = getattr(exc, 'exc_info', None)
+    if inner and inner[1] is not None: exc = inner[1]
+    cause = getattr(exc, 'cause', None)
+    if isinstance(cause, BaseException): exc = cause
+    return type(exc).__name__
+
+# --- Traces ---
+
+class Trace:
+    """
+    Spans for one job. `progress_hook` / `postprocessor_hook` plug straight
+    into yt-dlp; `mark_extracted` is called once extraction is done.
+    """
+    def __init__(self, trace_id, **attrs):
+        self.trace_id = trace_id
+        self.attrs = attrs
+        self.spans = []
+        self.started = time.time()
+        self._t0 = time.monotonic()
+        self.retries = 0
+        self.counters = {} # retries per error class, hedged requests
+        self.bytes = 0
+        self.error_class = None
+        self._lock = threading.Lock()
+        self._open = {} # key -> span dict
+        self.start_span('extract')
+
+    def _now(self):
+        return time.monotonic() - self._t0
+
+    def start_span(self, name, key=None, **attrs):
+        with self._lock:
+            span = {'name': name, 'start': round(self._now(), 4), 'end': None}
+            if attrs: span['attrs'] = attrs
+            self.spans.append(span)
+            self._open[key or name] = span
+            return span
+
+    def end_span(self, key, **attrs):
+        with self._lock:
+            span = self._open.pop(key, None)
+            if not span: return None
+            span['end'] = round(self._now(), 4)
+            if attrs: span.setdefault('attrs', {}).update(attrs)
+            return span
+
+    @contextmanager
+    def span(self, name, **attrs):
+        self.start_span(name, **attrs)
+        try:
+            yield
+        finally:
+            self.end_span(name)
+
+    def mark_extracted(self):
+        self.end_span('extract')
+
+    def progress_hook(self, d):
+        info = d.get('info_dict') or {}
+        key = ('download', info.get('format_id'), d.get('filename'))
+        if d['status'] == 'downloading' and key not in self._open:
+            self.mark_extracted()
+            self.start_span('download', key=key, format_id=info.get('format_id'))
+        elif d['status'] == 'finished':
+            self.mark_extracted()
+            size = d.get('total_bytes') or d.get('downloaded_bytes') or 0
+            self.bytes += size
+            # Already-downloaded streams only report 'finished'
+            if key not in self._open: self.start_span('download', key=key, format_id=info.get('format_id'))
+            self.end_span(key, bytes=size)
+        elif d['status'] == 'error':
+            self.end_span(key, error=True)
+
+    def postprocessor_hook(self, d):
+        name = d.get('postprocessor')
+        key = ('postprocess', name)
+        if d['status'] == 'started': self.start_span(f'postprocess.{name}', key=key)
+        elif d['status'] == 'finished': self.end_span(key)
+
+    def add_retry(self, kind=None):
+        with self._lock:
+            self.retries += 1
+            if kind: self.counters[f"retry_{kind}"] = self.counters.get(f"retry_{kind}", 0) + 1
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def fail(self, exc):
+        self.error_class = error_class(exc)
+
+    def phase_totals(self):
+        """
+        Seconds per phase name, summed over spans (streams download in sequence).
+        """
+        totals = {}
+        with self._lock:
+            for s in self.spans:
+                if s['end'] is None: continue
+                totals[s['name']] = round(totals.get(s['name'], 0) + s['end'] - s['start'], 4)
+        return totals
+
+    def finish(self, status, **fields):
+        """
+        Closes open spans, updates metrics and writes the trace to the JSON log.
+        """
+        for key in list(self._open): self.end_span(key, unfinished=True)
+        for name, seconds in self.phase_totals().items():
+            metrics.observe("ytdl_phase_seconds", seconds, phase=name)
+        metrics.inc("ytdl_downloads_total", status=status)
+        metrics.inc("ytdl_downloaded_bytes_total", self.bytes)
+        if status == "failed": metrics.inc("ytdl_download_failures_total", error_class=self.error_class or "Unknown")
+        log_event(
+            "job", trace_id=self.trace_id, status=status, duration=round(self._now(), 4),
+            bytes=self.bytes, retries=self.retries, counters=self.counters, error_class=self.error_class,
+            phases=self.phase_totals(), spans=self.spans, **dict(self.attrs, **fields)
+        )
+
+_current = threading.local()
+
+def current_trace():
+    return getattr(_current, 'trace', None)
+
+@contextmanager
+def bind(trace):
+    """
+    Makes `trace` the current one for this thread (used for retry attribution).
+    """
+    previous = current_trace()
+    _current.trace = trace
+    try:
+        yield trace
+    finally:
+        _current.trace = previous
+
+class YtdlLogger:
+    """
+    `logger` for YoutubeDL: counts retries and records errors as JSON events
+    instead of printing to the console.
+    """
+    def debug(self, msg):
+        if "Retrying" in msg: self._retry(msg)
+
+    def info(self, msg):
+        pass
+
+    def warning(self, msg):
+        if "Retrying" in msg: self._retry(msg)
+
+    def error(self, msg):
+        trace = current_trace()
+        log_event("ytdl_error", trace_id=trace.trace_id if trace else None, message=msg)
+
+    def _retry(self, msg):
+        record_retry()
+
+def record_retry(kind=None):
+    """
+    Counts one retry, by error class when known (see resilience.py).
+    """
+    if kind: metrics.inc("ytdl_retries_total", kind=kind)
+    else: metrics.inc("ytdl_retries_total")
+    trace = current_trace()
+    if trace: trace.add_retry(kind)
+
+def record_hedge(won):
+    metrics.inc("ytdl_hedged_requests_total", outcome="won" if won else "lost")
+    trace = current_trace()
+    if trace: trace.count("hedge_won" if won else "hedge_lost")
+
+# --- Endpoint ---
+
+_server = None
+_server_failed = False
+_server_lock = threading.Lock()
+
+def serve_metrics(port, host="127.0.0.1"):
+    """
+    Starts the /metrics endpoint once per process. Returns the server, or
+    None if the port couldn't be opened (tried once per process too).
+    """
+    global _server, _server_failed
+    with _server_lock:
+        if _server or _server_failed: return _server
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            _server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            # Every new session calls this; don't retry the port and repeat the message each time
+            _server_failed = True
+            print(f"Metrics endpoint not started on {host}:{port}: {e}")
+            return None
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, daemon=True, name="metrics-http").start()
+        return _server
@@ -0,0 +1,219 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None # stored as fetched; YouTube's small variants are already close to display size
+
+from app_config import data_path, get_setting
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+THUMBS_SUBDIR = "thumbs"
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+# Cards show thumbnails 160px high; fetch enough pixels for 2x screens
+DEFAULT_HEIGHT = 160
+PIXEL_RATIO = 2
+FETCH_TIMEOUT = 10
+# Playlist entries fetched ahead of being shown; the rest load on demand
+THUMBNAIL_PREFETCH_ENTRIES = 48
+
+# YouTube serves these for every video: (name, width, height), smallest first
+YOUTUBE_VARIANTS = (
+    ('mqdefault', 320, 180),
+    ('hqdefault', 480, 360),
+    ('sddefault', 640, 480),
+    ('maxresdefault', 1280, 720),
+)
+
+def youtube_variant_url(video_id, height):
+    """
+    URL of the smallest YouTube thumbnail at least `height` pixels high.
+    """
+    name = next((n for n, _, h in YOUTUBE_VARIANTS if h >= height), YOUTUBE_VARIANTS[-1][0])
+    return f"https://i.ytimg.com/vi/{video_id}/{name}.jpg"
+
+def entry_source(entry):
+    """
+    (thumbnail_url, video_id) for a flat playlist entry; video_id only for YouTube entries.
+    """
+    thumbs = entry.get('thumbnails') or []
+    url = entry.get('thumbnail') or (thumbs[-1].get('url') if thumbs else None)
+    return url, entry.get('id') if entry.get('ie_key') == 'Youtube' else None
+
+def _default_folder():
+    folder = os.path.join(ASSETS_DIR, THUMBS_SUBDIR)
+    try:
+        os.makedirs(folder, exist_ok=True)
+        if os.access(folder, os.W_OK): return folder
+    except OSError:
+        pass
+    # Packaged mobile builds ship assets read-only; cards then get the image bytes
+    return data_path(THUMBS_SUBDIR)
+
+class ThumbnailCache:
+    """
+    Fetches and stores downscaled thumbnails. `src_for` never blocks: it
+    returns the local src when cached, otherwise None and fetches in the
+    background, calling `on_ready(src)` once the file is in place.
+    """
+    def __init__(self, folder=None, max_bytes=DEFAULT_MAX_BYTES, workers=4):
+        self.folder = folder or _default_folder()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._files = OrderedDict() # name -> size, least recently used first
+        self._bytes = 0
+        self._inflight = {} # name -> [callbacks]
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbs")
+        self._http = requests.Session()
+        self._stats = {'hits': 0, 'fetched': 0, 'fetched_bytes': 0, 'stored_bytes': 0, 'evicted': 0, 'errors': 0}
+        self._load()
+
+    def src_for(self, thumbnail_url=None, video_id=None, height=DEFAULT_HEIGHT, on_ready=None):
+        """
+        Local src ('/thumbs/<name>', or the image bytes when the assets folder
+        isn't writable) for a video's thumbnail shown `height` pixels high.
+        """
+        name, url = self._source(thumbnail_url, video_id, height)
+        if not name: return None
+        with self._lock:
+            if name in self._files:
+                self._files.move_to_end(name)
+                self._stats['hits'] += 1
+                hit = True
+            else:
+                hit = False
+                waiting = self._inflight.get(name)
+                if waiting is None:
+                    self._inflight[name] = [on_ready] if on_ready else []
+                    self._pool.submit(self._fetch, name, url, height * PIXEL_RATIO)
+                elif on_ready:
+                    waiting.append(on_ready)
+        if hit:
+            self._touch(name)
+            return self._src(name)
+        return None
+
+    def prefetch(self, items, height=DEFAULT_HEIGHT):
+        """
+        Queues fetches for (thumbnail_url, video_id) pairs, e.g. playlist entries.
+        """
+        for thumbnail_url, video_id in items:
+            self.src_for(thumbnail_url, video_id, height)
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+            s.update(files=len(self._files), bytes=self._bytes, pending=len(self._inflight))
+            return s
+
+    # --- Internals ---
+
+    def _source(self, thumbnail_url, video_id, height):
+        px = height * PIXEL_RATIO
+        if video_id:
+            return f"{video_id}_{px}.jpg", youtube_variant_url(video_id, px)
+        if thumbnail_url:
+            return f"{hashlib.sha1(thumbnail_url.encode('utf-8')).hexdigest()[:16]}_{px}.jpg", thumbnail_url
+        return None, None
+
+    def _load(self):
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            entries = [e for e in os.scandir(self.folder) if e.is_file() and e.name.endswith(".jpg")]
+        except OSError as e:
+            print(f"Thumbnail cache unavailable: {e}")
+            return
+        for e in sorted(entries, key=lambda e: e.stat().st_mtime):
+            size = e.stat().st_size
+            self._files[e.name] = size
+            self._bytes += size
+        self._evict()
+
+    def _fetch(self, name, url, px):
+        src = None
+        try:
+            resp = self._http.get(url, timeout=FETCH_TIMEOUT)
+            resp.raise_for_status()
+            data = self._downscale(resp.content, px)
+            path = os.path.join(self.folder, name)
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+            with self._lock:
+                self._files[name] = len(data)
+                self._bytes += len(data)
+                self._stats['fetched'] += 1
+                self._stats['fetched_bytes'] += len(resp.content)
+                self._stats['stored_bytes'] += len(data)
+                self._evict()
+            src = self._src(name)
+        except (requests.RequestException, OSError) as e:
+            with self._lock:
+                self._stats['errors'] += 1
+            print(f"Thumbnail fetch failed for {url}: {e}")
+        finally:
+            with self._lock:
+                callbacks = self._inflight.pop(name, [])
+        # Failures report None; the caller can fall back to the remote URL
+        for cb in callbacks:
+            try:
+                cb(src)
+            except Exception as e:
+                print(f"Thumbnail callback error: {e}")
+
+    def _downscale(self, data, px):
+        if Image is None: return data
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                if img.height <= px: return data
+                img = img.convert("RGB")
+                img.thumbnail((img.width * px // img.height, px))
+                out = io.BytesIO()
+                img.save(out, "JPEG", quality=82, optimize=True)
+                return out.getvalue() if out.tell() < len(data) else data
+        except (OSError, ValueError):
+            return data
+
+    def _evict(self):
+        # Call with self._lock held
+        while self._bytes > self.max_bytes and len(self._files) > 1:
+            name, size = self._files.popitem(last=False)
+            self._bytes -= size
+            self._stats['evicted'] += 1
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except OSError:
+                pass
+
+    def _touch(self, name):
+        # mtime is the LRU order across restarts
+        try:
+            os.utime(os.path.join(self.folder, name))
+        except OSError:
+            pass
+
+    def _src(self, name):
+        if os.path.dirname(self.folder) == ASSETS_DIR:
+            return f"/{THUMBS_SUBDIR}/{name}"
+        try:
+            with open(os.path.join(self.folder, name), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_thumbnail_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ThumbnailCache(max_bytes=get_setting("thumbnail_cache_mb", DEFAULT_MAX_BYTES // (1024 * 1024)) * 1024 * 1024)
+        return _cache
@@ -1,4 +1,7 @@
 import flet as ft
+from collections import OrderedDict
+
+from download_queue import QUEUED, RUNNING, PAUSED, DONE, FAILED, CANCELLED
 
 class SafeContainer(ft.Container):
     """
@@ -14,49 +17,196 @@ class ResponsiveGrid(ft.Column):
     """
     A layout that behaves as a list on mobile (single column)
     and a grid on tablet/desktop (multiple columns).
+
+    set_items shows a short list as given. Long result sets come from a
+    source (set_source): cards are built on demand and only the rows in or
+    near the viewport exist as controls, with spacers standing in for the
+    rest, so the control tree and the websocket traffic stay flat however
+    long the list gets. Scrolling or growing the source only adds and drops
+    rows at the edges of the window; rows that stay are reused as-is.
     """
-    def __init__(self, items: list[ft.Control], page: ft.Page):
+    GRID_BREAKPOINT = 600 # px; narrower is phone/list mode
+    SPACING = 20
+
+    def __init__(self, items: list[ft.Control], page: ft.Page, overscan_rows=3, cache_items=200):
         super().__init__()
-        self.raw_items = items
         self.page_ref = page
         self.scroll = ft.ScrollMode.ADAPTIVE
         self.expand = True
-        self.controls = [] 
-        self.update_layout()
+        self.scroll_interval = 100 # ms between scroll events
+        self.on_scroll = self.handle_scroll
+        self.overscan_rows = overscan_rows
+        self.cache_items = cache_items
+        self.raw_items = []
+        self._grid_row = None
+        self._source = None
+        self.controls = []
+        self.set_items(items)
+
+    # --- Short lists ---
 
     def set_items(self, items: list[ft.Control]):
+        self._source = None
         self.raw_items = items
         self.update_layout()
 
     def update_layout(self):
-        # Determine strict breakpoints
-        # Phone: < 600px
-        # Tablet: >= 600px
-        width = self.page_ref.width if self.page_ref.width else 400
-        
-        is_tablet = width >= 600
-        
-        if is_tablet:
-            # Grid Mode
-            self.controls = [
-                ft.Row(
-                    controls=self.raw_items, 
-                    wrap=True, 
-                    spacing=20, 
-                    run_spacing=20,
+        """
+        Re-applies the layout for the current width (call after a resize).
+        """
+        if self._source:
+            self._source['rows'] = {}
+            self._source['window'] = None
+            self._render_window()
+            return
+        self.spacing = 10
+        if self._is_tablet():
+            # Grid Mode; the wrapping row is kept so updates only send what changed
+            if self._grid_row is None:
+                self._grid_row = ft.Row(
+                    wrap=True,
+                    spacing=self.SPACING,
+                    run_spacing=self.SPACING,
                     alignment=ft.MainAxisAlignment.START,
                     vertical_alignment=ft.CrossAxisAlignment.START
                 )
-            ]
+            self._grid_row.controls = self.raw_items
+            self.controls = [self._grid_row]
         else:
             # List Mode
             self.controls = self.raw_items
 
+    # --- Long lists ---
+
+    def set_source(self, count, build_item, item_extent, item_width=None, header=None, header_extent=0, on_end_reached=None):
+        """
+        Shows `count` items built by `build_item(i)` when they come into view.
+        `item_extent` is the height of one row of cards (spacing included) and
+        `item_width` a card's width in grid mode (None keeps a single column).
+        `header` controls are shown above the items; `header_extent` is their
+        approximate height. `on_end_reached()` is called (on the UI thread,
+        so it shouldn't block) when the window gets near the last item, to
+        load the next page. Does not push an update.
+        """
+        self.raw_items = []
+        self._source = {
+            'count': count, 'build': build_item, 'extent': item_extent, 'width': item_width,
+            'header': list(header or []), 'header_extent': header_extent, 'on_end': on_end_reached,
+            'built': OrderedDict(), 'rows': {}, 'window': None, 'scroll': 0.0, 'viewport': None,
+            'top': ft.Container(height=0), 'bottom': ft.Container(height=0), 'end_requested_at': None,
+        }
+        self.spacing = 0
+        self._render_window()
+
+    def set_count(self, count):
+        """
+        The source grew (or shrank): e.g. another page of results arrived. Does not push an update.
+        """
+        if not self._source: return
+        src = self._source
+        if count < src['count']:
+            src['built'].clear()
+            src['rows'] = {}
+        src['count'] = count
+        self._render_window()
+
+    def handle_scroll(self, e):
+        """
+        on_scroll handler; also attach it to an outer scrolling column if that's the one that scrolls.
+        """
+        if not self._source: return
+        self._source['scroll'] = e.pixels
+        self._source['viewport'] = e.viewport_dimension
+        if self._render_window(): self.update()
+
+    def window(self):
+        """
+        (first, last) item indexes currently materialised, for diagnostics.
+        """
+        if not self._source or not self._source['window']: return (0, len(self.raw_items))
+        first, last, cols, count = self._source['window']
+        return (first * cols, min(count, last * cols))
+
+    # --- Internals ---
+
+    def _is_tablet(self):
+        width = self.page_ref.width if self.page_ref.width else 400
+        return width >= self.GRID_BREAKPOINT
+
+    def _columns(self):
+        src = self._source
+        if not src['width'] or not self._is_tablet(): return 1
+        width = self.page_ref.width
+        return max(1, int((width + self.SPACING) // (src['width'] + self.SPACING)))
+
+    def _render_window(self):
+        """
+        Materialises the rows in and around the viewport. Returns True if the controls changed.
+        """
+        src = self._source
+        cols = self._columns()
+        extent = src['extent']
+        total_rows = -(-src['count'] // cols)
+        viewport = src['viewport'] or (self.page_ref.height if self.page_ref.height else 800)
+        visible_rows = int(viewport // extent) + 1
+        # Clamped so a reflow to more columns (fewer rows) doesn't leave the window past the end
+        first_visible = min(max(0, int((src['scroll'] - src['header_extent']) // extent)), max(0, total_rows - visible_rows))
+        first = max(0, first_visible - self.overscan_rows)
+        last = min(total_rows, first_visible + visible_rows + self.overscan_rows)
+
+        near_end = last >= total_rows - self.overscan_rows
+        window = (first, last, cols, src['count'])
+        changed = window != src['window']
+        if changed: self._apply_window(window, total_rows)
+        if near_end and src['on_end'] and src['end_requested_at'] != src['count']:
+            # Once per page: the callback loads more and grows the source via set_count
+            src['end_requested_at'] = src['count']
+            src['on_end']()
+        return changed
+
+    def _apply_window(self, window, total_rows):
+        src = self._source
+        first, last, cols, _ = window
+        extent = src['extent']
+        src['window'] = window
+        rows = {}
+        for r in range(first, last):
+            # A partly filled last row is rebuilt when more items arrive
+            filled = min(cols, src['count'] - r * cols)
+            rows[(r, cols, filled)] = src['rows'].get((r, cols, filled)) or self._make_row(r, cols, filled)
+        src['rows'] = rows
+        src['top'].height = first * extent
+        src['bottom'].height = (total_rows - last) * extent
+        self.controls = src['header'] + [src['top']] + list(rows.values()) + [src['bottom']]
+
+    def _make_row(self, r, cols, filled):
+        src = self._source
+        items = [self._item(r * cols + i) for i in range(filled)]
+        if cols == 1:
+            content = items[0]
+        else:
+            content = ft.Row(items, spacing=self.SPACING, vertical_alignment=ft.CrossAxisAlignment.START)
+        return ft.Container(content=content, height=src['extent'])
+
+    def _item(self, i):
+        built = self._source['built']
+        ctl = built.get(i)
+        if ctl is None:
+            ctl = built[i] = self._source['build'](i)
+            # Far-away cards are dropped and rebuilt if scrolled back to
+            while len(built) > self.cache_items: built.popitem(last=False)
+        else:
+            built.move_to_end(i)
+        return ctl
+
 class VideoCard(ft.Container):
     """
     A card component to display video info.
     Supports expanding to show format options.
+    `thumbnail_url` may be None while the thumbnail is still being fetched; see set_thumbnail.
     """
+    THUMB_HEIGHT = 160
+
     def __init__(self, title, thumbnail_url, duration, formats_control=None):
         super().__init__()
         self.border_radius = 10
@@ -65,9 +215,13 @@ class VideoCard(ft.Container):
         # self.width = 300 # Removed fixed width to allow expansion
         # self.expand = True # REMOVED: Causes layout crash in scrollable container
         
+        # Same height with or without the image, so the card doesn't jump when it arrives
+        self.thumb_slot = ft.Container(height=self.THUMB_HEIGHT, border_radius=10, bgcolor=ft.Colors.GREY_800)
+        if thumbnail_url: self.set_thumbnail(thumbnail_url)
+
         # Core Content
         self.main_col = ft.Column([
-            ft.Image(src=thumbnail_url, border_radius=10, height=160, fit=ft.ImageFit.COVER if hasattr(ft, 'ImageFit') else "cover"),
+            self.thumb_slot,
             ft.Text(title, weight=ft.FontWeight.BOLD, no_wrap=True, overflow=ft.TextOverflow.ELLIPSIS),
             ft.Text(f"Duration: {duration}", size=12, color=ft.Colors.GREY_400),
         ])
@@ -77,6 +231,45 @@ class VideoCard(ft.Container):
             
         self.content = self.main_col
 
+    def set_thumbnail(self, src):
+        """
+        Shows the thumbnail (does not push an update).
+        """
+        self.thumb_slot.content = ft.Image(src=src, border_radius=10, height=self.THUMB_HEIGHT, fit=ft.BoxFit.COVER)
+
+class PlaylistEntryRow(ft.Container):
+    """
+    One playlist entry in the results list: position, thumbnail, title and duration.
+    Fixed height so ResponsiveGrid can window long playlists.
+    """
+    HEIGHT = 64
+    WIDTH = 380 # in grid mode
+    THUMB_HEIGHT = 54
+
+    def __init__(self, position, title, duration, thumbnail=None, width=None):
+        super().__init__()
+        self.height = self.HEIGHT
+        self.width = width
+        self.border_radius = 8
+        self.bgcolor = ft.Colors.GREY_900
+        self.padding = ft.padding.symmetric(horizontal=8, vertical=5)
+        self.thumb_slot = ft.Container(width=self.THUMB_HEIGHT * 16 // 9, height=self.THUMB_HEIGHT, border_radius=6, bgcolor=ft.Colors.GREY_800)
+        if thumbnail: self.set_thumbnail(thumbnail)
+        self.content = ft.Row([
+            ft.Text(str(position), width=36, size=12, color=ft.Colors.GREY_500, text_align=ft.TextAlign.RIGHT),
+            self.thumb_slot,
+            ft.Column([
+                ft.Text(title, no_wrap=True, overflow=ft.TextOverflow.ELLIPSIS),
+                ft.Text(duration, size=12, color=ft.Colors.GREY_400),
+            ], spacing=2, expand=True, alignment=ft.MainAxisAlignment.CENTER),
+        ], spacing=10)
+
+    def set_thumbnail(self, src):
+        """
+        Shows the thumbnail (does not push an update).
+        """
+        self.thumb_slot.content = ft.Image(src=src, border_radius=6, height=self.THUMB_HEIGHT, fit=ft.BoxFit.COVER)
+
 class DownloadOptionRow(ft.Container):
     """
     A row displaying Quality | Size | Extension | Download Button
@@ -96,37 +289,203 @@ class DownloadOptionRow(ft.Container):
             ft.IconButton(ft.Icons.DOWNLOAD, on_click=on_click, icon_color=ft.Colors.PRIMARY)
         ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN)
 
-class ProgressCard(ft.Container):
+class JobCard(ft.Container):
     """
-    Shows detailed progress: Bar + Text Stats
+    One entry in the download queue: title, state, progress and controls.
     """
-    def __init__(self):
+    def __init__(self, job, on_pause, on_resume, on_cancel, on_prioritize):
         super().__init__()
-        self.visible = False
+        self.job_id = job.id
+        self.status = None
         self.bgcolor = ft.Colors.GREY_900
-        self.padding = 15
+        self.padding = 10
         self.border_radius = 10
-        
-        self.status_text = ft.Text("Starting...", size=14, weight=ft.FontWeight.BOLD)
-        self.details_text = ft.Text("0 MB / 0 MB", size=12, color=ft.Colors.GREY_400)
+        self.margin = ft.margin.only(bottom=5)
+
+        self.title_text = ft.Text(job.title, weight=ft.FontWeight.BOLD, size=14, no_wrap=True, overflow=ft.TextOverflow.ELLIPSIS)
+        self.status_text = ft.Text("", size=12, color=ft.Colors.GREY_400)
         self.p_bar = ft.ProgressBar(value=0, color=ft.Colors.PRIMARY, bgcolor=ft.Colors.GREY_800)
-        
+
+        self.pause_btn = ft.IconButton(ft.Icons.PAUSE, tooltip="Pause", on_click=lambda e: on_pause(self.job_id))
+        self.resume_btn = ft.IconButton(ft.Icons.PLAY_ARROW, tooltip="Resume", on_click=lambda e: on_resume(self.job_id))
+        self.cancel_btn = ft.IconButton(ft.Icons.CLOSE, tooltip="Cancel", on_click=lambda e: on_cancel(self.job_id))
+        self.top_btn = ft.IconButton(ft.Icons.VERTICAL_ALIGN_TOP, tooltip="Download next", on_click=lambda e: on_prioritize(self.job_id))
+
+        self.content = ft.Column([
+            ft.Row([
+                ft.Container(self.title_text, expand=True),
+                self.top_btn, self.pause_btn, self.resume_btn, self.cancel_btn
+            ]),
+            self.p_bar,
+            self.status_text
+        ], spacing=4)
+        self.apply(job)
+
+    def apply(self, job):
+        """
+        Copies the job's current state into the controls (does not push an update).
+        """
+        self.status = job.status
+        p = job.progress
+        if job.status == DONE:
+            self.p_bar.value = 1.0
+        elif job.status == RUNNING and not p.total_bytes:
+            self.p_bar.value = None # indeterminate until the size is known
+        else:
+            self.p_bar.value = p.fraction
+
+        def fmt_mb(b): return f"{b/1024/1024:.1f} MB"
+        if job.status == RUNNING:
+            if p.phase == "processing":
+                details = "Processing..."
+            else:
+                size = f"{fmt_mb(p.downloaded_bytes)} / {fmt_mb(p.total_bytes)}" if p.total_bytes else fmt_mb(p.downloaded_bytes)
+                details = f"Downloading {int(p.fraction*100)}% • {size} • {fmt_mb(p.speed)}/s"
+        else:
+            details = job.status.capitalize()
+            if job.message and job.status != DONE: details += f" • {job.message}"
+        self.status_text.value = details
+        self.status_text.color = ft.Colors.ERROR if job.status == FAILED else ft.Colors.GREY_400
+
+        self.pause_btn.visible = job.status in (QUEUED, RUNNING)
+        self.resume_btn.visible = job.status in (PAUSED, FAILED)
+        self.cancel_btn.visible = job.status not in (DONE, CANCELLED)
+        self.top_btn.visible = job.status == QUEUED
+
+class QueuePanel(ft.Column):
+    """
+    Lists every download job with its own progress.
+    Only the newest `max_finished` done/cancelled cards are kept, and only the
+    first `max_waiting` queued jobs get a card: the rest (e.g. a long playlist)
+    are counted in one line and get theirs as the shown ones start.
+    Scrolls on its own once it's taller than MAX_HEIGHT.
+    """
+    # Failed jobs keep their card so they can still be resumed
+    TRIMMED_STATES = (DONE, CANCELLED)
+    HEADER_HEIGHT = 24
+    CARD_HEIGHT = 100 # JobCard, margin included
+    MAX_HEIGHT = 320
+
+    def __init__(self, on_pause, on_resume, on_cancel, on_prioritize, max_finished=30, max_waiting=20):
+        super().__init__()
+        self.visible = False
+        self.spacing = 0
+        self.scroll = ft.ScrollMode.AUTO
+        self.handlers = (on_pause, on_resume, on_cancel, on_prioritize)
+        self.max_finished = max_finished
+        self.max_waiting = max_waiting
+        self.cards = {}
+        self.waiting = OrderedDict() # job id -> latest state of queued jobs without a card
+        self.header = ft.Text("Downloads", weight=ft.FontWeight.BOLD)
+        self.more_text = ft.Text("", size=12, color=ft.Colors.GREY_400, visible=False)
+        self.controls = [self.header, self.more_text]
+
+    def sync_job(self, job):
+        """
+        Adds or refreshes the card for `job`. Returns True if a card was added.
+        """
+        card = self.cards.get(job.id)
+        if card:
+            card.apply(job)
+            if job.status in self.TRIMMED_STATES: self._trim()
+            if job.status != QUEUED: self._fill()
+            return False
+        if job.status == QUEUED and (job.id in self.waiting or self._queued_cards() >= self.max_waiting):
+            self.waiting[job.id] = job
+            self._resize()
+            return False
+        self.waiting.pop(job.id, None)
+        self._add_card(job)
+        return True
+
+    def status_of(self, job_id):
+        card = self.cards.get(job_id)
+        if card: return card.status
+        job = self.waiting.get(job_id)
+        return job.status if job else None
+
+    def _add_card(self, job):
+        card = self.cards[job.id] = JobCard(job, *self.handlers)
+        # The "more waiting" line stays last
+        self.controls.insert(len(self.controls) - 1, card)
+        self._resize()
+
+    def _queued_cards(self):
+        return sum(1 for c in self.cards.values() if c.status == QUEUED)
+
+    def _fill(self):
+        # A shown job left the queue: the next waiting ones get its place
+        while self.waiting and self._queued_cards() < self.max_waiting:
+            _, job = self.waiting.popitem(last=False)
+            self._add_card(job)
+
+    def _trim(self):
+        finished = [c for c in self.cards.values() if c.status in self.TRIMMED_STATES]
+        for card in finished[:max(0, len(finished) - self.max_finished)]:
+            self.remove_job(card.job_id)
+
+    def remove_job(self, job_id):
+        card = self.cards.pop(job_id, None)
+        if card: self.controls.remove(card)
+        self.waiting.pop(job_id, None)
+        self._resize()
+
+    def _resize(self):
+        self.visible = bool(self.cards or self.waiting)
+        self.more_text.value = f"{len(self.waiting)} more waiting" if self.waiting else ""
+        self.more_text.visible = bool(self.waiting)
+        rows = len(self.cards) + (1 if self.waiting else 0)
+        self.height = min(self.MAX_HEIGHT, self.HEADER_HEIGHT + rows * self.CARD_HEIGHT)
+
+class PlaylistCard(ft.Container):
+    """
+    Playlist summary with one quality preset for all entries and aggregate progress.
+    """
+    def __init__(self, title, count, presets, on_download, on_cancel):
+        super().__init__()
+        self.border_radius = 10
+        self.bgcolor = ft.Colors.GREY_900
+        self.padding = 10
+
+        self.preset_dd = ft.Dropdown(
+            label="Quality for all videos",
+            value=next(iter(presets)),
+            options=[ft.dropdown.Option(key=k, text=label) for k, label in presets.items()],
+            width=260
+        )
+        self.download_btn = ft.FilledButton("Download All", icon=ft.Icons.DOWNLOAD, on_click=lambda e: on_download(self.preset_dd.value))
+        self.cancel_btn = ft.TextButton("Cancel", icon=ft.Icons.CLOSE, on_click=lambda e: on_cancel(), visible=False)
+        self.p_bar = ft.ProgressBar(value=0, color=ft.Colors.PRIMARY, bgcolor=ft.Colors.GREY_800, visible=False)
+        self.details_text = ft.Text("", size=12, color=ft.Colors.GREY_400)
+
         self.content = ft.Column([
-            self.status_text,
+            ft.Text(title, weight=ft.FontWeight.BOLD, no_wrap=True, overflow=ft.TextOverflow.ELLIPSIS),
+            ft.Text(f"{count} videos", size=12, color=ft.Colors.GREY_400),
+            ft.Row([self.preset_dd, self.download_btn, self.cancel_btn], wrap=True),
             self.p_bar,
             self.details_text
         ])
-        
-    def update_progress(self, percent, downloaded_str, total_str, speed_str):
-        self.visible = True
-        self.p_bar.value = percent
-        self.status_text.value = f"Downloading... {int(percent*100)}%"
-        self.details_text.value = f"{downloaded_str} / {total_str} ({speed_str})"
-        self.update()
-        
-    def reset(self):
-        self.visible = False
-        self.p_bar.value = 0
-        self.status_text.value = ""
-        self.details_text.value = ""
-        self.update()
+
+    def set_running(self, running):
+        self.download_btn.disabled = running
+        self.preset_dd.disabled = running
+        self.cancel_btn.visible = running
+        self.p_bar.visible = True
+
+    def apply_stats(self, s):
+        """
+        Shows aggregate progress (does not push an update).
+        """
+        def fmt_mb(b): return f"{b/1024/1024:.1f} MB"
+        total = s['items_total'] or 1
+        self.p_bar.value = s['bytes_done'] / s['bytes_total'] if s['bytes_total'] else (s['items_done'] + s['items_failed']) / total
+        parts = [f"{s['items_done']}/{s['items_total']} done"]
+        if s['items_failed']: parts.append(f"{s['items_failed']} failed")
+        if s['items_hydrated'] < s['items_total']: parts.append(f"{s['items_hydrated']} resolved")
+        if s.get('enumerating'): parts.append(f"{s['items_enumerated']} listed so far")
+        parts.append(f"{fmt_mb(s['bytes_done'])} / ~{fmt_mb(s['bytes_total'])}")
+        if s['eta'] is not None: parts.append(f"ETA {int(s['eta'] // 60)}m {int(s['eta'] % 60)}s")
+        if s['finished']:
+            parts.insert(0, "Finished")
+            self.set_running(False)
+        self.details_text.value = " • ".join(parts)